@@ -0,0 +1,6 @@
+"""python -m src: the hyperbolic-funhouse command line"""
+import sys
+
+from src.cli import main
+
+sys.exit(main())
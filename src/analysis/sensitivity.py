@@ -0,0 +1,163 @@
+"""
+Global sensitivity analysis
+Sobol first-order and total indices of every observable's pull from a Saltelli design
+"""
+
+import numpy as np
+from scipy.stats import qmc
+
+from src.models.datasets import load_dataset
+from src.models.variants import get_variant
+
+# Physically grouped factors: each group is resampled as a block
+PARAM_GROUPS = {'k_u': [0, 1, 2], 'k_d': [3, 4, 5], 'L0': [6], 'alpha': [7],
+                'theta12': [8], 'theta23': [9], 'theta13': [10], 'delta_cp': [11]}
+
+
+def local_bounds(x0, rel=0.02, floor=0.01):
+    """Box x0 +/- max(rel |x0|, floor), the usual range around a best fit"""
+    x0 = np.asarray(x0, dtype=float)
+    half = np.maximum(rel * np.abs(x0), floor)
+    return np.stack([x0 - half, x0 + half], axis=1)
+
+
+def parameter_groups(variant=None):
+    """PARAM_GROUPS plus a group of its own for each parameter the variant adds"""
+    names = get_variant(variant).param_names
+    grouped = {i for cols in PARAM_GROUPS.values() for i in cols}
+    return {**PARAM_GROUPS, **{names[i]: [i] for i in range(len(names)) if i not in grouped}}
+
+
+def pull_outputs(dataset=None, variant=None):
+    """Model outputs for the analysis: per-observable pulls and the total chi^2"""
+    dataset = load_dataset() if dataset is None else dataset
+    formula = get_variant(variant)
+
+    def outputs(params):
+        pred = formula.predict_observables(params)[..., dataset.index]
+        pulls = (pred - dataset.central) / dataset.sigma
+        return np.concatenate([pulls, dataset.chi2(params, formula.name)[..., None]], axis=-1)
+
+    return outputs, list(dataset.observables) + ['chi2']
+
+
+def _terms(fA, fB, fAB, fBA):
+    """
+    Per-sample summands of the estimators, (n, 4 + 4g, m). With A and B
+    playing both roles (Saltelli 2010 first order, Jansen total):
+      S_i  ~ [<fB (fAB_i - fA)> + <fA (fBA_i - fB)>] / 2V
+      ST_i ~ [<(fA - fAB_i)^2> + <(fB - fBA_i)^2>] / 4V
+    """
+    return np.concatenate([
+        fA[:, None], fB[:, None], fA[:, None]**2, fB[:, None]**2,
+        fB[:, None] * (fAB - fA[:, None]),
+        fA[:, None] * (fBA - fB[:, None]),
+        (fA[:, None] - fAB)**2,
+        (fB[:, None] - fBA)**2,
+    ], axis=1)
+
+
+def _indices(means, g):
+    """(first, total) indices from the means of _terms, (..., 4 + 4g, m)"""
+    mA, mB, qA, qB = (means[..., k, :] for k in range(4))
+    var = (qA + qB) / 2 - ((mA + mB) / 2)**2
+    blocks = [means[..., 4 + k * g:4 + (k + 1) * g, :] for k in range(4)]
+    var = var[..., None, :]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        first = (blocks[0] + blocks[1]) / (2 * var)
+        total = (blocks[2] + blocks[3]) / (4 * var)
+    return first, total
+
+
+def sobol_indices(f, bounds, n=2**14, groups=None, names=None, n_boot=200,
+                  confidence=0.95, chunk=8192, seed=None):
+    """
+    First-order and total Sobol indices of every output of f over the box.
+
+    f maps (k, d) parameter vectors to (k, m) outputs. The design is a
+    scrambled Sobol sequence in 2d dimensions split into matrices A and B,
+    plus A with each factor group taken from B and vice versa: n (2g + 2)
+    evaluations for g groups. Rows are processed `chunk` at a time, all
+    matrices stacked into one call of f, and only the estimator sums are
+    kept, so memory does not grow with n. Confidence intervals come from a
+    Poisson bootstrap accumulated in the same pass. Without `groups` every
+    factor is its own group, named x0, x1, ...
+
+    Returns first / total (g, m), their (2, g, m) intervals, and the names.
+    """
+    bounds = np.asarray(bounds, dtype=float)
+    d = len(bounds)
+    groups = {f"x{i}": [i] for i in range(d)} if groups is None else groups
+    group_names, members = list(groups), list(groups.values())
+    g = len(members)
+    rng = np.random.default_rng(seed)
+
+    sampler = qmc.Sobol(2 * d, scramble=True, seed=rng)
+    # balanced for powers of two; other n take the leading rows
+    unit = sampler.random_base2(int(np.ceil(np.log2(n))))[:n]
+    lo, width = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+
+    sums = boot_sums = boot_weights = None
+    for start in range(0, n, chunk):
+        block = unit[start:start + chunk]
+        A = lo + width * block[:, :d]
+        B = lo + width * block[:, d:]
+        k = len(A)
+        stacked = np.empty((2 + 2 * g, k, d))
+        stacked[0], stacked[1] = A, B
+        for j, cols in enumerate(members):
+            stacked[2 + j] = A
+            stacked[2 + j][:, cols] = B[:, cols]
+            stacked[2 + g + j] = B
+            stacked[2 + g + j][:, cols] = A[:, cols]
+        out = f(stacked.reshape(-1, d)).reshape(2 + 2 * g, k, -1)
+
+        terms = _terms(out[0], out[1], out[2:2 + g].swapaxes(0, 1),
+                       out[2 + g:].swapaxes(0, 1))
+        flat = terms.reshape(k, -1)
+        weights = rng.poisson(1.0, size=(n_boot, k)).astype(float)
+        if sums is None:
+            sums = np.zeros(flat.shape[1])
+            boot_sums = np.zeros((n_boot, flat.shape[1]))
+            boot_weights = np.zeros(n_boot)
+        sums += flat.sum(axis=0)
+        boot_sums += weights @ flat
+        boot_weights += weights.sum(axis=1)
+
+    shape = terms.shape[1:]
+    first, total = _indices((sums / n).reshape(shape), g)
+    boot_first, boot_total = _indices((boot_sums / boot_weights[:, None])
+                                      .reshape((n_boot,) + shape), g)
+    tail = 100 * (1 - confidence) / 2
+    return {
+        'groups': group_names,
+        'outputs': names,
+        'first': first,
+        'total': total,
+        'first_ci': np.nanpercentile(boot_first, [tail, 100 - tail], axis=0),
+        'total_ci': np.nanpercentile(boot_total, [tail, 100 - tail], axis=0),
+        'n': n,
+        'n_evaluations': n * (2 * g + 2),
+    }
+
+
+def pull_sensitivity(x0, dataset=None, bounds=None, n=2**14, groups=None, variant=None,
+                     **kwargs):
+    """
+    Sobol indices of each observable's pull (and chi^2) around a fit;
+    factors default to the variant's parameter_groups
+    """
+    outputs, names = pull_outputs(dataset, variant)
+    bounds = local_bounds(x0) if bounds is None else bounds
+    groups = parameter_groups(variant) if groups is None else groups
+    return sobol_indices(outputs, bounds, n, groups=groups, names=names, **kwargs)
+
+
+def format_table(result, key='total'):
+    """Plain-text table: one row per output, one column per factor group"""
+    groups, values = result['groups'], result[key]
+    width = max(len(o) for o in result['outputs'])
+    lines = [" " * width + "".join(f"{name:>10}" for name in groups)]
+    for o, name in enumerate(result['outputs']):
+        lines.append(f"{name:>{width}}" + "".join(f"{v:>10.3f}" for v in values[:, o]))
+    return "\n".join(lines)
@@ -0,0 +1,329 @@
+"""
+Streaming reductions over large scan and sampler outputs
+Memory-mapped reads and single-pass, bounded-memory summaries
+"""
+
+import heapq
+import zipfile
+from pathlib import Path
+
+import numpy as np
+from numpy.lib import format as npformat
+
+from src.models.datasets import load_dataset
+from src.models.flavor import PARAM_BOUNDS
+from src.models.observables import mixing_observables, select_observables
+from src.models.variants import get_variant
+
+
+def open_arrays(path):
+    """
+    Memory-map the arrays of a .npy file or an uncompressed .npz archive
+    (np.savez output, e.g. model_results.npz or a 'sample --output' chain).
+    Returns {name: read-only memmap}; nothing is read until sliced.
+    """
+    path = Path(path)
+    if path.suffix == '.npy':
+        return {path.stem: np.load(path, mmap_mode='r')}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as f:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}:{info.filename} is compressed; re-save with np.savez")
+            # local file header: 30 bytes + file name + extra field
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = map(int, np.frombuffer(f.read(4), dtype='<u2'))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = npformat.read_magic(f)
+            read_header = (npformat.read_array_header_1_0 if version == (1, 0)
+                           else npformat.read_array_header_2_0)
+            shape, fortran, dtype = read_header(f)
+            if dtype.hasobject:
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(),
+                                     shape=shape, order='F' if fortran else 'C')
+    return arrays
+
+
+def iter_chunks(n, chunk_rows):
+    for start in range(0, n, chunk_rows):
+        yield start, min(start + chunk_rows, n)
+
+
+class TopK:
+    """The k smallest values of a key column, kept in a max-heap"""
+
+    def __init__(self, k=100):
+        self.k = k
+        self.heap = []   # (-value, index, row)
+
+    def update(self, rows, key, weights, offset):
+        # only the chunk's own k best can enter the heap
+        cand = np.argpartition(key, min(self.k, len(key)) - 1)[:self.k] \
+            if len(key) > self.k else np.arange(len(key))
+        for c in cand:
+            item = (-float(key[c]), offset + int(c), np.array(rows[c]))
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, item)
+            elif item[0] > self.heap[0][0]:
+                heapq.heapreplace(self.heap, item)
+
+    def result(self):
+        items = sorted(self.heap, key=lambda t: -t[0])
+        return {'value': np.array([-v for v, _, _ in items]),
+                'index': np.array([i for _, i, _ in items], dtype=np.int64),
+                'rows': np.array([r for _, _, r in items])}
+
+
+class Histograms:
+    """
+    Weighted marginal histograms of every column on fixed edges over
+    `ranges`; column_ranges of the data puts the bins where the rows are.
+    """
+
+    def __init__(self, ranges=PARAM_BOUNDS, bins=200):
+        self.edges = [np.linspace(lo, hi, bins + 1) for lo, hi in ranges]
+        self.counts = np.zeros((len(self.edges), bins))
+
+    def update(self, rows, key, weights, offset):
+        for c, edges in enumerate(self.edges):
+            self.counts[c] += np.histogram(rows[:, c], edges, weights=weights)[0]
+
+    def result(self):
+        return {'edges': np.array(self.edges), 'counts': self.counts}
+
+
+class Quantiles(Histograms):
+    """
+    Weighted quantiles from fine histograms: exact to within one bin width
+    (range / bins) in bounded memory, whatever the number of rows. Over the
+    prior box a bin can be wider than a narrow posterior, so pass the data's
+    column_ranges.
+    """
+
+    def __init__(self, q=(0.025, 0.16, 0.5, 0.84, 0.975), ranges=PARAM_BOUNDS, bins=8192):
+        super().__init__(ranges, bins)
+        self.q = np.asarray(q)
+
+    def result(self):
+        out = np.empty((len(self.edges), len(self.q)))
+        for c, edges in enumerate(self.edges):
+            cdf = np.concatenate([[0.0], np.cumsum(self.counts[c])])
+            total = cdf[-1]
+            out[c] = np.interp(self.q * total, cdf, edges) if total > 0 else np.nan
+        return {'q': self.q, 'quantiles': out}
+
+
+class Density2D:
+    """Weighted 2-D histogram of a pair of columns over their `ranges`"""
+
+    def __init__(self, i, j, ranges=PARAM_BOUNDS, bins=256):
+        self.i, self.j = i, j
+        self.x_edges = np.linspace(*ranges[i], bins + 1)
+        self.y_edges = np.linspace(*ranges[j], bins + 1)
+        self.counts = np.zeros((bins, bins))
+
+    def update(self, rows, key, weights, offset):
+        self.counts += np.histogram2d(rows[:, self.i], rows[:, self.j],
+                                      [self.x_edges, self.y_edges], weights=weights)[0]
+
+    def result(self):
+        return {'x_edges': self.x_edges, 'y_edges': self.y_edges, 'counts': self.counts}
+
+
+class ColumnMoments:
+    """Weighted mean, standard deviation, min and max of m columns, merged chunk by chunk"""
+
+    def __init__(self, m):
+        self.w = 0.0
+        self.mean = np.zeros(m)
+        self.m2 = np.zeros(m)
+        self.min = np.full(m, np.inf)
+        self.max = np.full(m, -np.inf)
+
+    def accumulate(self, values, weights):
+        w = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+        wb = w.sum()
+        if wb == 0:
+            return
+        mean_b = w @ values / wb
+        m2_b = w @ (values - mean_b)**2
+        delta = mean_b - self.mean
+        total = self.w + wb
+        self.mean += delta * wb / total
+        self.m2 += m2_b + delta**2 * self.w * wb / total
+        self.w = total
+        self.min = np.minimum(self.min, values.min(axis=0))
+        self.max = np.maximum(self.max, values.max(axis=0))
+
+    def moments(self):
+        return {'mean': self.mean,
+                'std': np.sqrt(self.m2 / self.w) if self.w else self.m2 * np.nan,
+                'min': self.min, 'max': self.max}
+
+
+class PullSummary(ColumnMoments):
+    """
+    Per-observable pulls (pred - central) / sigma against a dataset, with
+    the predictions of the variant that produced the rows: weighted mean,
+    standard deviation, min and max, merged chunk by chunk.
+    """
+
+    def __init__(self, dataset=None, variant=None):
+        self.dataset = load_dataset() if dataset is None else dataset
+        self.variant = get_variant(variant)
+        super().__init__(len(self.dataset.central))
+
+    def update(self, rows, key, weights, offset):
+        d = self.dataset
+        pred = self.variant.predict_observables(np.asarray(rows, dtype=float))
+        pulls = (pred[:, d.index] - d.central) / d.sigma
+        self.accumulate(pulls, weights)
+
+    def result(self):
+        return {'observables': list(self.dataset.observables), **self.moments()}
+
+
+class FlavorSummary(ColumnMoments):
+    """
+    Posterior-predictive moments of derived flavor observables (Wolfenstein
+    parameters, J, triangle angles, ...; see select_observables), computed
+    into one reused buffer per chunk.
+    """
+
+    def __init__(self, select=('wolfenstein', 'jarlskog', 'standard_angles')):
+        self.names = select_observables(select)
+        self.buffer = None
+        super().__init__(len(self.names))
+
+    def update(self, rows, key, weights, offset):
+        if self.buffer is None or len(self.buffer) < len(rows):
+            self.buffer = np.empty((len(rows), len(self.names)))
+        values = mixing_observables(rows, self.names, out=self.buffer[:len(rows)])
+        self.accumulate(values, weights)
+
+    def result(self):
+        return {'observables': self.names, **self.moments()}
+
+
+def reduce_chunks(chunks, reducers):
+    """
+    Feed every (rows, key, weights, offset) block of `chunks` to each reducer
+    in turn; one pass, so only one block is in memory at a time.
+    Returns {name: reducer.result()}.
+    """
+    for rows, key, weights, offset in chunks:
+        for reducer in reducers.values():
+            reducer.update(rows, key, weights, offset)
+    return {name: reducer.result() for name, reducer in reducers.items()}
+
+
+def array_chunks(rows, key=None, weights=None, chunk_rows=1_000_000, key_scale=1.0):
+    """
+    Blocks of (N, n) rows (a memmap is never loaded whole) with their key,
+    multiplied by key_scale block by block (e.g. -2 for chi^2 from log_prob),
+    and weights
+    """
+    rows = rows.reshape(-1, rows.shape[-1])
+    key = None if key is None else np.asarray(key).reshape(-1)          # views, not reads
+    weights = None if weights is None else np.asarray(weights).reshape(-1)
+    for start, stop in iter_chunks(len(rows), chunk_rows):
+        yield (np.asarray(rows[start:stop]),
+               None if key is None else key_scale * np.asarray(key[start:stop]),
+               None if weights is None else np.asarray(weights[start:stop]),
+               start)
+
+
+def store_chunks(store, chunk_rows=100_000, **filters):
+    """Blocks of a ResultsStore selection, keyed by chi^2"""
+    offset = 0
+    for params, chi2 in store.iter_chunks(chunk_rows, **filters):
+        yield params, chi2, None, offset
+        offset += len(params)
+
+
+def column_ranges(chunks, default=PARAM_BOUNDS):
+    """
+    Per-column (min, max) of the rows with nonzero weight: the cheap first
+    pass that fixes histogram ranges before the reducing pass. Pinned
+    columns are widened slightly so their edges still increase; `default`
+    is returned for an empty stream.
+    """
+    lo = hi = None
+    for rows, _, weights, _ in chunks:
+        if weights is not None:
+            rows = rows[weights > 0]
+        if len(rows) == 0:
+            continue
+        lo = rows.min(axis=0) if lo is None else np.minimum(lo, rows.min(axis=0))
+        hi = rows.max(axis=0) if hi is None else np.maximum(hi, rows.max(axis=0))
+    if lo is None:
+        return np.asarray(default, dtype=float)
+    pad = np.where(hi > lo, 0.0, 1e-9 * np.maximum(np.abs(lo), 1.0))
+    return np.stack([lo - pad, hi + pad], axis=1).astype(float)
+
+
+def stream_reduce(rows, reducers, key=None, weights=None, chunk_rows=1_000_000):
+    """
+    Run `reducers` over an (N, n) array in chunks of `chunk_rows`; key is the
+    column ranked by TopK, e.g. chi^2.
+    """
+    return reduce_chunks(array_chunks(rows, key, weights, chunk_rows), reducers)
+
+
+def standard_reducers(dataset=None, top=100, ranges=None, variant=None):
+    """
+    Best rows by chi^2, marginals, quantiles, theta12/theta23 density, pulls
+    and flavor for rows of the variant; the binned ones over `ranges` (see
+    column_ranges; the variant's prior box by default)
+    """
+    ranges = get_variant(variant).bounds if ranges is None else ranges
+    return {
+        'top': TopK(top),
+        'marginals': Histograms(ranges),
+        'quantiles': Quantiles(ranges=ranges),
+        'density_theta12_theta23': Density2D(8, 9, ranges),
+        'pulls': PullSummary(dataset, variant),
+        'flavor': FlavorSummary(),
+    }
+
+
+def summarize_chain(path, dataset=None, top=100, chunk_rows=1_000_000, burn=0,
+                    variant=None):
+    """
+    Standard summary of a sampler chain of the variant (.npz from 'sample
+    --output'), memory-mapped, without its first `burn` steps. Two passes:
+    the column ranges, then the reducers binned over them.
+    """
+    formula = get_variant(variant)
+    arrays = open_arrays(path)
+    chain = arrays['chain'][burn:]
+    if chain.shape[-1] != formula.n_params:
+        raise ValueError(f"{path} holds {chain.shape[-1]} parameters per row; variant "
+                         f"{formula.name!r} has {formula.n_params}")
+    log_prob = arrays['log_prob'][burn:] if 'log_prob' in arrays else None
+    ranges = column_ranges(array_chunks(chain, chunk_rows=chunk_rows))
+    reducers = standard_reducers(dataset, top, ranges, formula)
+    if log_prob is None:
+        del reducers['top']
+    return reduce_chunks(array_chunks(chain, log_prob, chunk_rows=chunk_rows, key_scale=-2.0),
+                         reducers)
+
+
+def summarize_store(store, dataset=None, top=100, chunk_rows=100_000, variant=None,
+                    **filters):
+    """
+    Standard summary of stored rows (e.g. kind='scan') streamed from SQLite.
+    Only rows computed against this dataset with this variant are selected,
+    so their chi^2 values are comparable; a first pass over the selection
+    fixes the column ranges.
+    """
+    dataset = load_dataset() if dataset is None else dataset
+    formula = get_variant(variant)
+    filters = {'dataset': dataset.label, 'variant': formula.name, **filters}
+    ranges = column_ranges(store_chunks(store, chunk_rows, **filters),
+                           default=formula.bounds)
+    return reduce_chunks(store_chunks(store, chunk_rows, **filters),
+                         standard_reducers(dataset, top, ranges, formula))
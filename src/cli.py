@@ -0,0 +1,625 @@
+"""
+hyperbolic-funhouse command line
+fit / scan / queue / sample / emulate / evidence / summarize / predict / plot / serve, each importing only the subsystems it needs
+"""
+
+import argparse
+import json
+import sys
+
+BANNER = "\n".join(["=" * 80, "HYPERBOLIC FUNHOUSE MIRRORS",
+                    "Flavor from H/Gamma(5) geometry with A5 symmetry", "=" * 80])
+
+
+def _to_json(obj):
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Not JSON serializable: {type(obj).__name__}")
+
+
+def emit(payload):
+    """JSON result on stdout (banners and notes go to stderr)"""
+    json.dump(payload, sys.stdout, default=_to_json)
+    sys.stdout.write("\n")
+
+
+def _read_params(text, n_params=12):
+    """Parameter vectors from a JSON string or '-' (stdin); returns (N, n_params)"""
+    import numpy as np
+    raw = sys.stdin.read() if text == '-' else text
+    try:
+        params = np.atleast_2d(np.asarray(json.loads(raw), dtype=float))
+    except (ValueError, TypeError) as exc:
+        raise SystemExit(f"parameters must be a JSON list of numbers or of vectors: {exc}")
+    if params.shape[-1] != n_params:
+        raise SystemExit(f"expected parameter vectors of length {n_params}, "
+                         f"got {params.shape[-1]}")
+    return params
+
+
+def _named(values, names):
+    return dict(zip(names, (float(v) for v in values)))
+
+
+def _variant(args):
+    from src.models.variants import get_variant
+    try:
+        return get_variant(getattr(args, 'variant', None))
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+
+
+def _progress(args, run):
+    """Progress stream for --progress (silent without it)"""
+    from src.service.progress import progress_stream
+    return progress_stream(getattr(args, 'progress', None), run=run)
+
+
+def _best_params(args, dataset):
+    """--params if given, else the best stored fit for the dataset, else a fresh fit"""
+    variant = _variant(args)
+    if args.params is not None:
+        return _read_params(args.params, variant.n_params)[0]
+    from src.storage.results import ResultsStore
+    with ResultsStore() as store:
+        best = store.best(dataset=dataset.label, variant=variant.name)
+    if best is not None:
+        return best[0]
+    from src.fitting.multi import fit_datasets
+    return fit_datasets([dataset], variant=variant.name)['x'][0]
+
+
+def cmd_fit(args):
+    from src.models.datasets import load_dataset
+    variant = _variant(args)
+    datasets = [load_dataset(d) for d in (args.dataset or [None])]
+
+    from src.fitting.checkpoint import checkpoint_path, DEFAULT_DIR
+    # with --run-id every optimizer run checkpoints and resumes under that ID and variant
+    checkpoint = lambda *names: (None if args.run_id is None else
+                                 checkpoint_path(args.run_id, '-'.join((variant.name,) + names),
+                                                 args.checkpoint_dir or DEFAULT_DIR))
+
+    if args.method == 'global':
+        from src.fitting.population import fit_global
+        runs = [fit_global(d, seed=args.seed, maxgen=args.maxiter, workers=args.workers,
+                           variant=variant.name, checkpoint=checkpoint(d.label),
+                           checkpoint_every=args.checkpoint_every,
+                           progress=_progress(args, f"{args.run_id or 'fit'}-{d.label}"))
+                for d in datasets]
+        rows = [(d, r['x'], r['fun'], r['nit']) for d, r in zip(datasets, runs)]
+    else:
+        from src.fitting.multi import fit_datasets
+        r = fit_datasets(datasets, maxiter=args.maxiter, variant=variant.name,
+                         checkpoint=checkpoint(), checkpoint_every=args.checkpoint_every,
+                         progress=_progress(args, args.run_id or 'fit'))
+        rows = list(zip(datasets, r['x'], r['fun'], r['nit']))
+
+    results = []
+    for dataset, x, fun, nit in rows:
+        entry = {'dataset': dataset.label, 'variant': variant.name, 'chi2': float(fun),
+                 'nit': int(nit), 'params': _named(x, variant.param_names)}
+        if args.errors:
+            from src.fitting.uncertainty import fit_uncertainties
+            unc = fit_uncertainties(x, dataset=dataset, variant=variant.name)
+            entry['errors'] = _named(unc['errors'], unc['names'])
+            entry['derived'] = _named(unc['derived'], unc['derived_names'])
+            entry['derived_errors'] = _named(unc['derived_errors'], unc['derived_names'])
+        results.append(entry)
+
+    if not args.no_store:
+        from src.storage.results import ResultsStore
+        with ResultsStore() as store:
+            for dataset, x, fun, nit in rows:
+                store.record_fit(x, fun, dataset, variant=variant.name, run_id=args.run_id,
+                                 extra={'method': args.method, 'nit': int(nit)})
+    emit({'command': 'fit', 'method': args.method, 'results': results})
+
+
+def cmd_scan(args):
+    from functools import partial
+    from src.fitting.scan import random_scan
+    from src.models.datasets import load_dataset
+    variant = _variant(args)
+    dataset = load_dataset(args.dataset)
+    screen = partial(dataset.chi2_screen, variant=variant.name) if args.screen else None
+    result = random_scan(partial(dataset.chi2, variant=variant.name), variant.bounds, args.n,
+                         chunk=args.chunk, top=args.top, seed=args.seed, workers=args.workers,
+                         screen=screen, progress=_progress(args, f"scan-{dataset.label}"))
+    if not args.no_store:
+        from src.storage.results import ResultsStore
+        with ResultsStore() as store:
+            store.insert_many('scan', result['x'], result['fun'], dataset.label,
+                              variant.name, inputs_hash=dataset.fingerprint,
+                              extra={'n': args.n, 'seed': args.seed})
+    emit({'command': 'scan', 'dataset': dataset.label, 'variant': variant.name,
+          'n_evaluated': result['n_evaluated'], 'chi2': result['fun'], 'x': result['x']})
+
+
+def cmd_queue(args):
+    from src.service import workqueue
+    if args.action == 'submit-scan':
+        queue = workqueue.submit_scan(args.root, args.n, chunk=args.chunk, top=args.top,
+                                      dataset=args.dataset, variant=args.variant,
+                                      seed=args.seed, screen=args.screen)
+        emit({'command': 'queue', 'action': args.action, **queue.status()})
+    elif args.action == 'submit-toys':
+        from src.models.datasets import load_dataset
+        dataset = load_dataset(args.dataset)
+        queue = workqueue.submit_toys(args.root, _best_params(args, dataset), args.n,
+                                      chunk=args.chunk, dataset=args.dataset,
+                                      variant=args.variant, seed=args.seed)
+        emit({'command': 'queue', 'action': args.action, **queue.status()})
+    elif args.action == 'work':
+        if args.workers > 1:
+            codes = workqueue.launch_local(args.root, args.workers, lease=args.lease,
+                                           progress=args.progress)
+            emit({'command': 'queue', 'action': 'work', 'exit_codes': codes})
+        else:
+            done = workqueue.run_worker(args.root, lease=args.lease, progress=args.progress)
+            emit({'command': 'queue', 'action': 'work', 'completed': done})
+    elif args.action == 'status':
+        emit({'command': 'queue', 'action': 'status',
+              **workqueue.WorkQueue(args.root).status()})
+    else:
+        try:
+            result = workqueue.merge_results(args.root)
+        except RuntimeError as exc:
+            raise SystemExit(str(exc))
+        emit({'command': 'queue', 'action': 'merge', **result})
+
+
+def cmd_sample(args):
+    import numpy as np
+    from src.fitting.sampling import log_posterior, stretch_sampler
+    from src.models.datasets import load_dataset
+    if not 0 <= args.burn < args.steps:
+        raise SystemExit(f"--burn must be in [0, --steps): got {args.burn} of {args.steps} steps")
+    variant = _variant(args)
+    dataset = load_dataset(args.dataset)
+    x0 = _best_params(args, dataset)
+    chi2 = lambda x: dataset.chi2(x, variant.name)
+    run = stretch_sampler(log_posterior(chi2, variant.bounds), x0,
+                          n_steps=args.steps, n_walkers=args.walkers, seed=args.seed)
+    samples = run['chain'][args.burn::args.thin].reshape(-1, len(x0))
+    if args.output:
+        np.savez(args.output, chain=run['chain'], log_prob=run['log_prob'],
+                 names=np.array(variant.param_names))
+    emit({'command': 'sample', 'dataset': dataset.label, 'variant': variant.name,
+          'n_samples': len(samples), 'acceptance': float(run['acceptance'].mean()),
+          'mean': _named(samples.mean(axis=0), variant.param_names),
+          'std': _named(samples.std(axis=0), variant.param_names),
+          'output': args.output})
+
+
+def cmd_emulate(args):
+    import numpy as np
+    from functools import partial
+    from src.analysis.sensitivity import local_bounds
+    from src.fitting.emulator import Emulator, emulated_sampling, emulated_scan
+    from src.models.datasets import load_dataset
+    variant = _variant(args)
+    dataset = load_dataset(args.dataset)
+    x0 = _best_params(args, dataset)
+    box = local_bounds(x0, args.rel, args.floor)
+    box = np.clip(box, variant.bounds[:, :1], variant.bounds[:, 1:])
+    emulator = Emulator(partial(dataset.chi2, variant=variant.name), box,
+                        transform=args.transform, seed=args.seed).design(args.initial)
+    if args.mode == 'scan':
+        result = emulated_scan(emulator, args.n, top=args.top, rounds=args.rounds,
+                               n_add=args.add, seed=args.seed)
+        check = emulator.validate(n=args.validate)
+        emit({'command': 'emulate', 'mode': 'scan', 'dataset': dataset.label,
+              'variant': variant.name, 'chi2': result['fun'], 'x': result['x'],
+              'history': result['history'], 'validation': check,
+              'evaluations': emulator.counts()})
+        return
+    run = emulated_sampling(emulator, x0, rounds=args.rounds, n_add=args.add,
+                            n_steps=args.steps, n_walkers=args.walkers, seed=args.seed)
+    samples = run['chain'][args.steps // 2:].reshape(-1, len(x0))
+    if args.output:
+        np.savez(args.output, chain=run['chain'], log_prob=run['log_prob'],
+                 names=np.array(variant.param_names))
+    emit({'command': 'emulate', 'mode': 'sample', 'dataset': dataset.label,
+          'variant': variant.name, 'n_samples': len(samples),
+          'acceptance': float(run['acceptance'].mean()),
+          'mean': _named(samples.mean(axis=0), variant.param_names),
+          'std': _named(samples.std(axis=0), variant.param_names),
+          'history': run['history'], 'validation': run['validation'],
+          'evaluations': emulator.counts(), 'output': args.output})
+
+
+def cmd_evidence(args):
+    from src.fitting.nested import compare_hypotheses, HYPOTHESES
+    from src.models.datasets import load_dataset
+    from src.models.variants import get_variant
+    dataset = load_dataset(args.dataset)
+    names = args.hypothesis or list(HYPOTHESES)
+    results = compare_hypotheses({n: HYPOTHESES[n] for n in names}, dataset,
+                                 workers=args.workers, checkpoint_dir=args.checkpoint_dir,
+                                 n_live=args.live, seed=args.seed)
+    emit({'command': 'evidence', 'dataset': dataset.label,
+          'results': [{'hypothesis': name, 'variant': r['variant'],
+                       'log_z': r['log_z'], 'log_z_err': r['log_z_err'],
+                       'log_bayes_factor': r['log_bayes_factor'],
+                       'information': r['information'], 'ncall': r['ncall'],
+                       'posterior_mean': _named(r['samples'].mean(axis=0),
+                                                get_variant(r['variant']).param_names)}
+                      for name, r in results.items()]})
+
+
+def cmd_predict(args):
+    from src.models.flavor import OBSERVABLE_NAMES, DERIVED_NAMES
+    variant = _variant(args)
+    params = _read_params(args.params, variant.n_params)
+    obs, der = variant.predict_observables(params), variant.derived_observables(params)
+    emit({'command': 'predict',
+          'predictions': [{'observables': _named(o, OBSERVABLE_NAMES),
+                           'derived': _named(d, DERIVED_NAMES)}
+                          for o, d in zip(obs, der)]})
+
+
+def cmd_plot(args):
+    from src.models.datasets import load_dataset
+    from src.plotting.results import plot_results
+    variant = _variant(args)
+    dataset = load_dataset(args.dataset)
+    result = plot_results(_best_params(args, dataset), dataset, args.output, dpi=args.dpi,
+                          workers=args.workers, force=args.force, variant=variant.name)
+    emit({'command': 'plot', **result})
+
+
+def cmd_paper(args):
+    from src.storage.paper import build_paper, DEFAULT_OUTPUT
+    try:
+        result = build_paper(args.dataset, _variant(args).name, args.output or DEFAULT_OUTPUT,
+                             force=args.force)
+    except LookupError as exc:
+        raise SystemExit(str(exc))
+    emit({'command': 'paper', **result})
+
+
+def cmd_landscape(args):
+    from src.models.datasets import load_dataset
+    from src.plotting.landscape import LandscapeSlice
+    variant = _variant(args)
+    for name in (args.x, args.y):
+        if name not in variant.param_names:
+            raise SystemExit(f"'{name}' is not a parameter of {variant.name}; "
+                             f"choose from {variant.param_names}")
+    dataset = load_dataset(args.dataset)
+    landscape = LandscapeSlice(args.cache, _best_params(args, dataset),
+                               variant.param_names.index(args.x),
+                               variant.param_names.index(args.y), args.xrange, args.yrange,
+                               resolution=args.resolution, dataset=dataset,
+                               variant=variant.name)
+    try:
+        rendered = landscape.render(args.output, view=args.view, size=(args.width, args.width),
+                                    stat=args.stat)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    emit({'command': 'landscape', **rendered})
+
+
+def cmd_tiling(args):
+    from src.plotting.tiling import plot_tiling
+    emit({'command': 'tiling', **plot_tiling(args.output, args.depth, args.model,
+                                              args.min_size, dpi=args.dpi)})
+
+
+def cmd_spectrum(args):
+    from src.core.spectrum import hyperbolic_spectrum
+    result = hyperbolic_spectrum(args.eigs, args.cells, args.cells, args.cusp_height,
+                                 refinements=args.refine)
+    emit({'command': 'spectrum', 'cusp_height': result['height'],
+          'eigenvalues': result['eigenvalues'],
+          'multiplets': [{'value': v, 'multiplicity': m} for v, m in result['multiplets']],
+          'rounds': [{'dof': r['dof'], 'cells': r['cells'], 'eigenvalues': r['eigenvalues']}
+                     for r in result['rounds']]})
+
+
+def cmd_geodesics(args):
+    from src.core.geodesics import simulate
+    result = simulate(args.n, args.crossings, args.max_period, args.seed)
+    orbits = result['orbits']
+    shortest = [{'length': float(l), 'trace': int(t), 'period': int(p), 'hits': int(h)}
+                for l, t, p, h in zip(orbits['length'], orbits['trace'], orbits['period'],
+                                      orbits['hits'])][:args.show]
+    emit({'command': 'geodesics', **result['statistics'], 'shortest': shortest})
+
+
+def cmd_summarize(args):
+    from src.analysis.streaming import summarize_chain, summarize_store
+    from src.models.datasets import load_dataset
+    variant = _variant(args)
+    dataset = load_dataset(args.dataset)
+    if args.chain:
+        try:
+            summary = summarize_chain(args.chain, dataset, top=args.top, burn=args.burn,
+                                      variant=variant)
+        except ValueError as exc:
+            raise SystemExit(str(exc))
+    else:
+        from src.storage.results import ResultsStore
+        with ResultsStore() as store:
+            summary = summarize_store(store, dataset, top=args.top, variant=variant,
+                                      kind=args.kind)
+    q = summary['quantiles']
+    pulls = summary['pulls']
+    emit({'command': 'summarize', 'source': args.chain or f"store:{args.kind}",
+          'dataset': dataset.label, 'variant': variant.name,
+          'best': {'chi2': summary['top']['value'][:1],
+                   'params': summary['top']['rows'][:1]} if 'top' in summary else None,
+          'quantiles': {name: dict(zip(map(str, q['q']), row))
+                        for name, row in zip(variant.param_names, q['quantiles'].tolist())},
+          'pulls': {name: {'mean': m, 'std': s}
+                    for name, m, s in zip(pulls['observables'], pulls['mean'].tolist(),
+                                          pulls['std'].tolist())},
+          'flavor': {name: {'mean': m, 'std': s}
+                     for name, m, s in zip(summary['flavor']['observables'],
+                                           summary['flavor']['mean'].tolist(),
+                                           summary['flavor']['std'].tolist())}})
+
+
+def cmd_sensitivity(args):
+    from src.analysis.sensitivity import pull_sensitivity, local_bounds
+    from src.models.datasets import load_dataset
+    variant = _variant(args)
+    dataset = load_dataset(args.dataset)
+    x0 = _best_params(args, dataset)
+    result = pull_sensitivity(x0, dataset, bounds=local_bounds(x0, args.width),
+                              n=args.n, n_boot=args.boot, seed=args.seed, variant=variant.name)
+    emit({'command': 'sensitivity', 'dataset': dataset.label, 'variant': variant.name,
+          'n': result['n'],
+          'n_evaluations': result['n_evaluations'],
+          'indices': {o: {g: {'first': float(result['first'][j, i]),
+                              'total': float(result['total'][j, i]),
+                              'total_ci': result['total_ci'][:, j, i]}
+                          for j, g in enumerate(result['groups'])}
+                      for i, o in enumerate(result['outputs'])}})
+
+
+def cmd_progress(args):
+    from src.service.progress import follow, format_status
+    if not args.files and args.listen is None:
+        raise SystemExit("progress needs event files or --listen")
+    summary, shown = {}, 0
+    for summary in follow(args.files, args.listen, args.interval, until_finished=not args.once):
+        status = format_status(summary)
+        if status and sys.stderr.isatty():
+            # redraw the block of status lines in place
+            sys.stderr.write("\x1b[F\x1b[K" * shown + status + "\n")
+            shown = status.count("\n") + 1
+        elif status:
+            sys.stderr.write(status + "\n")
+        sys.stderr.flush()
+        if args.once:
+            break
+    emit({'command': 'progress', 'runs': summary})
+
+
+def cmd_serve(args):
+    from src.service.prediction import serve
+    print(f"Serving predictions on {args.unix or f'{args.host}:{args.port}'}", file=sys.stderr)
+    serve(args.host, args.port, args.unix, window=args.window / 1e3)
+
+
+def _common_options(defaults=True):
+    """--quiet/--workers/--progress, accepted before or after the subcommand"""
+    common = argparse.ArgumentParser(add_help=False)
+    # subcommand copies must not overwrite values given before the subcommand
+    keep = {} if defaults else {'default': argparse.SUPPRESS}
+    common.add_argument('--quiet', action='store_true', help="suppress the banner", **keep)
+    common.add_argument('--workers', type=int, help="worker processes for global fits and scans",
+                        **(keep or {'default': 1}))
+    common.add_argument('--progress', metavar='SINK',
+                        help="JSON-lines progress events to a file ('{worker}' expands), "
+                             "tcp://host:port, unix:///path or - (stderr)",
+                        **(keep or {'default': None}))
+    return common
+
+
+def _variant_option():
+    """--variant for every command that evaluates the model"""
+    option = argparse.ArgumentParser(add_help=False)
+    option.add_argument('--variant', default='phi-321',
+                        help="mass-formula variant (see src/models/variants.py)")
+    return option
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='hyperbolic-funhouse', parents=[_common_options()],
+                                     description="Flavor physics from hyperbolic geometry")
+    common = _common_options(defaults=False)
+    model = [common, _variant_option()]
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('fit', parents=model, help="fit the model to one or more datasets")
+    p.add_argument('--dataset', action='append',
+                   help="dataset name or path (repeat for a multi-dataset fit)")
+    p.add_argument('--method', choices=['nelder-mead', 'global'], default='nelder-mead')
+    p.add_argument('--maxiter', type=int, default=1000)
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--errors', action='store_true', help="add Fisher-matrix uncertainties")
+    p.add_argument('--no-store', action='store_true', help="do not append to the results DB")
+    p.add_argument('--run-id', help="checkpoint under this ID and resume it when rerun")
+    p.add_argument('--checkpoint-dir', help="default: data/checkpoints in the repository")
+    p.add_argument('--checkpoint-every', type=float, default=60.0,
+                   help="seconds of wall time between checkpoints")
+    p.set_defaults(func=cmd_fit)
+
+    p = sub.add_parser('scan', parents=model, help="random chi^2 scan of the parameter box")
+    p.add_argument('--dataset')
+    p.add_argument('--n', type=int, default=1_000_000)
+    p.add_argument('--chunk', type=int, default=100_000)
+    p.add_argument('--top', type=int, default=20)
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--no-store', action='store_true')
+    p.add_argument('--screen', action='store_true',
+                   help="screen in float32, refine survivors in float64 (same top-K, ~2x faster)")
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser('queue', parents=model,
+                       help="shared-directory work queue for scans and toys across nodes")
+    p.add_argument('action', choices=['submit-scan', 'submit-toys', 'work', 'status', 'merge'])
+    p.add_argument('--root', required=True, help="queue directory on the shared filesystem")
+    p.add_argument('--dataset')
+    p.add_argument('--params', help="toy truth as JSON (default: best stored fit)")
+    p.add_argument('--n', type=int, default=10_000_000, help="points (scan) or toys")
+    p.add_argument('--chunk', type=int, default=100_000)
+    p.add_argument('--top', type=int, default=100)
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--screen', action='store_true', help="float32 screening for scans")
+    p.add_argument('--lease', type=float, default=120.0,
+                   help="seconds without heartbeat before a claim is requeued")
+    p.set_defaults(func=cmd_queue)
+
+    p = sub.add_parser('sample', parents=model, help="ensemble MCMC around the best fit")
+    p.add_argument('--dataset')
+    p.add_argument('--params', help="starting vector as JSON ('-' reads stdin)")
+    p.add_argument('--steps', type=int, default=2000)
+    p.add_argument('--walkers', type=int, default=64)
+    p.add_argument('--burn', type=int, default=500)
+    p.add_argument('--thin', type=int, default=10)
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--output', help="write the full chain to this .npz")
+    p.set_defaults(func=cmd_sample)
+
+    p = sub.add_parser('emulate', parents=model,
+                       help="sample or scan a Gaussian-process emulator of chi^2")
+    p.add_argument('--dataset')
+    p.add_argument('--params', help="centre of the box as JSON ('-' reads stdin)")
+    p.add_argument('--mode', choices=('sample', 'scan'), default='sample')
+    p.add_argument('--rel', type=float, default=0.02, help="box half-width relative to |x|")
+    p.add_argument('--floor', type=float, default=0.01, help="smallest box half-width")
+    p.add_argument('--transform', choices=('identity', 'log1p'), default='identity')
+    p.add_argument('--initial', type=int, default=256, help="true evaluations in the design")
+    p.add_argument('--rounds', type=int, default=5, help="active-learning rounds")
+    p.add_argument('--add', type=int, default=20, help="true evaluations added per round")
+    p.add_argument('--steps', type=int, default=2000)
+    p.add_argument('--walkers', type=int, default=64)
+    p.add_argument('--n', type=int, default=1_000_000, help="emulated points per scan round")
+    p.add_argument('--top', type=int, default=20)
+    p.add_argument('--validate', type=int, default=200, help="held-out true evaluations")
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--output', help="write the emulated chain to this .npz")
+    p.set_defaults(func=cmd_emulate)
+
+    p = sub.add_parser('evidence', parents=[common],
+                       help="nested-sampling evidence for competing hypotheses")
+    p.add_argument('--dataset')
+    p.add_argument('--hypothesis', action='append',
+                   help="hypothesis name (repeatable; default: all)")
+    p.add_argument('--live', type=int, default=400, help="number of live points")
+    p.add_argument('--seed', type=int, default=None)
+    p.add_argument('--checkpoint-dir', help="checkpoint each run here and resume on rerun")
+    p.set_defaults(func=cmd_evidence)
+
+    p = sub.add_parser('predict', parents=model, help="observables for parameter vectors")
+    p.add_argument('--params', default='-',
+                   help="JSON vector or list of vectors ('-' reads stdin)")
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser('plot', parents=model, help="six-panel summary figure")
+    p.add_argument('--dataset')
+    p.add_argument('--params', help="parameter vector as JSON (default: best stored fit)")
+    p.add_argument('--output', default='figures/results.png')
+    p.add_argument('--dpi', type=int, default=300)
+    p.add_argument('--force', action='store_true', help="redraw panels even if unchanged")
+    p.set_defaults(func=cmd_plot)
+
+    p = sub.add_parser('paper', parents=model,
+                       help="regenerate the paper's LaTeX macros and tables from the best fit")
+    p.add_argument('--dataset')
+    p.add_argument('--output', help="directory for the generated files (default: paper/generated)")
+    p.add_argument('--force', action='store_true', help="rewrite artifacts even if unchanged")
+    p.set_defaults(func=cmd_paper)
+
+    p = sub.add_parser('landscape', parents=model, help="chi^2 slice over two parameters")
+    p.add_argument('--dataset')
+    p.add_argument('--params', help="base point as JSON (default: best stored fit)")
+    p.add_argument('--x', required=True, help="parameter of the variant on the x axis")
+    p.add_argument('--y', required=True, help="parameter of the variant on the y axis")
+    p.add_argument('--xrange', type=float, nargs=2, required=True)
+    p.add_argument('--yrange', type=float, nargs=2, required=True)
+    p.add_argument('--view', type=float, nargs=4, help="zoom window x0 x1 y0 y1")
+    p.add_argument('--resolution', type=int, default=4096, help="base grid per axis")
+    p.add_argument('--width', type=int, default=800, help="output size in pixels")
+    p.add_argument('--stat', choices=['min', 'mean'], default='min')
+    p.add_argument('--cache', default='data/landscapes')
+    p.add_argument('--output', default='figures/landscape.png')
+    p.set_defaults(func=cmd_landscape)
+
+    p = sub.add_parser('tiling', parents=[common], help="Gamma(5) tiling of the hyperbolic plane")
+    p.add_argument('--depth', type=int, default=8, help="word depth in the side pairings")
+    p.add_argument('--model', choices=['disk', 'half-plane'], default='disk')
+    p.add_argument('--min-size', type=float, default=2e-3,
+                   help="skip domains smaller than this in the disk (0 keeps all)")
+    p.add_argument('--dpi', type=int, default=200)
+    p.add_argument('--output', default='figures/tiling.png')
+    p.set_defaults(func=cmd_tiling)
+
+    p = sub.add_parser('spectrum', parents=[common],
+                       help="low-lying Laplace eigenvalues of H/Gamma(5) (finite elements)")
+    p.add_argument('--eigs', type=int, default=20)
+    p.add_argument('--cells', type=int, default=16, help="initial cells per direction")
+    p.add_argument('--refine', type=int, default=2, help="adaptive refinement rounds")
+    p.add_argument('--cusp-height', type=float, default=4.0)
+    p.set_defaults(func=cmd_spectrum)
+
+    p = sub.add_parser('geodesics', parents=[common],
+                       help="geodesic flow on X(5): cutting sequences and closed orbits")
+    p.add_argument('--n', type=int, default=100_000, help="number of geodesics")
+    p.add_argument('--crossings', type=int, default=256, help="sides crossed by each geodesic")
+    p.add_argument('--max-period', type=int, default=24, help="longest closed word searched")
+    p.add_argument('--seed', type=int)
+    p.add_argument('--show', type=int, default=20, help="shortest orbits listed")
+    p.set_defaults(func=cmd_geodesics)
+
+    p = sub.add_parser('summarize', parents=model,
+                       help="streaming summary of a saved chain or the stored scans")
+    p.add_argument('--dataset')
+    p.add_argument('--chain', help="chain .npz from 'sample --output' (memory-mapped)")
+    p.add_argument('--kind', default='scan', help="stored row kind when no --chain is given")
+    p.add_argument('--burn', type=int, default=0, help="chain steps discarded as burn-in")
+    p.add_argument('--top', type=int, default=100)
+    p.set_defaults(func=cmd_summarize)
+
+    p = sub.add_parser('sensitivity', parents=model,
+                       help="Sobol indices of each observable's pull around the best fit")
+    p.add_argument('--dataset')
+    p.add_argument('--params', help="centre of the box as JSON (default: best stored fit)")
+    p.add_argument('--width', type=float, default=0.02, help="relative half-width of the box")
+    p.add_argument('--n', type=int, default=2**14, help="base sample size")
+    p.add_argument('--boot', type=int, default=200, help="bootstrap replicates")
+    p.add_argument('--seed', type=int, default=None)
+    p.set_defaults(func=cmd_sensitivity)
+
+    p = sub.add_parser('progress', parents=[common],
+                       help="merge progress event streams into one ETA display")
+    p.add_argument('files', nargs='*', help="event files or glob patterns (quote them)")
+    p.add_argument('--listen', metavar='ADDRESS',
+                   help="also receive events on tcp://host:port or unix:///path")
+    p.add_argument('--interval', type=float, default=1.0, help="seconds between updates")
+    p.add_argument('--once', action='store_true', help="print the current state and exit")
+    p.set_defaults(func=cmd_progress)
+
+    p = sub.add_parser('serve', parents=[common], help="local micro-batching prediction service")
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--unix', help="listen on this Unix socket instead of TCP")
+    p.add_argument('--window', type=float, default=2.0, help="batching window in ms")
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.quiet:
+        print(BANNER, file=sys.stderr)
+    args.func(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+The icosahedral group A5 = PSL(2,5)
+Elements, Cayley table, irreducible representations and Clebsch-Gordan tables
+"""
+
+import json
+import os
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from src.core.mathematics import PHI
+
+BUNDLE = Path(__file__).resolve().parents[2] / 'data' / 'a5_tables.bin'
+MAGIC = b'A5TABLES'
+_ALIGN = 64
+
+ORDER = 60
+IRREPS = ('1', '3', '3p', '4', '5')
+DIMS = {'1': 1, '3': 3, '3p': 3, '4': 4, '5': 5}
+
+# PSL(2,5) generators, S^2 = T^5 = (ST)^3 = 1 (a presentation of A5)
+GENERATORS = {'S': ((0, 4), (1, 0)), 'T': ((1, 1), (0, 1))}
+
+_W = np.exp(2j * np.pi / 5)
+_R2 = np.sqrt(2)
+
+# The triplets in the basis where T is diagonal
+_TRIPLETS = {
+    '3': (np.array([[1, _R2, _R2],
+                    [_R2, -PHI, 1 / PHI],
+                    [_R2, 1 / PHI, -PHI]]) / np.sqrt(5),
+          np.diag([1, _W, _W**4])),
+    '3p': (np.array([[-1, _R2, _R2],
+                     [_R2, -1 / PHI, PHI],
+                     [_R2, PHI, -1 / PHI]]) / np.sqrt(5),
+           np.diag([1, _W**2, _W**3])),
+}
+
+
+# ------------------------------------------------------------------ elements
+
+def _canonical(m):
+    """The representative of {m, -m} mod 5 with the smaller flattened entries"""
+    m = np.asarray(m) % 5
+    return min(tuple(m.ravel()), tuple((-m % 5).ravel()))
+
+
+def enumerate_elements():
+    """
+    Breadth-first closure of the generators: (60, 2, 2) int8 matrices mod 5
+    (identity first) and the shortest word in S, T reaching each of them.
+    """
+    gens = {name: np.array(g) for name, g in GENERATORS.items()}
+    identity = _canonical(np.eye(2, dtype=int))
+    index, words, queue = {identity: 0}, [''], deque([identity])
+    while queue:
+        key = queue.popleft()
+        for name, g in gens.items():
+            new = _canonical(np.array(key).reshape(2, 2) @ g)
+            if new not in index:
+                index[new] = len(words)
+                words.append(words[index[key]] + name)
+                queue.append(new)
+    if len(words) != ORDER:
+        raise RuntimeError(f"generators close on {len(words)} elements, not {ORDER}")
+    elements = np.array(list(index), dtype=np.int8).reshape(ORDER, 2, 2)
+    return elements, words
+
+
+def cayley_table(elements):
+    """table[i, j] = index of elements[i] @ elements[j], as int8"""
+    index = {_canonical(m): i for i, m in enumerate(elements)}
+    products = np.einsum('iab,jbc->ijac', elements.astype(int), elements.astype(int))
+    return np.array([[index[_canonical(m)] for m in row] for row in products], dtype=np.int8)
+
+
+def conjugacy_classes(table):
+    """Class label of every element, classes numbered in order of first appearance"""
+    inverse = np.argmax(table == 0, axis=1)
+    labels = np.full(ORDER, -1, dtype=np.int8)
+    n = 0
+    for i in range(ORDER):
+        if labels[i] < 0:
+            conjugates = table[table[np.arange(ORDER), i], inverse]   # g x g^-1
+            labels[conjugates] = n
+            n += 1
+    return labels
+
+
+# ---------------------------------------------------------- representations
+
+def _along_words(words, generators):
+    """rho(g) for every element from rho of the generators, multiplied along the words"""
+    d = len(next(iter(generators.values())))
+    rho = np.empty((ORDER, d, d), dtype=complex)
+    for i, word in enumerate(words):
+        m = np.eye(d, dtype=complex)
+        for letter in word:
+            m = m @ generators[letter]
+        rho[i] = m
+    return rho
+
+
+def _reduce(rho, character, s, t):
+    """
+    The irrep with `character` inside the reducible rho: the range of the
+    projector (d / |G|) sum conj(chi(g)) rho(g), in a basis where rho(T) is
+    diagonal with eigenphases increasing and the first row of rho(S) real.
+    """
+    d = int(round(character[0].real))
+    projector = d / ORDER * np.einsum('g,gij->ij', character.conj(), rho)
+    values, vectors = np.linalg.eigh((projector + projector.conj().T) / 2)
+    basis = vectors[:, values > 0.5]
+    block = np.einsum('ia,gij,jb->gab', basis.conj(), rho, basis)
+
+    phases, u = np.linalg.eig(block[t])
+    u = u[:, np.argsort(np.mod(np.angle(phases) + 1e-9, 2 * np.pi))]
+    block = np.einsum('ia,gij,jb->gab', u.conj(), block, u)
+
+    first = block[s, 0]
+    fix = np.ones(d, dtype=complex)
+    nonzero = np.abs(first) > 1e-9
+    fix[nonzero] = np.abs(first[nonzero]) / first[nonzero]
+    fix *= np.conj(fix[0]) if nonzero[0] else 1.0
+    return np.einsum('a,gab,b->gab', fix.conj(), block, fix)
+
+
+def representations(words, table):
+    """{irrep: (60, d, d) complex matrices} for 1, 3, 3', 4 and 5"""
+    reps = {'1': np.ones((ORDER, 1, 1), dtype=complex)}
+    for name, (s, t) in _TRIPLETS.items():
+        reps[name] = _along_words(words, {'S': s.astype(complex), 'T': t})
+    chi3 = np.einsum('gii->g', reps['3'])
+    chi3p = np.einsum('gii->g', reps['3p'])
+    squares = table[np.arange(ORDER), np.arange(ORDER)]
+    chi5 = (chi3**2 + chi3[squares]) / 2 - 1            # Sym^2(3) = 1 + 5
+    chi4 = chi3 * chi3p - chi5                          # 3 x 3' = 4 + 5
+    s, t = words.index('S'), words.index('T')
+    reps['5'] = _reduce(_kron(reps['3'], reps['3']), chi5, s, t)
+    reps['4'] = _reduce(_kron(reps['3'], reps['3p']), chi4, s, t)
+    return {name: reps[name] for name in IRREPS}
+
+
+def _kron(a, b):
+    """Batched Kronecker product of (g, m, m) and (g, n, n)"""
+    g, m, n = len(a), a.shape[1], b.shape[1]
+    return np.einsum('gij,gkl->gikjl', a, b).reshape(g, m * n, m * n)
+
+
+def character_table(reps, classes):
+    """(irreps, classes) characters, one representative per class"""
+    first = [int(np.argmax(classes == c)) for c in range(classes.max() + 1)]
+    return np.array([np.einsum('gii->g', reps[name])[first] for name in IRREPS])
+
+
+# ------------------------------------------------------------- Clebsch-Gordan
+
+def clebsch_gordan(rho_a, rho_b, rho_c, generators):
+    """
+    All intertwiners C : c -> a x b, as (multiplicity, d_a, d_b, d_c) with
+    (rho_a(g) x rho_b(g)) C = C rho_c(g). Each copy is an isometry and
+    distinct copies are orthogonal; the largest entry of each is real positive.
+    """
+    da, db, dc = rho_a.shape[1], rho_b.shape[1], rho_c.shape[1]
+    n = da * db
+    rows = []
+    for g in generators:
+        ab = _kron(rho_a[g:g + 1], rho_b[g:g + 1])[0]
+        # row-major vec(C): vec(AB C) = (AB x 1) vec C, vec(C R) = (1 x R^T) vec C
+        rows.append(np.kron(ab, np.eye(dc)) - np.kron(np.eye(n), rho_c[g].T))
+    _, sv, vh = np.linalg.svd(np.vstack(rows))
+    rank = int(np.sum(sv > 1e-8))
+    null = vh[rank:].conj()
+    copies = null.reshape(-1, da, db, dc) * np.sqrt(dc)
+    for c in copies:
+        big = c.flat[np.argmax(np.abs(c))]
+        c *= np.abs(big) / big
+    copies[np.abs(copies) < 1e-14] = 0
+    return copies
+
+
+# ------------------------------------------------------------------- bundle
+
+def build_tables():
+    """Everything as a flat dict of arrays (the bundle's contents)"""
+    elements, words = enumerate_elements()
+    table = cayley_table(elements)
+    classes = conjugacy_classes(table)
+    reps = representations(words, table)
+    generators = [words.index('S'), words.index('T')]
+    tables = {
+        'elements': elements,
+        'words': np.array(words),
+        'cayley': table,
+        'inverse': np.argmax(table == 0, axis=1).astype(np.int8),
+        'classes': classes,
+        'characters': character_table(reps, classes),
+    }
+    for name in IRREPS:
+        tables[f"rep_{name}"] = reps[name]
+    for a in IRREPS:
+        for b in IRREPS:
+            for c in IRREPS:
+                cg = clebsch_gordan(reps[a], reps[b], reps[c], generators)
+                if len(cg):
+                    tables[f"cg_{a}_{b}_{c}"] = cg
+    return tables
+
+
+def save_tables(path=BUNDLE, tables=None):
+    """
+    Write the bundle atomically: MAGIC, a little-endian u4 header length, a
+    JSON header {name: [dtype, shape, offset]} and the raw arrays, each
+    aligned to _ALIGN bytes from the start of the data block.
+    """
+    tables = build_tables() if tables is None else tables
+    header, offset = {}, 0
+    for name, array in tables.items():
+        header[name] = [array.dtype.str, list(array.shape), offset]
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    text = json.dumps(header, separators=(',', ':')).encode()
+    text += b' ' * (-(len(MAGIC) + 4 + len(text)) % _ALIGN)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC + np.uint32(len(text)).astype('<u4').tobytes() + text)
+            for name, array in tables.items():
+                data = np.ascontiguousarray(array).tobytes()
+                f.write(data + bytes(-len(data) % _ALIGN))
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return path
+
+
+@lru_cache(maxsize=None)
+def load_tables(path=BUNDLE):
+    """
+    The bundle as {name: read-only array}, built and written on first use.
+    One read of ~140 kB and zero-copy views into it. Where the bundle cannot
+    be written (a read-only install) the tables built in memory are used.
+    """
+    path = Path(path)
+    if not path.exists():
+        tables = build_tables()
+        try:
+            save_tables(path, tables)
+        except OSError:
+            for array in tables.values():
+                array.flags.writeable = False
+            return tables
+    raw = path.read_bytes()
+    if raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not an A5 table bundle")
+    start = len(MAGIC) + 4
+    length = int(np.frombuffer(raw, '<u4', 1, len(MAGIC))[0])
+    header = json.loads(raw[start:start + length])
+    base = start + length
+    return {name: np.frombuffer(raw, dtype, int(np.prod(shape)), base + offset).reshape(shape)
+            for name, (dtype, shape, offset) in header.items()}
+
+
+def rep(name):
+    """(60, d, d) matrices of an irrep"""
+    return load_tables()[f"rep_{name}"]
+
+
+def multiply(i, j):
+    """Index of the product of elements i and j (vectorized over index arrays)"""
+    return load_tables()['cayley'][i, j]
+
+
+def decompose(a, b):
+    """{irrep: multiplicity} of a x b"""
+    tables = load_tables()
+    return {c: len(tables[f"cg_{a}_{b}_{c}"]) for c in IRREPS
+            if f"cg_{a}_{b}_{c}" in tables}
+
+
+def cg(a, b, c):
+    """(multiplicity, d_a, d_b, d_c) Clebsch-Gordan coefficients of c in a x b"""
+    try:
+        return load_tables()[f"cg_{a}_{b}_{c}"]
+    except KeyError:
+        raise ValueError(f"{c} does not occur in {a} x {b}") from None
+
+
+# -------------------------------------------------------------- contractions
+
+def project(x, y, a, b, c):
+    """
+    The c components of x (..., d_a) tensored with y (..., d_b): one einsum
+    over the batch, (..., multiplicity, d_c).
+    """
+    return np.einsum('mijk,...i,...j->...mk', cg(a, b, c).conj(), x, y)
+
+
+@lru_cache(maxsize=None)
+def invariant_tensor(a, b, c):
+    """
+    The A5-invariant tensors I_ijk of a x b x c, (multiplicity, d_a, d_b, d_c),
+    obtained by pairing c in a x b with c through c x c -> 1.
+    """
+    singlet = cg(c, c, '1')[0, ..., 0]
+    tensor = np.einsum('mijk,kl->mijl', cg(a, b, c).conj(), singlet.conj())
+    tensor.flags.writeable = False      # shared through the cache
+    return tensor
+
+
+def mass_matrices(flavon, left='3', right='3', representation='3'):
+    """
+    Mass matrices M_ij = sum_k I_ijk phi_k from flavon vevs phi of shape
+    (..., d): (..., multiplicity, d_left, d_right), one einsum for the batch.
+    Combine the independent structures with their couplings afterwards.
+    """
+    return np.einsum('mijk,...k->...mij', invariant_tensor(left, right, representation),
+                     np.asarray(flavon))
@@ -0,0 +1,232 @@
+"""
+Geodesic flow on X(5) = H/Gamma(5)
+Many geodesics advanced crossing by crossing through the modular triangle, cutting sequences and closed orbits
+"""
+
+import numpy as np
+
+from src.core import a5
+from src.core.geometry import hyperbolic_distance
+from src.core.mathematics import PHI
+from src.core.tiling import S, T, T_INV, a5_index
+
+# Sides of F, in the order of their codes, and the generator s for which
+# crossing the side enters the neighbouring triangle sF
+SIDES = ('right', 'left', 'arc')
+SIDE_GENERATORS = (T, T_INV, S)
+LOG_PHI = np.log(PHI)
+
+
+def _generator_elements():
+    """A5 element index of each side generator, for the coset update"""
+    words = list(a5.load_tables()['words'])
+    t = words.index('T')
+    return np.array([t, a5.load_tables()['inverse'][t], words.index('S')])
+
+
+def random_geodesics(n, seed=None):
+    """
+    n unit tangent vectors distributed by the Liouville measure: points of
+    F with density 1/y^2, uniform directions and uniform copies (cosets)
+    of F in X(5). Returns the geodesics as endpoints (u backward, v
+    forward) on the real line, the starting points and the cosets.
+    """
+    rng = np.random.default_rng(seed)
+    b_min = np.sqrt(3) / 2
+    x = np.empty(0)
+    while len(x) < n:
+        # x has weight 1 / b(x), the integral of 1/y^2 above the arc
+        cand = rng.uniform(-0.5, 0.5, 2 * n)
+        x = np.concatenate([x, cand[rng.random(2 * n) < b_min / np.sqrt(1 - cand**2)]])
+    x = x[:n]
+    y = np.sqrt(1 - x**2) / (1 - rng.random(n))
+    theta = rng.uniform(0, 2 * np.pi, n)
+    centre = x + y * np.tan(theta)
+    radius = np.hypot(x - centre, y)
+    forward = np.sign(np.cos(theta))
+    return {'u': centre - forward * radius, 'v': centre + forward * radius,
+            'z': x + 1j * y, 'coset': rng.integers(0, a5.ORDER, n)}
+
+
+def _exits(u, v, z):
+    """
+    First boundary point of F ahead of z on each geodesic u -> v: the side
+    index and the point. Progress along a semicircle is its real part,
+    increasing or decreasing with the direction of travel.
+    """
+    centre, radius = (u + v) / 2, np.abs(v - u) / 2
+    direction = np.sign(v - u)
+    start = z.real * direction
+    best = np.full(len(u), np.inf)
+    side = np.full(len(u), -1)
+    point = np.full(len(u), np.nan + 0j)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        arc_x = (1 + centre**2 - radius**2) / (2 * centre)
+        candidates = [
+            (0.5, radius**2 - (0.5 - centre)**2, 0.75),       # right side, above rho + 1
+            (-0.5, radius**2 - (-0.5 - centre)**2, 0.75),     # left side, above rho
+            (arc_x, 1 - arc_x**2, None),                      # the arc |z| = 1
+        ]
+        for k, (x, y2, y2_min) in enumerate(candidates):
+            x = np.broadcast_to(x, u.shape)
+            valid = (y2 > 0) & ((y2 >= y2_min) if y2_min is not None else (np.abs(x) <= 0.5))
+            progress = x * direction
+            ahead = valid & (progress > start + 1e-12) & (progress < best)
+            best = np.where(ahead, progress, best)
+            side = np.where(ahead, k, side)
+            point = np.where(ahead, x + 1j * np.sqrt(np.where(valid, y2, 0)), point)
+    return side, point
+
+
+def flow(geodesics, crossings=256):
+    """
+    Follow every geodesic through `crossings` sides of F. At each crossing
+    the geodesic is mapped back into F by the side's generator (a Moebius
+    map of its endpoints, exact up to rounding) and the copy of F it
+    entered is tracked in A5, so this is the flow on X(5), not just on the
+    modular surface. All trajectories advance in lockstep.
+
+    Returns codes (n, crossings) uint8 = side * 60 + coset entered, the
+    hyperbolic length of every segment, and a mask of trajectories that
+    stayed regular (nearly vertical geodesics are dropped).
+    """
+    u, v = np.array(geodesics['u'], dtype=float), np.array(geodesics['v'], dtype=float)
+    z = np.array(geodesics['z'], dtype=complex)
+    coset = np.array(geodesics['coset'], dtype=np.int64)
+    n = len(u)
+    elements = _generator_elements()
+    cayley = a5.load_tables()['cayley'].astype(np.int64)
+    codes = np.zeros((n, crossings), dtype=np.uint8)
+    lengths = np.zeros((n, crossings))
+    alive = np.isfinite(u) & np.isfinite(v)
+
+    for step in range(crossings):
+        side, exit_point = _exits(u, v, z)
+        alive &= side >= 0
+        side = np.where(alive, side, 2)
+        exit_point = np.where(alive, exit_point, 1j)
+        lengths[:, step] = np.where(alive, hyperbolic_distance(z, exit_point), 0)
+        coset = cayley[coset, elements[side]]
+        codes[:, step] = side * a5.ORDER + coset
+
+        # back into F: T^-1 after the right side, T after the left, S after the arc
+        shift = np.where(side == 0, -1.0, np.where(side == 1, 1.0, 0.0))
+        arc = side == 2
+        with np.errstate(divide='ignore'):
+            u = np.where(arc, -1 / u, u + shift)
+            v = np.where(arc, -1 / v, v + shift)
+        z = np.where(arc, -np.conj(exit_point), exit_point + shift)
+        alive &= np.isfinite(u) & np.isfinite(v)
+    return {'codes': codes, 'lengths': lengths, 'alive': alive}
+
+
+def _word_hashes(words):
+    """uint64 polynomial hashes of (k, p) uint8 words"""
+    h = np.zeros(len(words), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for column in words.T:
+            h = h * np.uint64(1099511628211) + column.astype(np.uint64) + np.uint64(1)
+    return h
+
+
+def canonical_hash(words):
+    """Hash of each cyclic word, independent of its starting point: the minimum over rotations"""
+    p = words.shape[1]
+    return np.min(np.stack([_word_hashes(np.roll(words, -r, axis=1)) for r in range(p)]), axis=0)
+
+
+def word_matrix(word):
+    """Integer matrix of a cutting word: the product of its sides' generators"""
+    m = np.eye(2, dtype=np.int64)
+    for code in word:
+        m = m @ SIDE_GENERATORS[code // a5.ORDER]
+    return m
+
+
+def closed_orbits(codes, alive=None, max_period=24):
+    """
+    Closed geodesics shadowed by the trajectories. A block w immediately
+    repeated (w w) in a cutting sequence is a candidate; candidates are
+    deduplicated by a rotation-invariant hash of w (with its cosets, so
+    A5-images of one orbit stay distinct). Each survivor is checked
+    exactly: its generator product g must lie in Gamma(5) and be
+    hyperbolic, and its length is 2 arccosh(|tr g| / 2).
+    """
+    codes = codes if alive is None else codes[alive]
+    # words without an arc crossing are powers of T: cusp windings, parabolic
+    arcs = np.cumsum(np.pad(codes >= 2 * a5.ORDER, ((0, 0), (1, 0))), axis=1, dtype=np.int32)
+    found, counts = {}, {}
+    for p in range(1, max_period + 1):
+        if codes.shape[1] < 2 * p:
+            break
+        same = np.cumsum(np.pad(codes[:, :-p] == codes[:, p:], ((0, 0), (1, 0))), axis=1,
+                         dtype=np.int32)
+        # windows of p consecutive matches: position k starts a repeated block w w
+        repeated = (same[:, p:] - same[:, :-p] == p) & (arcs[:, p:-p] > arcs[:, :-2 * p])
+        rows, starts = np.nonzero(repeated)
+        if not len(rows):
+            continue
+        words = codes[rows[:, None], starts[:, None] + np.arange(p)]
+        words, count = np.unique(words, axis=0, return_counts=True)
+        # primitive words only: no shorter period divides p
+        primitive = np.ones(len(words), dtype=bool)
+        for q in range(1, p):
+            if p % q == 0:
+                primitive &= ~np.all(words == np.roll(words, q, axis=1), axis=1)
+        keys = canonical_hash(words[primitive])
+        for key, word, c in zip(keys.tolist(), words[primitive], count[primitive]):
+            counts[key] = counts.get(key, 0) + int(c)
+            found.setdefault(key, word)
+
+    orbits = []
+    for key, word in found.items():
+        g = word_matrix(word)
+        trace = abs(int(g[0, 0] + g[1, 1]))
+        if trace > 2 and a5_index(g) == 0:
+            orbits.append((2 * np.arccosh(trace / 2), trace, len(word), counts[key], word))
+    orbits.sort(key=lambda o: (o[0], o[2]))
+    return {
+        'length': np.array([o[0] for o in orbits]),
+        'trace': np.array([o[1] for o in orbits], dtype=np.int64),
+        'period': np.array([o[2] for o in orbits], dtype=np.int64),
+        'hits': np.array([o[3] for o in orbits], dtype=np.int64),
+        'words': [o[4] for o in orbits],
+    }
+
+
+def lucas(n):
+    """L_n = phi^n + (-1/phi)^n"""
+    return round(PHI**n + (-1 / PHI)**n)
+
+
+def length_statistics(run, orbits):
+    """
+    Segment and orbit length summaries. An orbit of trace t has length
+    2 ln(lambda) with lambda + 1/lambda = t, so lambda = phi^n exactly when
+    t is the Lucas number L_n: those are the lengths on the phi-power
+    ladder that predict_masses' phi^3, phi^2, phi scaling assumes.
+    """
+    segments = run['lengths'][run['alive']]
+    exponents = orbits['length'] / (2 * LOG_PHI)
+    on_ladder = np.isin(orbits['trace'], [lucas(n) for n in range(2, 40, 2)])
+    spectrum, multiplicity = np.unique(np.round(orbits['length'], 10), return_counts=True)
+    return {
+        'trajectories': int(run['alive'].sum()),
+        'segment_mean': float(segments.mean()),
+        'segment_std': float(segments.std()),
+        'flow_time': float(segments.sum(axis=1).mean()),
+        'orbits': len(orbits['length']),
+        'length_spectrum': spectrum,
+        'multiplicity': multiplicity,
+        'phi_exponent': np.unique(np.round(exponents, 6)),
+        'on_phi_ladder': float(on_ladder.mean()) if len(on_ladder) else float('nan'),
+        # shortest three distinct lengths against ln phi^3 : ln phi^2 : ln phi = 3 : 2 : 1
+        'shortest_ratios': spectrum[:3] / spectrum[0] if len(spectrum) else spectrum,
+    }
+
+
+def simulate(n=100_000, crossings=256, max_period=24, seed=None):
+    """Random geodesics on X(5), their closed orbits and length statistics"""
+    run = flow(random_geodesics(n, seed), crossings)
+    orbits = closed_orbits(run['codes'], run['alive'], max_period)
+    return {'run': run, 'orbits': orbits, 'statistics': length_statistics(run, orbits)}
@@ -0,0 +1,265 @@
+"""
+Laplace-Beltrami spectrum of X(5) = H/Gamma(5)
+P1 finite elements on 60 glued copies of the truncated modular triangle, shift-invert Lanczos
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import LinearOperator, eigsh, splu
+
+from src.core.tiling import coset_representatives, a5_index, normalize, S, T_INV
+
+CUSP_HEIGHT = 4.0       # truncate every cusp at Im z = Y in the triangle's own coordinates
+
+
+class TriangleMesh:
+    """
+    Structured mesh of the modular triangle F cut at Im z = height:
+
+        x = xs[a],  y = b(x) (height / b(x))^ts[c],  b(x) = sqrt(1 - x^2)
+
+    xs is symmetric about 0 and ts runs from 0 (the arc |z| = 1) to 1 (the
+    cut), so the lines in t are uniform in hyperbolic length when ts is.
+    Symmetry in x makes the vertices on F's sides match their images under
+    the side pairings S (the arc) and T (the vertical sides), which is what
+    lets copies of this one mesh be glued into X(5).
+    """
+
+    def __init__(self, xs, ts, height=CUSP_HEIGHT):
+        self.xs, self.ts = np.asarray(xs, dtype=float), np.asarray(ts, dtype=float)
+        if not np.allclose(self.xs, -self.xs[::-1]):
+            raise ValueError("xs must be symmetric about 0")
+        self.height = height
+        base = np.sqrt(1 - self.xs**2)
+        x = np.broadcast_to(self.xs[:, None], (len(self.xs), len(self.ts)))
+        y = base[:, None] * (height / base[:, None])**self.ts[None, :]
+        self.points = np.stack([x, y], axis=-1).reshape(-1, 2)
+
+        # two triangles per cell, diagonals alternating for symmetry
+        na, nc = len(self.xs) - 1, len(self.ts) - 1
+        a, c = np.meshgrid(np.arange(na), np.arange(nc), indexing='ij')
+        v = lambda a, c: a * len(self.ts) + c
+        v00, v10, v01, v11 = v(a, c), v(a + 1, c), v(a, c + 1), v(a + 1, c + 1)
+        flip = (a + c) % 2 == 1
+        first = np.where(flip[..., None], np.stack([v00, v10, v01], -1), np.stack([v00, v10, v11], -1))
+        second = np.where(flip[..., None], np.stack([v10, v11, v01], -1), np.stack([v00, v11, v01], -1))
+        self.triangles = np.stack([first, second], axis=2).reshape(-1, 3)
+        self.cell = np.repeat(np.arange(na * nc), 2)          # cell (a * nc + c) of each triangle
+
+    @classmethod
+    def uniform(cls, n, m, height=CUSP_HEIGHT):
+        """n cells across, m along the cusp (uniform in x and in hyperbolic length)"""
+        return cls(np.linspace(-0.5, 0.5, n + 1), np.linspace(0, 1, m + 1), height)
+
+    def index(self, a, c):
+        return a * len(self.ts) + c
+
+    @property
+    def n_points(self):
+        return len(self.points)
+
+
+def element_matrices(points, triangles):
+    """
+    Local P1 stiffness and mass matrices, (n_triangles, 3, 3) each. The
+    Dirichlet energy is conformally invariant, so the stiffness is the
+    Euclidean one; the mass carries the area density 1/y^2, integrated with
+    the edge-midpoint rule.
+    """
+    p = points[triangles]                                   # (T, 3, 2)
+    edges = p[:, 1:] - p[:, :1]                             # (T, 2, 2)
+    det = edges[:, 0, 0] * edges[:, 1, 1] - edges[:, 0, 1] * edges[:, 1, 0]
+    area = np.abs(det) / 2
+    inv = np.linalg.inv(edges)                              # columns: grads of l1, l2
+    grads = np.concatenate([-inv.sum(axis=2, keepdims=True), inv], axis=2).transpose(0, 2, 1)
+    stiffness = area[:, None, None] * grads @ grads.transpose(0, 2, 1)
+
+    mid = (p + np.roll(p, -1, axis=1)) / 2                  # midpoint k of edge (k, k+1)
+    weight = area[:, None] / 3 / mid[..., 1]**2             # (T, 3)
+    # phi_i is 1/2 at the midpoints of the two edges touching vertex i
+    touch = 0.5 * np.array([[1, 0, 1], [1, 1, 0], [0, 1, 1]])   # [vertex, midpoint]
+    mass = np.einsum('ik,tk,jk->tij', touch, weight, touch)
+    return stiffness, mass, grads, area
+
+
+def glue(mesh):
+    """
+    Global vertex numbers for the 60 copies: (60, n_points) array. Copy i is
+    the triangle r_i F for the coset representative r_i; a vertex p on the
+    side of F shared with sF is identified with s^-1 p in copy j, where r_j
+    represents r_i s in PSL(2,Z)/Gamma(5). The union-find over these
+    identifications is one connected_components call.
+    """
+    reps = coset_representatives()
+    n_tiles, n_pts = len(reps), mesh.n_points
+    na, nc = len(mesh.xs) - 1, len(mesh.ts) - 1
+    tiles = np.arange(n_tiles)
+    rows, cols = [], []
+
+    # left side x = -1/2 of copy i is the right side x = 1/2 of copy j, r_j ~ r_i T^-1
+    j = a5_index(normalize(reps @ T_INV)).astype(np.int64)
+    c = np.arange(nc + 1)
+    rows.append((tiles[:, None] * n_pts + mesh.index(0, c)).ravel())
+    cols.append((j[:, None] * n_pts + mesh.index(na, c)).ravel())
+
+    # the arc of copy i is the arc of copy j, r_j ~ r_i S, reflected (S: z -> -1/z)
+    j = a5_index(normalize(reps @ S)).astype(np.int64)
+    a = np.arange(na + 1)
+    rows.append((tiles[:, None] * n_pts + mesh.index(a, 0)).ravel())
+    cols.append((j[:, None] * n_pts + mesh.index(na - a, 0)).ravel())
+
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    n = n_tiles * n_pts
+    graph = sp.coo_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    return labels.reshape(n_tiles, n_pts)
+
+
+def assemble(mesh):
+    """Global stiffness and mass matrices (CSR) and the vertex numbering"""
+    stiffness, mass, _, _ = element_matrices(mesh.points, mesh.triangles)
+    numbering = glue(mesh)
+    dofs = numbering[:, mesh.triangles]                     # (60, T, 3)
+    rows = np.broadcast_to(dofs[..., :, None], dofs.shape + (3,)).ravel()
+    cols = np.broadcast_to(dofs[..., None, :], dofs.shape + (3,)).ravel()
+    n = int(numbering.max()) + 1
+    K = sp.coo_matrix((np.broadcast_to(stiffness, dofs.shape + (3,)).ravel(), (rows, cols)),
+                      shape=(n, n)).tocsr()
+    M = sp.coo_matrix((np.broadcast_to(mass, dofs.shape + (3,)).ravel(), (rows, cols)),
+                      shape=(n, n)).tocsr()
+    return K, M, numbering
+
+
+def multiplets(eigenvalues, rtol=1e-6):
+    """Group sorted eigenvalues into (value, multiplicity) within a relative tolerance"""
+    groups = []
+    for lam in np.sort(eigenvalues):
+        if groups and abs(lam - groups[-1][0]) <= rtol * max(abs(lam), 1.0):
+            value, count = groups[-1]
+            groups[-1] = ((value * count + lam) / (count + 1), count + 1)
+        else:
+            groups.append((lam, 1))
+    return groups
+
+
+class LaplaceSpectrum:
+    """
+    K u = lambda M u by shift-invert Lanczos. The sparse LU of K - sigma M
+    is kept per shift, so asking again near a shift (more eigenvalues, the
+    eigenvectors, a sweep passing the same point) does not refactorize.
+    """
+
+    def __init__(self, K, M):
+        self.K, self.M = K.tocsc(), M.tocsc()
+        self.factors = {}
+
+    def operator(self, sigma):
+        if sigma not in self.factors:
+            # minimum degree on A^T + A suits the symmetric pattern (far less fill than COLAMD)
+            self.factors[sigma] = splu(self.K - sigma * self.M, permc_spec='MMD_AT_PLUS_A')
+        lu = self.factors[sigma]
+        return LinearOperator(self.K.shape, matvec=lu.solve, dtype=float)
+
+    def near(self, sigma, k=24, vectors=False, tol=1e-10):
+        """The k eigenpairs closest to sigma, ascending"""
+        values, modes = eigsh(self.K, k, self.M, sigma=sigma, OPinv=self.operator(sigma),
+                              tol=tol)
+        order = np.argsort(values)
+        return (values[order], modes[:, order]) if vectors else values[order]
+
+    def lowest(self, n, k=24, sigma=-0.1, rtol=1e-6, vectors=False):
+        """
+        The n lowest eigenvalues, sweeping shifts upward. A shift's k values
+        cover every eigenvalue within r (their largest distance from the
+        shift) except possibly at r itself; only values inside that
+        disc are accepted and the next shift starts at its upper edge, so
+        multiplets are never split between windows.
+        """
+        values, modes, done = [], [], -np.inf
+        while len(values) < n:
+            lam, vec = self.near(sigma, k, vectors=True)
+            radius = np.abs(lam - sigma).max()
+            top = sigma + radius - rtol * max(1.0, abs(sigma) + radius)
+            keep = (lam > done) & (lam < top)
+            if not keep.any() and top <= done:
+                raise RuntimeError(f"no progress at shift {sigma}; increase k")
+            values.extend(lam[keep])
+            modes.append(vec[:, keep])
+            done, sigma = top, top
+        order = np.argsort(values)[:n]
+        values = np.asarray(values)[order]
+        return (values, np.concatenate(modes, axis=1)[:, order]) if vectors else values
+
+
+def error_indicator(mesh, numbering, modes):
+    """
+    Zienkiewicz-Zhu indicator per triangle of the reference mesh: the energy
+    of the difference between the P1 gradient and its area-weighted vertex
+    average, summed over the 60 copies and the (M-normalized) modes.
+    Recovery uses each copy's own elements, in that copy's coordinates.
+    """
+    _, _, grads, area = element_matrices(mesh.points, mesh.triangles)
+    weight = np.bincount(mesh.triangles.ravel(), np.repeat(area, 3), mesh.n_points)
+    # vertex <- triangle averaging operator
+    average = sp.csr_matrix((np.repeat(area, 3), (mesh.triangles.ravel(),
+                             np.repeat(np.arange(len(area)), 3))),
+                            shape=(mesh.n_points, len(area)))
+    average = sp.diags(1 / weight) @ average
+    indicator = np.zeros(len(area))
+    for u in modes.T:                                       # one mode at a time bounds memory
+        g = np.einsum('tid,kti->tkd', grads, u[numbering[:, mesh.triangles]])
+        recovered = (average @ g.reshape(len(area), -1)).reshape(mesh.n_points, *g.shape[1:])
+        diff = recovered[mesh.triangles] - g[:, None]       # (T, 3, 60, 2)
+        indicator += area * np.einsum('tikd,tikd->t', diff, diff) / 3
+    return indicator
+
+
+def regrade(mesh, indicator, n, m, blend=0.5):
+    """
+    A new tensor mesh with n x m cells whose lines equidistribute the
+    indicator's column and row densities (blended with uniform spacing so
+    no cell collapses); symmetric in x like the old one.
+    """
+    na, nc = len(mesh.xs) - 1, len(mesh.ts) - 1
+    cells = np.bincount(mesh.cell, indicator, na * nc).reshape(na, nc)
+
+    def spacing(old, density, cells_new):
+        width = np.diff(old)
+        # P1 error per cell ~ h^2: equidistribute density^(1/2) per unit length
+        d = np.sqrt(np.maximum(density, 0) / width)
+        d = blend * d / max(d.mean(), 1e-300) + (1 - blend)
+        cumulative = np.concatenate([[0], np.cumsum(d * width)])
+        return np.interp(np.linspace(0, cumulative[-1], cells_new + 1), cumulative, old)
+
+    density_x = cells.sum(axis=1)
+    xs = spacing(mesh.xs, density_x + density_x[::-1], n)
+    xs = (xs - xs[::-1]) / 2                                # exact symmetry
+    ts = spacing(mesh.ts, cells.sum(axis=0), m)
+    return TriangleMesh(xs, ts, mesh.height)
+
+
+def hyperbolic_spectrum(n_eigs=20, n=16, m=16, height=CUSP_HEIGHT, refinements=2,
+                        factor=2.0, k=24):
+    """
+    The n_eigs lowest eigenvalues of -Delta on X(5) with the cusps cut at
+    `height` (Neumann), on a mesh refined `refinements` times: each round
+    multiplies the cells per direction by `factor` and grades them by the
+    error indicator of the previous round's modes.
+
+    Returns the eigenvalues of every round, the final multiplets (which
+    should have the A5 irrep dimensions 1, 3, 4, 5) and the mesh sizes.
+    """
+    mesh = TriangleMesh.uniform(n, m, height)
+    rounds = []
+    for level in range(refinements + 1):
+        K, M, numbering = assemble(mesh)
+        values, modes = LaplaceSpectrum(K, M).lowest(n_eigs, k, vectors=True)
+        rounds.append({'dof': K.shape[0], 'cells': (len(mesh.xs) - 1, len(mesh.ts) - 1),
+                       'eigenvalues': values})
+        if level < refinements:
+            n, m = int(round(n * factor)), int(round(m * factor))
+            mesh = regrade(mesh, error_indicator(mesh, numbering, modes), n, m)
+    return {'eigenvalues': rounds[-1]['eigenvalues'],
+            'multiplets': multiplets(rounds[-1]['eigenvalues']),
+            'rounds': rounds, 'height': height}
@@ -0,0 +1,254 @@
+"""
+Tilings of the hyperbolic plane by Gamma(5)
+Modular triangles from a breadth-first search over PSL(2,Z) words, grouped into Gamma(5) domains
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from src.core import a5
+
+# PSL(2,Z) generators over the integers; S and T reduce mod 5 to a5.GENERATORS
+S = np.array([[0, -1], [1, 0]], dtype=np.int64)
+T = np.array([[1, 1], [0, 1]], dtype=np.int64)
+T_INV = np.array([[1, -1], [0, 1]], dtype=np.int64)
+
+# Vertices of the modular triangle F: rho, rho + 1 and the cusp at infinity
+RHO = complex(-0.5, np.sqrt(3) / 2)
+VERTICES = np.array([RHO, RHO + 1, np.inf])
+# Edges of F as vertex pairs, with the generator s for which F and sF share the edge
+EDGES = ((0, 1), (1, 2), (0, 2))
+EDGE_NEIGHBOURS = (S, T, T_INV)
+
+_HASH = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+                  0xD6E8FEB86659FD93], dtype=np.uint64)
+
+
+def normalize(m):
+    """Representatives in PSL(2,Z): the sign with c > 0, or c == 0 and d > 0"""
+    m = np.asarray(m, dtype=np.int64)
+    c, d = m[..., 1, 0], m[..., 1, 1]
+    flip = (c < 0) | ((c == 0) & (d < 0))
+    return np.where(flip[..., None, None], -m, m)
+
+
+def matrix_hash(m):
+    """uint64 keys of normalized integer matrices (..., 2, 2)"""
+    flat = m.reshape(m.shape[:-2] + (4,)).astype(np.uint64)
+    with np.errstate(over='ignore'):
+        h = (flat * _HASH).sum(axis=-1, dtype=np.uint64)
+        return h ^ (h >> np.uint64(29))
+
+
+def inverse(m):
+    """Inverse in SL(2,Z): [[d, -b], [-c, a]]"""
+    out = np.empty_like(m)
+    out[..., 0, 0], out[..., 1, 1] = m[..., 1, 1], m[..., 0, 0]
+    out[..., 0, 1], out[..., 1, 0] = -m[..., 0, 1], -m[..., 1, 0]
+    return out
+
+
+def lift(word):
+    """Integer matrix of a word in 'S' and 'T'"""
+    m = np.eye(2, dtype=np.int64)
+    for letter in word:
+        m = m @ (S if letter == 'S' else T)
+    return m
+
+
+@lru_cache(maxsize=None)
+def coset_representatives():
+    """
+    One integer lift of every element of PSL(2,5) = PSL(2,Z) / Gamma(5), in
+    the order of a5's element table: (60, 2, 2). The union of their images
+    of F is a fundamental domain of Gamma(5), connected because each word
+    extends a shorter one by one generator.
+    """
+    return normalize(np.array([lift(w) for w in a5.load_tables()['words']]))
+
+
+@lru_cache(maxsize=None)
+def _mod5_lookup():
+    """Element index of every 2x2 matrix mod 5 (encoded base 5), -1 off SL(2,5)"""
+    lookup = np.full(5**4, -1, dtype=np.int8)
+    weights = np.array([125, 25, 5, 1])
+    for i, m in enumerate(a5.load_tables()['elements'].astype(int)):
+        for sign in (1, -1):
+            lookup[(sign * m.reshape(4) % 5) @ weights] = i
+    return lookup
+
+
+def a5_index(m):
+    """Image of integer matrices in PSL(2,5), as indices into a5's elements"""
+    codes = (m.reshape(m.shape[:-2] + (4,)) % 5) @ np.array([125, 25, 5, 1])
+    return _mod5_lookup()[codes]
+
+
+def domain_keys(m):
+    """
+    Hash of the Gamma(5) element gamma with m = gamma r, r the coset
+    representative of m: equal keys mean the triangles mF lie in the same
+    image gamma D of the fundamental domain.
+    """
+    reps = coset_representatives()
+    return matrix_hash(normalize(m @ inverse(reps[a5_index(m)])))
+
+
+def apply(m, z):
+    """Moebius action of (..., 2, 2) matrices on points of the upper half-plane or inf"""
+    a, b, c, d = (m[..., i, j].astype(float) for i, j in ((0, 0), (0, 1), (1, 0), (1, 1)))
+    z = np.asarray(z, dtype=complex)
+    at_inf = np.isinf(z.real)
+    finite = np.where(at_inf, 0, z)
+    cusp = np.where(c == 0, complex(np.inf), a / np.where(c == 0, 1, c))
+    with np.errstate(divide='ignore', invalid='ignore'):   # rows that are replaced by cusps
+        return np.where(at_inf, cusp, (a * finite + b) / (c * finite + d))
+
+
+@lru_cache(maxsize=None)
+def side_pairings():
+    """
+    The elements of Gamma(5) carrying D onto its neighbours, one per pair of
+    glued boundary edges: g = m s r^-1 for a triangle m of D, an edge
+    generator s with m s outside D and r the representative of m s. They
+    come in inverse pairs and generate Gamma(5).
+    """
+    reps = coset_representatives()
+    inside = matrix_hash(reps)
+    pairings = []
+    for s in EDGE_NEIGHBOURS:
+        neighbour = normalize(reps @ s)
+        neighbour = neighbour[~np.isin(matrix_hash(neighbour), inside)]
+        pairings.append(normalize(neighbour @ inverse(reps[a5_index(neighbour)])))
+    pairings = np.concatenate(pairings)
+    _, first = np.unique(matrix_hash(pairings), return_index=True)
+    return pairings[np.sort(first)]
+
+
+@lru_cache(maxsize=None)
+def _domain_points():
+    """Vertices of the triangles of D (cusps included), the points sized by domain_size"""
+    return np.unique(apply(coset_representatives()[:, None], VERTICES).ravel())
+
+
+def domain_size(g):
+    """Euclidean diameter bound of the domains gD in the Poincare disk"""
+    w = disk_point(apply(g[:, None], _domain_points()))
+    return np.maximum(np.ptp(w.real, axis=1), np.ptp(w.imag, axis=1))
+
+
+def domains(depth, min_size=None):
+    """
+    Breadth-first search over words in the side pairings of length <= depth:
+    the distinct elements g of Gamma(5) (normalized in PSL(2,Z)), so the
+    images gD, with their word lengths. Each level is one batched product
+    and duplicates are removed by matrix_hash. With `min_size`, domains
+    smaller than that in the disk are dropped and not expanded further,
+    which keeps deep searches to what can be seen.
+    """
+    gens = side_pairings()
+    frontier = np.eye(2, dtype=np.int64)[None]
+    seen = matrix_hash(frontier)
+    found, lengths = [frontier], [np.zeros(1, dtype=np.int64)]
+    for level in range(1, depth + 1):
+        new = normalize(np.einsum('nij,gjk->ngik', frontier, gens).reshape(-1, 2, 2))
+        keys, first = np.unique(matrix_hash(new), return_index=True)
+        fresh = ~np.isin(keys, seen)
+        frontier, keys = new[first[fresh]], keys[fresh]
+        if min_size is not None:
+            large = domain_size(frontier) >= min_size
+            frontier, keys = frontier[large], keys[large]
+        if not len(frontier):
+            break
+        seen = np.concatenate([seen, keys])
+        found.append(frontier)
+        lengths.append(np.full(len(frontier), level))
+    return np.concatenate(found), np.concatenate(lengths)
+
+
+def tiling(depth, min_size=None):
+    """
+    The images gD of the fundamental domain up to word depth `depth`, split
+    into their modular triangles, and the triangle edges, each edge once.
+
+    Returns the domain elements and word lengths, every triangle's matrix
+    and domain index, and the edges as endpoint arrays z1, z2 with a flag
+    marking those on the boundary between two domains (the Gamma(5) tiling
+    proper; the others subdivide it into modular triangles) and another for
+    the outline of D itself.
+    """
+    elements, lengths = domains(depth, min_size)
+    reps = coset_representatives()
+    tiles = normalize(elements[:, None] @ reps[None]).reshape(-1, 2, 2)
+    domain = np.repeat(np.arange(len(elements)), len(reps))
+    keys = matrix_hash(tiles)
+    own_domain = matrix_hash(elements)[domain]
+    vertices = apply(tiles[:, None], VERTICES)                   # (n, 3)
+
+    base = matrix_hash(np.eye(2, dtype=np.int64))
+    z1, z2, boundary, outline = [], [], [], []
+    for (i, j), s in zip(EDGES, EDGE_NEIGHBOURS):
+        neighbour = normalize(tiles @ s)
+        nkeys = matrix_hash(neighbour)
+        # an edge belongs to the triangle with the smaller key unless the
+        # neighbour is outside the search
+        own = (keys < nkeys) | ~np.isin(nkeys, keys)
+        z1.append(vertices[own, i])
+        z2.append(vertices[own, j])
+        other = domain_keys(neighbour[own])
+        boundary.append(own_domain[own] != other)
+        outline.append(boundary[-1] & ((own_domain[own] == base) | (other == base)))
+    return {
+        'elements': elements,
+        'lengths': lengths,
+        'matrices': tiles,
+        'domain': domain,
+        'z1': np.concatenate(z1),
+        'z2': np.concatenate(z2),
+        'boundary': np.concatenate(boundary),
+        'outline': np.concatenate(outline),
+    }
+
+
+def geodesic_arcs(z1, z2, n=16, y_max=10.0):
+    """
+    Points along the geodesics from z1 to z2 in the upper half-plane,
+    (n_arcs, n, 2). Semicircles are sampled uniformly in angle; vertical
+    geodesics (equal real parts or an endpoint at infinity, cut at y_max)
+    uniformly in log y, i.e. in hyperbolic length.
+    """
+    z1, z2 = np.asarray(z1, dtype=complex), np.asarray(z2, dtype=complex)
+    # put the point at infinity, if any, second
+    swap = np.isinf(z1.real)
+    z1, z2 = np.where(swap, z2, z1), np.where(swap, z1, z2)
+    to_inf = np.isinf(z2.real)
+    z2 = np.where(to_inf, z1.real + 1j * np.maximum(y_max, z1.imag), z2)
+    vertical = to_inf | np.isclose(z1.real, z2.real, rtol=0, atol=1e-12)
+
+    t = np.linspace(0, 1, n)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centre = (np.abs(z1)**2 - np.abs(z2)**2) / (2 * (z1.real - z2.real))
+    centre = np.where(vertical, 0, centre)
+    radius = np.abs(z1 - centre)
+    a1, a2 = np.angle(z1 - centre), np.angle(z2 - centre)
+    arc = centre[:, None] + radius[:, None] * np.exp(1j * (a1[:, None] + (a2 - a1)[:, None] * t))
+
+    y1, y2 = np.log(z1.imag), np.log(np.maximum(z2.imag, 1e-12))   # z2 may be a cusp
+    line = z1.real[:, None] + 1j * np.exp(y1[:, None] + (y2 - y1)[:, None] * t)
+    points = np.where(vertical[:, None], line, arc)
+    return np.stack([points.real, points.imag], axis=-1)
+
+
+def disk_point(z):
+    """Cayley map z -> (z - i) / (z + i) of half-plane points, inf -> 1"""
+    z = np.asarray(z, dtype=complex)
+    at_inf = np.isinf(z.real)
+    finite = np.where(at_inf, 0, z)
+    return np.where(at_inf, 1, (finite - 1j) / (finite + 1j))
+
+
+def to_disk(points):
+    """Cayley map of (..., 2) half-plane points to the Poincare disk"""
+    w = disk_point(points[..., 0] + 1j * points[..., 1])
+    return np.stack([w.real, w.imag], axis=-1)
@@ -0,0 +1,81 @@
+"""
+Optimizer checkpoints
+Full run state as one .npz, replaced atomically, and resumed only by a run with the same settings
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_DIR = Path(__file__).resolve().parents[2] / 'data' / 'checkpoints'
+
+
+def save_state(path, state):
+    """Write the state next to `path`, then atomically replace it"""
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, 'wb') as f:
+        np.savez(f, **state)
+    os.replace(tmp, path)
+
+
+def load_state(path, config):
+    """
+    The state saved at `path` as a dict of arrays, or None if there is none.
+    `config` is the JSON string of the settings the state depends on; a
+    checkpoint written under other settings is refused, not silently reused.
+    """
+    if path is None or not Path(path).exists():
+        return None
+    with np.load(path) as saved:
+        if str(saved['config']) != config:
+            raise ValueError(f"{path} was written by a run with other settings")
+        return {k: saved[k] for k in saved.files}
+
+
+def rng_state(rng):
+    return json.dumps(rng.bit_generator.state)
+
+
+def restore_rng(rng, state):
+    rng.bit_generator.state = json.loads(str(state))
+    return rng
+
+
+def checkpoint_path(run_id, name=None, directory=DEFAULT_DIR):
+    """<directory>/<run_id>[-<name>].npz, creating the directory"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / (f"{run_id}-{name}.npz" if name else f"{run_id}.npz")
+
+
+class Checkpointer:
+    """
+    Wall-clock throttle around save_state: `maybe_save` writes at most once
+    every `every` seconds, so the I/O stays negligible next to the run.
+    Without a path it does nothing.
+    """
+
+    def __init__(self, path, config, every=60.0):
+        self.path = None if path is None else Path(path)
+        self.config = config
+        self.every = every
+        self.last = time.monotonic()
+
+    def load(self):
+        return load_state(self.path, self.config)
+
+    def due(self):
+        return self.path is not None and time.monotonic() - self.last >= self.every
+
+    def save(self, state):
+        if self.path is not None:
+            save_state(self.path, {'config': self.config, **state})
+            self.last = time.monotonic()
+
+    def maybe_save(self, state_fn):
+        """state_fn() builds the state only when a save is due"""
+        if self.due():
+            self.save(state_fn())
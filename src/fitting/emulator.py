@@ -0,0 +1,301 @@
+"""
+Surrogate emulator
+Gaussian process on a quadratic trend, fitted to true objective values and refined where unsure
+"""
+
+import numpy as np
+from scipy.linalg import cho_solve, cholesky, solve_triangular
+from scipy.optimize import minimize
+from scipy.stats import qmc
+
+from src.fitting.sampling import log_posterior, stretch_sampler
+from src.fitting.scan import random_scan
+
+TRANSFORMS = {             # objective -> modelled value, and back
+    'log1p': (np.log1p, np.expm1),
+    'identity': (lambda y: y, lambda y: y),
+}
+PREDICT_CHUNK = 10_000     # candidate rows per kernel block (n_train floats each)
+
+
+def quadratic_features(u):
+    """1, u_i and u_i u_j (i <= j) of centred unit coordinates, (..., 1 + d + d(d+1)/2)"""
+    c = 2 * u - 1
+    i, j = np.triu_indices(u.shape[-1])
+    return np.concatenate([np.ones(u.shape[:-1] + (1,)), c, c[..., i] * c[..., j]], axis=-1)
+
+
+class GaussianProcess:
+    """
+    Squared-exponential GP with one length scale per input (ARD), a signal
+    variance and a nugget, on top of a least-squares quadratic trend: the
+    chi^2 of a well-measured model is close to quadratic near its minimum,
+    so the GP only has to learn what the quadratic misses. Hyperparameters
+    maximize the marginal likelihood (L-BFGS-B, analytic gradient).
+    """
+
+    def __init__(self, ridge=1e-8):
+        self.ridge = ridge
+
+    def _kernel(self, a, b):
+        a, b = a / self.length, b / self.length
+        sq = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2 * a @ b.T
+        return self.signal * np.exp(-0.5 * np.maximum(sq, 0))
+
+    def _trend(self, u, y):
+        phi = quadratic_features(u)
+        if len(y) <= phi.shape[1]:         # too few points for a quadratic: constant trend
+            phi = phi[:, :1]
+        gram = phi.T @ phi + self.ridge * len(y) * np.eye(phi.shape[1])
+        return np.linalg.solve(gram, phi.T @ y), phi.shape[1]
+
+    def _nll(self, theta, sq, r):
+        """Negative log marginal likelihood of the residuals r and its gradient"""
+        n, d = len(r), sq.shape[0]
+        length2, signal, noise = np.exp(2 * theta[:d]), np.exp(theta[d]), np.exp(theta[d + 1])
+        kf = signal * np.exp(-0.5 * np.tensordot(1 / length2, sq, axes=1))
+        try:
+            L = cholesky(kf + noise * np.eye(n), lower=True)
+        except np.linalg.LinAlgError:
+            return 1e25, np.zeros_like(theta)
+        alpha = cho_solve((L, True), r)
+        nll = 0.5 * r @ alpha + np.log(np.diag(L)).sum() + 0.5 * n * np.log(2 * np.pi)
+        inner = np.outer(alpha, alpha) - cho_solve((L, True), np.eye(n))
+        grad = np.empty_like(theta)
+        grad[:d] = -0.5 * np.einsum('ij,kij->k', inner * kf, sq) / length2
+        grad[d] = -0.5 * np.sum(inner * kf)
+        grad[d + 1] = -0.5 * noise * np.trace(inner)
+        return nll, grad
+
+    def fit(self, u, y, restarts=2, seed=None):
+        """Fit the trend and the hyperparameters on unit-box inputs u (n, d)"""
+        self.u = np.asarray(u, dtype=float)
+        y = np.asarray(y, dtype=float)
+        self.beta, self.n_trend = self._trend(self.u, y)
+        r = y - quadratic_features(self.u)[:, :self.n_trend] @ self.beta
+        scale = max(r.var(), 1e-12)
+        n, d = self.u.shape
+        sq = (self.u[None, :, :] - self.u[:, None, :]).transpose(2, 0, 1)**2
+        limits = ([(np.log(1e-3), np.log(1e2))] * d
+                  + [(np.log(scale) - 10, np.log(scale) + 10),
+                     (np.log(scale) - 25, np.log(scale) - 2)])
+        rng = np.random.default_rng(seed)
+        best = None
+        for start in range(restarts + 1):
+            theta0 = np.concatenate([np.full(d, np.log(0.3)) if start == 0 else
+                                     rng.uniform(np.log(0.05), np.log(3.0), d),
+                                     [np.log(scale), np.log(scale) - 12]])
+            res = minimize(self._nll, theta0, args=(sq, r), jac=True, method='L-BFGS-B',
+                           bounds=limits)
+            if best is None or res.fun < best.fun:
+                best = res
+        theta = best.x
+        self.length, self.signal, self.noise = np.exp(theta[:d]), *np.exp(theta[d:])
+        self.L = cholesky(self._kernel(self.u, self.u) + self.noise * np.eye(n), lower=True)
+        self.alpha = cho_solve((self.L, True), r)
+        self.log_likelihood = -float(best.fun)
+        return self
+
+    def predict(self, u, return_std=False):
+        """Posterior mean (and noise-free standard deviation) at unit-box points (m, d)"""
+        u = np.asarray(u, dtype=float)
+        mean = np.empty(len(u))
+        std = np.empty(len(u)) if return_std else None
+        for start in range(0, len(u), PREDICT_CHUNK):
+            block = u[start:start + PREDICT_CHUNK]
+            k = self._kernel(block, self.u)
+            mean[start:start + len(block)] = (quadratic_features(block)[:, :self.n_trend]
+                                              @ self.beta + k @ self.alpha)
+            if return_std:
+                v = solve_triangular(self.L, k.T, lower=True)
+                std[start:start + len(block)] = np.sqrt(
+                    np.maximum(self.signal - np.einsum('ij,ij->j', v, v), 0))
+        return (mean, std) if return_std else mean
+
+
+class Emulator:
+    """
+    Surrogate of an expensive batched objective f (e.g. a Dataset's chi2 for
+    a variant) on a box. Calls to the emulator are cheap predictions; true
+    evaluations of f happen only in `design`, `refine` and `validate`, and
+    are counted. Pinned dimensions (lo == hi) are held fixed.
+
+    `transform` is applied to f before it is modelled. Near a best fit chi^2
+    is close to quadratic, which the trend captures as is; 'log1p' is for
+    boxes wide enough that chi^2 spans orders of magnitude.
+    """
+
+    def __init__(self, f, bounds, transform='identity', seed=None):
+        self.f = f
+        self.bounds = np.asarray(bounds, dtype=float)
+        self.lo, self.width = self.bounds[:, 0], self.bounds[:, 1] - self.bounds[:, 0]
+        self.free = self.width > 0
+        self.forward, self.inverse = TRANSFORMS[transform]
+        self.rng = np.random.default_rng(seed)
+        self.x = np.empty((0, len(self.bounds)))
+        self.y = np.empty(0)
+        self.gp = None
+        self.n_true = 0            # true evaluations used for training
+        self.n_validation = 0      # true evaluations used only to measure the error
+        self.n_surrogate = 0       # points predicted by the surrogate
+
+    def _unit(self, x):
+        free = self.free
+        return (np.asarray(x, dtype=float)[..., free] - self.lo[free]) / self.width[free]
+
+    def _points(self, n):
+        """n scrambled Sobol points in the box (a prefix of a power-of-two design)"""
+        sobol = qmc.Sobol(int(self.free.sum()), seed=self.rng)
+        u = sobol.random_base2(int(np.ceil(np.log2(max(n, 1)))))[:n]
+        x = np.broadcast_to(self.lo, (n, len(self.lo))).copy()
+        x[:, self.free] += u * self.width[self.free]
+        return x
+
+    def add(self, x):
+        """True evaluations at x, added to the training set (no refit)"""
+        x = np.atleast_2d(np.asarray(x, dtype=float))
+        fx = np.asarray(self.f(x), dtype=float)
+        ok = np.isfinite(fx)
+        self.x = np.concatenate([self.x, x[ok]])
+        self.y = np.concatenate([self.y, fx[ok]])
+        self.n_true += len(x)
+        return fx
+
+    def design(self, n):
+        """Space-filling initial design of n true evaluations, then a fit"""
+        self.add(self._points(n))
+        return self.fit()
+
+    def fit(self, restarts=2):
+        self.gp = GaussianProcess().fit(self._unit(self.x), self.forward(self.y), restarts,
+                                        seed=self.rng.integers(2**32))
+        return self
+
+    def predict(self, x, return_std=False):
+        """Mean (and standard deviation) of the transformed objective"""
+        x = np.asarray(x, dtype=float)
+        out = self.gp.predict(self._unit(x.reshape(-1, x.shape[-1])), return_std)
+        self.n_surrogate += int(np.prod(x.shape[:-1]))
+        if return_std:
+            return out[0].reshape(x.shape[:-1]), out[1].reshape(x.shape[:-1])
+        return out.reshape(x.shape[:-1])
+
+    def __call__(self, x):
+        """Emulated objective: a drop-in batched replacement for f"""
+        return self.inverse(self.predict(x))
+
+    def refine(self, candidates, n_add):
+        """
+        Add true evaluations at the `n_add` candidates the surrogate is least
+        sure of, then refit. Picks are greedy in posterior variance with the
+        variance updated after each pick as if it had been observed (a
+        pivoted Cholesky of the posterior covariance), so one batch does not
+        pile up in a single uncertain spot. Returns the chosen points.
+        """
+        candidates = np.asarray(candidates, dtype=float).reshape(-1, len(self.bounds))
+        u = self._unit(candidates)
+        gp = self.gp
+        k = gp._kernel(u, gp.u)
+        v = solve_triangular(gp.L, k.T, lower=True)
+        var = np.maximum(gp.signal - np.einsum('ij,ij->j', v, v), 0)
+        basis, picks = [], []
+        for _ in range(min(n_add, len(candidates))):
+            p = int(np.argmax(var))
+            if var[p] <= gp.noise:
+                break
+            cov = gp._kernel(u, u[p:p + 1])[:, 0] - v.T @ v[:, p]
+            for w in basis:
+                cov -= w * w[p]
+            w = cov / np.sqrt(var[p])
+            basis.append(w)
+            var = np.maximum(var - w**2, 0)
+            picks.append(p)
+        chosen = candidates[picks]
+        if len(chosen):
+            self.add(chosen)
+            self.fit()
+        return chosen
+
+    def validate(self, x=None, n=200):
+        """
+        Emulator error against held-out true evaluations (n fresh Sobol
+        points, or x): RMSE, median and max absolute error of f, the RMSE of
+        the transformed value, and the share of points within 2 sigma.
+        Held-out points are never added to the training set.
+        """
+        x = self._points(n) if x is None else np.atleast_2d(np.asarray(x, dtype=float))
+        truth = np.asarray(self.f(x), dtype=float)
+        self.n_validation += len(x)
+        ok = np.isfinite(truth)
+        mean, std = self.predict(x[ok], return_std=True)
+        err = self.inverse(mean) - truth[ok]
+        z = (mean - self.forward(truth[ok])) / np.maximum(std, 1e-300)
+        return {
+            'n': int(ok.sum()),
+            'rmse': float(np.sqrt(np.mean(err**2))),
+            'median_abs': float(np.median(np.abs(err))),
+            'max_abs': float(np.max(np.abs(err))),
+            'rmse_transformed': float(np.sqrt(np.mean((mean - self.forward(truth[ok]))**2))),
+            'coverage_2sigma': float(np.mean(np.abs(z) <= 2)),
+        }
+
+    def counts(self):
+        return {'true': self.n_true, 'validation': self.n_validation,
+                'surrogate': self.n_surrogate,
+                'ratio': self.n_surrogate / max(self.n_true + self.n_validation, 1)}
+
+
+def emulated_sampling(emulator, x0, rounds=5, n_add=20, n_steps=500, n_walkers=64,
+                      burn=0.5, tol=0.1, seed=None):
+    """
+    Drive the stretch sampler off the emulator, with active learning: after
+    each round the chain's post-burn-in points are the candidates for
+    `refine`, so true evaluations go where the posterior is and the
+    surrogate is unsure. Stops early once the largest chi^2 standard
+    deviation over the candidates is below `tol`. The last round's chain is
+    returned with the per-round history and a held-out check on posterior
+    points taken from the first half of the final chain.
+    """
+    rng = np.random.default_rng(seed)
+    history = []
+    for r in range(rounds):
+        run = stretch_sampler(log_posterior(emulator, emulator.bounds), x0, n_steps=n_steps,
+                              n_walkers=n_walkers, seed=rng.integers(2**32))
+        kept = run['chain'][int(burn * n_steps):].reshape(-1, len(x0))
+        candidates = kept[rng.choice(len(kept), min(len(kept), 4000), replace=False)]
+        mean, std = emulator.predict(candidates, return_std=True)
+        # one standard deviation, mapped back through the transform to chi^2 units
+        chi2_std = float(np.max(np.abs(emulator.inverse(mean + std) - emulator.inverse(mean))))
+        history.append({'round': r, 'true': emulator.n_true, 'max_chi2_std': chi2_std,
+                        'acceptance': float(run['acceptance'].mean())})
+        if chi2_std < tol or r == rounds - 1:
+            break
+        emulator.refine(candidates, n_add)
+        x0 = kept[np.argmax(run['log_prob'][int(burn * n_steps):].reshape(-1))]
+    held_out = run['chain'][:int(burn * n_steps)].reshape(-1, len(x0))
+    check = emulator.validate(held_out[rng.choice(len(held_out), min(len(held_out), 200),
+                                                  replace=False)])
+    return {**run, 'history': history, 'validation': check, 'counts': emulator.counts()}
+
+
+def emulated_scan(emulator, n, top=20, rounds=5, n_add=20, candidates=10, seed=None):
+    """
+    Scan the emulator instead of the objective: each round scans n points
+    of the surrogate, refines it on the most uncertain of the `candidates`
+    x top lowest emulated points, and the final top-K is re-evaluated with
+    the true objective (so the reported values are exact).
+    """
+    rng = np.random.default_rng(seed)
+    history = []
+    for r in range(rounds):
+        result = random_scan(emulator, emulator.bounds, n, top=candidates * top,
+                             seed=int(rng.integers(2**32)))
+        history.append({'round': r, 'true': emulator.n_true,
+                        'best_emulated': float(result['fun'][0])})
+        if r < rounds - 1:
+            emulator.refine(result['x'], n_add)
+    x = result['x'][:top]
+    fx = emulator.add(x)
+    order = np.argsort(fx)
+    return {'x': x[order], 'fun': fx[order], 'history': history,
+            'counts': emulator.counts()}
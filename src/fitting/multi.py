@@ -0,0 +1,163 @@
+"""
+Simultaneous fits against many datasets
+A lockstep Nelder-Mead that advances D independent simplices per batched call
+"""
+
+import json
+
+import numpy as np
+
+from src.fitting.checkpoint import Checkpointer
+from src.models.datasets import stack_datasets
+from src.models.variants import get_variant
+from src.service.progress import NULL
+
+# Standard Nelder-Mead coefficients (as in scipy.optimize)
+RHO, CHI, PSI, SIGMA = 1.0, 2.0, 0.5, 0.5
+
+
+def initial_simplex(x0, nonzdelt=0.05, zdelt=0.00025):
+    """scipy's default simplex around each row of x0, shape (D, n+1, n)"""
+    x0 = np.atleast_2d(np.asarray(x0, dtype=float))
+    D, n = x0.shape
+    sim = np.repeat(x0[:, None, :], n + 1, axis=1)
+    idx = np.arange(n)
+    diag = x0[:, idx]
+    sim[:, idx + 1, idx] = np.where(diag != 0, (1 + nonzdelt) * diag, zdelt)
+    return sim
+
+
+def nelder_mead_batch(f, x0, maxiter=1000, xatol=1e-4, fatol=1e-4, checkpoint=None,
+                      checkpoint_every=60.0, progress=NULL, context=None):
+    """
+    Minimize D independent problems in lockstep.
+
+    f(points, rows) maps points of shape (A, P, n) for the active problems
+    `rows` to values (A, P). Each iteration scores the reflection, expansion
+    and both contractions of every active simplex in one call and picks the
+    Nelder-Mead move per problem; shrinks take a second call only when some
+    simplex needs one. Converged problems drop out of the batch. The moves,
+    the iteration limit and `nit` follow scipy's Nelder-Mead (which counts
+    the initial simplex as iteration 1), so each problem takes the same
+    steps as scipy.optimize.minimize(method='Nelder-Mead') on it.
+
+    With `checkpoint` the simplices, their values and the iteration counts
+    are saved there atomically at most every `checkpoint_every` seconds (and
+    at the end); a rerun with the same x0, tolerances and `context` (what f
+    computes, e.g. dataset fingerprints and variant) resumes from them.
+    `progress` receives start, per-iteration and best-so-far events.
+    """
+    x0 = np.atleast_2d(np.asarray(x0, dtype=float))
+    config = json.dumps({'method': 'nelder-mead-batch', 'x0': x0.tolist(),
+                         'xatol': xatol, 'fatol': fatol, 'context': context})
+    checkpointer = Checkpointer(checkpoint, config, checkpoint_every)
+    saved = checkpointer.load()
+    if saved is None:
+        sim = initial_simplex(x0)
+        D = len(sim)
+        fsim = f(sim, np.arange(D))
+        nit = np.ones(D, dtype=int)
+        converged = np.zeros(D, dtype=bool)
+        it = 1
+
+        order = np.argsort(fsim, axis=1)
+        sim = np.take_along_axis(sim, order[:, :, None], axis=1)
+        fsim = np.take_along_axis(fsim, order, axis=1)
+    else:
+        sim, fsim, nit, converged = (saved[k] for k in ('sim', 'fsim', 'nit', 'converged'))
+        it = int(saved['it'])
+
+    def state():
+        return {'sim': sim, 'fsim': fsim, 'nit': nit, 'converged': converged, 'it': it}
+
+    progress.start(method='nelder-mead-batch', unit='iterations', total=maxiter, done=it,
+                   problems=len(sim))
+
+    while it < maxiter:
+        done = ((np.abs(sim[:, 1:] - sim[:, :1]).max(axis=(1, 2)) <= xatol)
+                & (np.abs(fsim[:, 1:] - fsim[:, :1]).max(axis=1) <= fatol))
+        converged |= done
+        active = np.flatnonzero(~converged)
+        if len(active) == 0:
+            break
+
+        s, fs = sim[active], fsim[active]
+        xbar = s[:, :-1].mean(axis=1)
+        worst = s[:, -1]
+        trial = np.stack([
+            (1 + RHO) * xbar - RHO * worst,                    # reflection
+            (1 + RHO * CHI) * xbar - RHO * CHI * worst,        # expansion
+            (1 + PSI * RHO) * xbar - PSI * RHO * worst,        # outside contraction
+            (1 - PSI) * xbar + PSI * worst,                    # inside contraction
+        ], axis=1)
+        ft = f(trial, active)
+        fr, fe, fc, fcc = ft.T
+
+        best_f, second_worst, worst_f = fs[:, 0], fs[:, -2], fs[:, -1]
+        expand = (fr < best_f) & (fe < fr)
+        reflect = ((fr < best_f) & ~expand) | ((fr >= best_f) & (fr < second_worst))
+        outside = (fr >= second_worst) & (fr < worst_f) & (fc <= fr)
+        inside = (fr >= worst_f) & (fcc < worst_f)
+        shrink = ~(expand | reflect | outside | inside)
+
+        # shrinking rows keep their worst vertex: the shrink contracts the original simplex
+        keep = np.flatnonzero(~shrink)
+        choice = np.select([expand, reflect, outside, inside], [1, 0, 2, 3], 0)[keep]
+        s[keep, -1] = trial[keep, choice]
+        fs[keep, -1] = ft[keep, choice]
+
+        if shrink.any():
+            k = np.flatnonzero(shrink)
+            s[k, 1:] = s[k, :1] + SIGMA * (s[k, 1:] - s[k, :1])
+            fs[k, 1:] = f(s[k, 1:], active[k])
+
+        order = np.argsort(fs, axis=1)
+        sim[active] = np.take_along_axis(s, order[:, :, None], axis=1)
+        fsim[active] = np.take_along_axis(fs, order, axis=1)
+        nit[active] += 1
+        it += 1
+        progress.iteration(done=it, active=len(active), best=fsim[:, 0].min())
+        progress.best(fsim[:, 0].min(), iteration=it, problem=int(np.argmin(fsim[:, 0])))
+        checkpointer.maybe_save(state)
+    checkpointer.save(state())
+    progress.end(done=it, fun=fsim[:, 0], converged=int(converged.sum()))
+
+    return {
+        'x': sim[:, 0],
+        'fun': fsim[:, 0],
+        'nit': nit,
+        'converged': converged,
+        'simplex': sim,
+    }
+
+
+def fit_datasets(datasets, x0=None, maxiter=1000, xatol=1e-4, fatol=1e-4, variant=None,
+                 checkpoint=None, checkpoint_every=60.0, progress=NULL):
+    """
+    Fit the model to every dataset at once.
+
+    `datasets` are names, paths or Dataset objects; `variant` names the mass
+    formula (x0 defaults to its initial guess). Returns a per-dataset table:
+    dataset labels, best-fit vectors, chi^2, iterations, convergence.
+    `checkpoint`, `checkpoint_every` and `progress` are passed to nelder_mead_batch.
+    """
+    stack = stack_datasets(datasets)
+    formula = get_variant(variant)
+    x0 = formula.initial if x0 is None else x0
+    x0 = np.broadcast_to(np.asarray(x0, dtype=float), (len(stack), formula.n_params))
+    context = {'datasets': [d.fingerprint for d in stack.datasets], 'variant': formula.name}
+    result = nelder_mead_batch(lambda points, rows: stack.chi2(points, rows, variant),
+                               x0, maxiter, xatol, fatol, checkpoint, checkpoint_every,
+                               progress, context)
+    result['dataset'] = stack.labels
+    result['variant'] = formula.name
+    return result
+
+
+def format_table(result):
+    """Plain-text table of a fit_datasets result"""
+    lines = [f"{'dataset':<24} {'chi2':>10} {'nit':>6}  conv"]
+    for i, label in enumerate(result['dataset']):
+        lines.append(f"{label:<24} {result['fun'][i]:>10.3f} {result['nit'][i]:>6d}  "
+                     f"{'yes' if result['converged'][i] else 'no'}")
+    return "\n".join(lines)
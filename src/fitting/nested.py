@@ -0,0 +1,227 @@
+"""
+Nested sampling
+Bayesian evidence of model hypotheses with batched live-point replacement
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from src.fitting.checkpoint import Checkpointer, restore_rng, rng_state
+from src.models.datasets import Dataset, dataset_from_spec, load_dataset
+from src.models.variants import get_variant
+
+# Hypotheses as a mass-formula variant ('variant', default phi-321) plus
+# fixed parameter values on top of its prior box. k_3 drops out of m_i/m_3
+# and, with free weights, alpha only rescales k, so those gauge directions
+# are pinned rather than integrated over.
+GAUGE = {'k_u3': 0.0, 'k_d3': 0.0, 'alpha': 1.0}
+HYPOTHESES = {
+    'free-weights': dict(GAUGE),
+    'initial-weights': {'k_u1': 8.0, 'k_u2': 4.0, 'k_u3': 0.0,
+                        'k_d1': 6.0, 'k_d2': 3.0, 'k_d3': 0.0},
+    'exponents-432': {'variant': 'phi-432', **GAUGE},
+    'exponents-531': {'variant': 'phi-531', **GAUGE},
+    'fibonacci-321': {'variant': 'fib-321', **GAUGE},
+}
+
+
+def hypothesis_bounds(fixed, bounds=None):
+    """Prior box of the hypothesis' variant with the parameters in `fixed` pinned (lo == hi)"""
+    fixed = dict(fixed)
+    formula = get_variant(fixed.pop('variant', None))
+    bounds = np.array(formula.bounds if bounds is None else bounds, dtype=float)
+    for name, value in fixed.items():
+        bounds[formula.param_names.index(name)] = value
+    return bounds
+
+
+def _add_weight(log_z, info, log_wt, logl):
+    """Skilling's running update of log Z and the information H for one dead point"""
+    new_log_z = np.logaddexp(log_z, log_wt)
+    if not np.isfinite(log_z):
+        return new_log_z, np.exp(log_wt - new_log_z) * logl - new_log_z
+    return new_log_z, (np.exp(log_wt - new_log_z) * logl
+                       + np.exp(log_z - new_log_z) * (info + log_z) - new_log_z)
+
+
+def nested_sampling(log_likelihood, bounds, n_live=400, batch=40, n_steps=20,
+                    dlogz=0.1, maxiter=100_000, seed=None, checkpoint=None,
+                    checkpoint_every=60.0, context=None):
+    """
+    Evidence Z = int L dpi for a flat prior on the box (pinned dimensions,
+    lo == hi, are held fixed).
+
+    Each iteration retires the `batch` worst live points at once, with the
+    expected shrinkage of sequential removal (log X drops by 1/(n - j) for
+    the j-th), and replaces them by constrained random walks started from
+    surviving live points. The walks move in lockstep, so each of their
+    `n_steps` steps is one batched log_likelihood call on (batch, n_params). The
+    proposal uses the live-point covariance, its scale tuned to the
+    acceptance rate.
+
+    With `checkpoint` the full state (including the RNG) is written there
+    atomically every `checkpoint_every` seconds and once more when the run
+    ends; a run restarted with the same arguments and `context` (what
+    log_likelihood computes, e.g. the dataset fingerprint and variant)
+    resumes from it, and one that had finished only redoes the final tally.
+
+    Returns log Z with its error, the information H, equally weighted
+    posterior samples and the weighted dead points.
+    """
+    bounds = np.asarray(bounds, dtype=float)
+    lo, width = bounds[:, 0], bounds[:, 1] - bounds[:, 0]
+    free = width > 0
+    d = int(free.sum())
+    config = json.dumps({'bounds': bounds.tolist(), 'n_live': n_live, 'batch': batch,
+                         'n_steps': n_steps, 'seed': seed, 'context': context})
+
+    def to_params(u):
+        x = np.broadcast_to(lo, u.shape[:-1] + lo.shape).copy()
+        x[..., free] += u * width[free]
+        return x
+
+    rng = np.random.default_rng(seed)
+    checkpointer = Checkpointer(checkpoint, config, checkpoint_every)
+
+    def state():
+        # fold the per-iteration arrays together so they are not re-joined on every save
+        for parts in (dead_u, dead_logl, dead_logwt):
+            parts[:] = [np.concatenate(parts)]
+        return {'rng': rng_state(rng), 'live_u': live_u, 'live_logl': live_logl,
+                'dead_u': dead_u[0], 'dead_logl': dead_logl[0], 'dead_logwt': dead_logwt[0],
+                'log_x': log_x, 'log_z': log_z, 'info': info, 'scale': scale, 'it': it,
+                'ncall': ncall}
+
+    s = checkpointer.load()
+    if s is not None:
+        restore_rng(rng, s['rng'])
+        live_u, live_logl = s['live_u'], s['live_logl']
+        dead_u, dead_logl, dead_logwt = [s['dead_u']], [s['dead_logl']], [s['dead_logwt']]
+        log_x, log_z, info, scale = map(float, (s['log_x'], s['log_z'], s['info'], s['scale']))
+        it, ncall = int(s['it']), int(s['ncall'])
+    else:
+        live_u = rng.random((n_live, d))
+        live_logl = log_likelihood(to_params(live_u))
+        dead_u, dead_logl, dead_logwt = [np.empty((0, d))], [np.empty(0)], [np.empty(0)]
+        log_x, log_z, info, scale, it, ncall = 0.0, -np.inf, 0.0, 0.5, 0, n_live
+
+    while it < maxiter:
+        # stop once the live points cannot add more than dlogz
+        if np.logaddexp(log_z, live_logl.max() + log_x) - log_z < dlogz:
+            break
+
+        worst = np.argsort(live_logl)[:batch]
+        shrink = 1.0 / (n_live - np.arange(batch))
+        new_log_x = log_x - np.cumsum(shrink)
+        log_dx = np.concatenate([[log_x], new_log_x[:-1]]) + np.log(-np.expm1(-shrink))
+        log_wt = live_logl[worst] + log_dx
+        for lw, ll in zip(log_wt, live_logl[worst]):
+            log_z, info = _add_weight(log_z, info, lw, ll)
+        dead_u.append(live_u[worst])
+        dead_logl.append(live_logl[worst])
+        dead_logwt.append(log_wt)
+        log_x = new_log_x[-1]
+        threshold = live_logl[worst[-1]]
+
+        # constrained random walks from surviving live points
+        survivors = np.setdiff1d(np.arange(n_live), worst)
+        start = rng.choice(survivors, batch)
+        u, logl = live_u[start].copy(), live_logl[start].copy()
+        chol = np.linalg.cholesky(np.cov(live_u[survivors].T).reshape(d, d)
+                                  + 1e-12 * np.eye(d))
+        accepted = 0
+        for _ in range(n_steps):
+            proposal = u + scale * rng.standard_normal((batch, d)) @ chol.T
+            inside = np.all((proposal >= 0) & (proposal <= 1), axis=1)
+            logl_new = np.full(batch, -np.inf)
+            if inside.any():
+                logl_new[inside] = log_likelihood(to_params(proposal[inside]))
+                ncall += int(inside.sum())
+            move = logl_new > threshold
+            u[move], logl[move] = proposal[move], logl_new[move]
+            accepted += int(move.sum())
+        rate = accepted / (batch * n_steps)
+        scale = float(np.clip(scale * np.exp(2.0 * (rate - 0.25)), 1e-3, 2.0))
+        live_u[worst], live_logl[worst] = u, logl
+        it += 1
+        checkpointer.maybe_save(state)
+    checkpointer.save(state())
+
+    # the remaining live points share the final prior volume
+    final_wt = live_logl + log_x - np.log(n_live)
+    for lw, ll in zip(final_wt, live_logl):
+        log_z, info = _add_weight(log_z, info, lw, ll)
+    points = np.concatenate(dead_u + [live_u])
+    logl = np.concatenate(dead_logl + [live_logl])
+    weights = np.exp(np.concatenate(dead_logwt + [final_wt]) - log_z)
+    weights /= weights.sum()
+
+    # systematic resampling to equally weighted posterior draws
+    n_eff = int(1.0 / np.sum(weights**2))
+    positions = (rng.random() + np.arange(n_eff)) / n_eff
+    picks = np.minimum(np.searchsorted(np.cumsum(weights), positions), len(weights) - 1)
+    return {
+        'log_z': log_z,
+        'log_z_err': float(np.sqrt(max(info, 0.0) / n_live)),
+        'information': info,
+        'samples': to_params(points[picks]),
+        'points': to_params(points),
+        'log_likelihood': logl,
+        'weights': weights,
+        'nit': it,
+        'ncall': ncall,
+    }
+
+
+def _run_hypothesis(name, fixed, spec, kwargs):
+    dataset = dataset_from_spec(spec)
+    variant = get_variant(fixed.get('variant')).name
+    run = nested_sampling(lambda x: -0.5 * dataset.chi2(x, variant), hypothesis_bounds(fixed),
+                          context={'dataset': dataset.fingerprint, 'variant': variant},
+                          **kwargs)
+    run['variant'] = variant
+    return name, run
+
+
+def compare_hypotheses(hypotheses=HYPOTHESES, dataset=None, workers=1,
+                       checkpoint_dir=None, **kwargs):
+    """
+    Run nested sampling for every hypothesis ({name: {'variant': ..., fixed
+    values}}), one process each, and rank them by evidence. With `checkpoint_dir` each run
+    checkpoints to <dir>/<name>.npz and resumes from it when rerun.
+
+    dataset is a name, path or Dataset; workers receive its full spec, so
+    none of them has to resolve a name.
+    """
+    dataset = dataset if isinstance(dataset, Dataset) else load_dataset(dataset)
+    spec = dataset.to_spec()
+    jobs = []
+    for i, (name, fixed) in enumerate(hypotheses.items()):
+        job = dict(kwargs)
+        if job.get('seed') is not None:
+            job['seed'] = job['seed'] + i
+        if checkpoint_dir is not None:
+            Path(checkpoint_dir).mkdir(parents=True, exist_ok=True)
+            job['checkpoint'] = str(Path(checkpoint_dir) / f"{name}.npz")
+        jobs.append((name, fixed, spec, job))
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(min(workers, len(jobs))) as pool:
+            runs = dict(pool.map(_run_hypothesis, *zip(*jobs)))
+    else:
+        runs = dict(_run_hypothesis(*job) for job in jobs)
+
+    best = max(r['log_z'] for r in runs.values())
+    return {name: {**run, 'log_bayes_factor': run['log_z'] - best}
+            for name, run in sorted(runs.items(), key=lambda kv: -kv[1]['log_z'])}
+
+
+def format_table(results):
+    lines = [f"{'hypothesis':<20}{'log Z':>12}{'+/-':>8}{'ln B':>10}{'H':>8}{'ncall':>10}"]
+    for name, r in results.items():
+        lines.append(f"{name:<20}{r['log_z']:>12.3f}{r['log_z_err']:>8.3f}"
+                     f"{r['log_bayes_factor']:>10.3f}{r['information']:>8.2f}{r['ncall']:>10d}")
+    return "\n".join(lines)
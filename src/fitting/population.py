@@ -0,0 +1,153 @@
+"""
+Population-based global optimizer
+Differential evolution scoring each generation with one batched objective call
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from scipy.optimize import minimize
+
+from src.fitting.checkpoint import Checkpointer, restore_rng, rng_state
+from src.models.datasets import load_dataset
+from src.models.variants import get_variant
+from src.service.progress import NULL
+
+
+def evaluate_sharded(f, points, executor=None, workers=1):
+    """f(points) in one call, or split into `workers` shards over a process pool"""
+    if executor is None or workers <= 1 or len(points) < 2 * workers:
+        return f(points)
+    shards = np.array_split(points, workers)
+    return np.concatenate(list(executor.map(f, shards)))
+
+
+def _partners(rng, npop):
+    """Three distinct partner indices per member, all different from it"""
+    own = np.arange(npop)
+    r = rng.integers(npop, size=(npop, 3))
+    while True:
+        bad = ((r == own[:, None])
+               | (r[:, [1, 2, 2]] == r[:, [0, 0, 1]]))
+        if not bad.any():
+            return r
+        r[bad] = rng.integers(npop, size=bad.sum())
+
+
+def differential_evolution(f, bounds, popsize=15, maxgen=1000, mutation=(0.5, 1.0),
+                           recombination=0.7, tol=1e-8, atol=0.0, seed=None,
+                           workers=1, checkpoint=None, checkpoint_every=60.0, progress=NULL,
+                           context=None):
+    """
+    DE/rand/1/bin (with dithered mutation) on a batched objective.
+
+    popsize is a multiplier of the dimension, as in scipy. With workers > 1
+    each generation is sharded across a process pool; f must then be
+    picklable (e.g. a Dataset's bound chi2). The result carries the
+    per-generation history of the best and mean objective.
+
+    With `checkpoint` the population, its values, the generation, the
+    history and the RNG state are saved there atomically at most every
+    `checkpoint_every` seconds (and when the run ends). Rerunning with the
+    same settings resumes from it and gives bit-identical results to an
+    uninterrupted run; maxgen may be raised to extend a finished run.
+    `context` (JSON-able, e.g. the dataset fingerprint and variant) names
+    what f computes, so a checkpoint of another objective is refused.
+
+    `progress` (a src.service.progress stream) receives start, per-generation
+    and best-so-far events; the default is silent.
+    """
+    bounds = np.asarray(bounds, dtype=float)
+    lo, hi = bounds[:, 0], bounds[:, 1]
+    n = len(bounds)
+    npop = max(5, popsize * n)
+    rng = np.random.default_rng(seed)
+    config = json.dumps({'method': 'differential-evolution', 'bounds': bounds.tolist(),
+                         'popsize': popsize, 'mutation': mutation,
+                         'recombination': recombination, 'tol': tol, 'atol': atol,
+                         'seed': seed, 'context': context})
+    checkpointer = Checkpointer(checkpoint, config, checkpoint_every)
+    saved = checkpointer.load()
+
+    def state():
+        return {'rng': rng_state(rng), 'pop': pop, 'fit': fit, 'gen': gen, 'nfev': nfev,
+                'done': done, **{f'history_{k}': np.array(v) for k, v in history.items()}}
+
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        if saved is None:
+            pop = lo + rng.random((npop, n)) * (hi - lo)
+            fit = evaluate_sharded(f, pop, executor, workers)
+            nfev, gen, done = npop, 0, False
+            history = {'best': [], 'mean': [], 'std': []}
+        else:
+            restore_rng(rng, saved['rng'])
+            pop, fit = saved['pop'], saved['fit']
+            nfev, gen, done = int(saved['nfev']), int(saved['gen']), bool(saved['done'])
+            history = {k: list(saved[f'history_{k}']) for k in ('best', 'mean', 'std')}
+        progress.start(method='differential-evolution', unit='generations', total=maxgen,
+                       done=gen, npop=npop, workers=workers)
+
+        while not done and gen < maxgen:
+            gen += 1
+            r = _partners(rng, npop)
+            F = rng.uniform(*mutation) if np.ndim(mutation) else mutation
+            mutant = pop[r[:, 0]] + F * (pop[r[:, 1]] - pop[r[:, 2]])
+
+            cross = rng.random((npop, n)) < recombination
+            cross[np.arange(npop), rng.integers(n, size=npop)] = True
+            trial = np.clip(np.where(cross, mutant, pop), lo, hi)
+
+            f_trial = evaluate_sharded(f, trial, executor, workers)
+            nfev += npop
+            better = f_trial <= fit
+            pop[better], fit[better] = trial[better], f_trial[better]
+
+            history['best'].append(fit.min())
+            history['mean'].append(fit.mean())
+            history['std'].append(fit.std())
+            done = fit.std() <= atol + tol * abs(fit.mean())
+            progress.iteration(done=gen, nfev=nfev, best=fit.min(), mean=fit.mean(),
+                               std=fit.std())
+            progress.best(fit.min(), generation=gen, x=pop[np.argmin(fit)])
+            checkpointer.maybe_save(state)
+        checkpointer.save(state())
+        progress.end(done=gen, nfev=nfev, fun=fit.min(), converged=done)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    best = np.argmin(fit)
+    return {
+        'x': pop[best].copy(),
+        'fun': fit[best],
+        'nit': gen,
+        'nfev': nfev,
+        'population': pop,
+        'population_fun': fit,
+        'history': {k: np.array(v) for k, v in history.items()},
+    }
+
+
+def fit_global(dataset=None, bounds=None, polish=True, variant=None, **kwargs):
+    """
+    Global flavor fit: differential evolution over the variant's parameter
+    box, optionally polished with Nelder-Mead from the best member.
+    """
+    dataset = load_dataset() if dataset is None else dataset
+    formula = get_variant(variant)
+    bounds = formula.bounds if bounds is None else bounds
+    # a partial of the bound method stays picklable for worker processes
+    chi2 = partial(dataset.chi2, variant=formula.name)
+    context = {'dataset': dataset.fingerprint, 'variant': formula.name}
+    result = differential_evolution(chi2, bounds, context=context, **kwargs)
+    result['variant'] = formula.name
+    if polish:
+        local = minimize(chi2, result['x'], method='Nelder-Mead',
+                         options={'maxiter': 5000, 'xatol': 1e-8, 'fatol': 1e-10})
+        result['nfev'] += local.nfev
+        if local.fun < result['fun']:
+            result['x'], result['fun'] = local.x, local.fun
+    return result
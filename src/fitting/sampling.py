@@ -0,0 +1,64 @@
+"""
+Ensemble MCMC sampler
+Affine-invariant stretch move with each half-ensemble scored in one batched call
+"""
+
+import numpy as np
+
+
+def log_posterior(chi2, bounds):
+    """Batched log posterior: -chi^2/2 with a flat prior on the box"""
+    bounds = np.asarray(bounds, dtype=float)
+
+    def log_prob(x):
+        inside = np.all((x >= bounds[:, 0]) & (x <= bounds[:, 1]), axis=-1)
+        out = np.full(x.shape[:-1], -np.inf)
+        if inside.any():
+            out[inside] = -0.5 * chi2(x[inside])
+        return out
+
+    return log_prob
+
+
+def stretch_sampler(log_prob, x0, n_steps=2000, n_walkers=64, a=2.0, scale=1e-4,
+                    seed=None):
+    """
+    Goodman-Weare stretch-move ensemble started in a small ball around x0.
+
+    Each half of the ensemble is updated against the other half, so one step
+    costs two vectorized log_prob calls whatever the number of walkers. The
+    move is invariant to parameter scaling, which matters here: the angle and
+    weight directions differ in width by five orders of magnitude.
+    """
+    rng = np.random.default_rng(seed)
+    x0 = np.asarray(x0, dtype=float)
+    n = len(x0)
+    n_walkers += n_walkers % 2
+    walkers = x0 + scale * np.maximum(np.abs(x0), 1e-2) * rng.standard_normal((n_walkers, n))
+    lp = log_prob(walkers)
+
+    chain = np.empty((n_steps, n_walkers, n))
+    log_probs = np.empty((n_steps, n_walkers))
+    accepted = np.zeros(n_walkers)
+    half = n_walkers // 2
+    groups = [np.arange(half), np.arange(half, n_walkers)]
+
+    for step in range(n_steps):
+        for g in range(2):
+            active, other = groups[g], groups[1 - g]
+            z = ((a - 1) * rng.random(half) + 1)**2 / a
+            partners = walkers[other[rng.integers(half, size=half)]]
+            proposal = partners + z[:, None] * (walkers[active] - partners)
+            lp_new = log_prob(proposal)
+            log_accept = (n - 1) * np.log(z) + lp_new - lp[active]
+            accept = np.log(rng.random(half)) < log_accept
+            idx = active[accept]
+            walkers[idx], lp[idx] = proposal[accept], lp_new[accept]
+            accepted[idx] += 1
+        chain[step], log_probs[step] = walkers, lp
+
+    return {
+        'chain': chain,
+        'log_prob': log_probs,
+        'acceptance': accepted / n_steps,
+    }
@@ -0,0 +1,98 @@
+"""
+Chunked parameter scans
+Uniform random scan of a box, keeping the top-K chi^2 minima per chunk
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.service.progress import NULL
+
+
+def merge_top(x_a, f_a, x_b, f_b, top):
+    """Merge two candidate sets, keeping the `top` lowest values (sorted)"""
+    x = np.concatenate([x_a, x_b])
+    f = np.concatenate([f_a, f_b])
+    if len(f) > top:
+        keep = np.argpartition(f, top - 1)[:top]
+        x, f = x[keep], f[keep]
+    order = np.argsort(f)
+    return x[order], f[order]
+
+
+def scan_chunk(f, bounds, size, seed, top, screen=None, threshold=np.inf):
+    """
+    One chunk: `size` uniform points from `seed`, reduced to its top-K.
+
+    With `screen` (float32 points -> (approximate chi^2, bound on the error
+    of its square root), e.g. Dataset.chi2_screen) every point is screened
+    first and only those that can still be in the top-K are evaluated by f
+    in float64. A point is dropped only if its norm minus its bound exceeds
+    the K-th smallest norm plus bound of the chunk (an upper bound on the
+    chunk's true K-th norm) or sqrt(threshold), the caller's running K-th
+    best; so the result is the same as without screening. The points
+    themselves are always drawn in float64.
+    """
+    bounds = np.asarray(bounds, dtype=float)
+    rng = np.random.default_rng(seed)
+    x = bounds[:, 0] + rng.random((size, len(bounds))) * (bounds[:, 1] - bounds[:, 0])
+    if screen is not None and size > top:
+        approx, bound = screen(x.astype(np.float32))
+        norm = np.sqrt(approx, dtype=float)
+        limit = min(np.partition(norm + bound, top - 1)[top - 1], np.sqrt(threshold))
+        x = x[~(norm - bound > limit)]        # NaNs are kept for f to judge
+    fx = f(x)
+    return merge_top(x[:0], fx[:0], x, fx, top)
+
+
+def chunk_seeds(n, chunk, seed=None):
+    """Per-chunk (size, seed) descriptors; chunks are independent and reproducible"""
+    sizes = [chunk] * (n // chunk) + ([n % chunk] if n % chunk else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return list(zip(sizes, seeds))
+
+
+def random_scan(f, bounds, n, chunk=100_000, top=100, seed=None, workers=1,
+                on_chunk=None, screen=None, progress=NULL):
+    """
+    Evaluate f on n uniform points in chunks and return the top-K minima.
+
+    Memory is bounded by one chunk. With workers > 1 chunks run on a process
+    pool (f must be picklable); on_chunk(i, x, fx) sees each chunk's top-K.
+    `screen` enables the two-tier mode of scan_chunk: float32 screening and
+    float64 refinement of the survivors, with the same top-K; serial scans
+    also screen against the running K-th best. `progress` receives start,
+    per-chunk and best-so-far events.
+    """
+    bounds = np.asarray(bounds, dtype=float)
+    best_x = np.empty((0, len(bounds)))
+    best_f = np.empty(0)
+    tasks = chunk_seeds(n, chunk, seed)
+    progress.start(method='random-scan', unit='points', total=n, chunks=len(tasks),
+                   workers=workers, screen=screen is not None)
+    done = 0
+
+    def merge(i, x, fx):
+        nonlocal best_x, best_f, done
+        if on_chunk is not None:
+            on_chunk(i, x, fx)
+        best_x, best_f = merge_top(best_x, best_f, x, fx, top)
+        done += tasks[i][0]
+        progress.chunk(done=done, chunks=i + 1, best=best_f[0] if len(best_f) else None)
+        if len(best_f):
+            progress.best(best_f[0], x=best_x[0])
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = pool.map(scan_chunk, *zip(*[(f, bounds, size, s, top, screen)
+                                                  for size, s in tasks]))
+            for i, (x, fx) in enumerate(results):
+                merge(i, x, fx)
+    else:
+        for i, (size, s) in enumerate(tasks):
+            threshold = best_f[-1] if len(best_f) == top else np.inf
+            merge(i, *scan_chunk(f, bounds, size, s, top, screen, threshold))
+    progress.end(done=done, fun=best_f[:1])
+
+    return {'x': best_x, 'fun': best_f, 'n_evaluated': n, 'n_chunks': len(tasks)}
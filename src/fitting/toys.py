@@ -0,0 +1,42 @@
+"""
+Pseudo-experiments
+Toy datasets drawn around a model point and refitted in lockstep
+"""
+
+import numpy as np
+
+from src.fitting.multi import fit_datasets
+from src.fitting.scan import chunk_seeds
+from src.models.datasets import Dataset, load_dataset
+from src.models.variants import get_variant
+
+
+def toy_datasets(dataset, x_true, size, seed, variant=None):
+    """`size` copies of dataset with central values drawn from N(pred(x_true), C)"""
+    truth = get_variant(variant).predict_observables(np.asarray(x_true, dtype=float))
+    truth = truth[dataset.index]
+    rng = np.random.default_rng(seed)
+    centrals = truth + rng.standard_normal((size, len(truth))) @ dataset.cholesky.T
+    return [Dataset(dataset.name, dataset.observables, c, dataset.covariance,
+                    version=f"{dataset.version}-toy{i}") for i, c in enumerate(centrals)]
+
+
+def toy_chunk(dataset, x_true, size, seed, variant=None, maxiter=2000):
+    """Generate and refit one chunk of toys; returns (best-fit x, chi^2) arrays"""
+    toys = toy_datasets(dataset, x_true, size, seed, variant)
+    fit = fit_datasets(toys, x0=x_true, maxiter=maxiter, variant=variant)
+    return fit['x'], fit['fun']
+
+
+def run_toys(x_true, n, dataset=None, chunk=100, seed=None, variant=None, maxiter=2000):
+    """
+    chi^2 distribution of n toys: each chunk is refitted with one lockstep
+    Nelder-Mead, chunks use the same seeds as the work queue.
+    """
+    dataset = load_dataset() if dataset is None else dataset
+    xs, funs = [], []
+    for size, s in chunk_seeds(n, chunk, seed):
+        x, fun = toy_chunk(dataset, x_true, size, s, variant, maxiter)
+        xs.append(x)
+        funs.append(fun)
+    return {'x': np.concatenate(xs), 'fun': np.concatenate(funs), 'n_toys': n}
@@ -5,12 +5,24 @@ Flavor from H/Gamma(5) geometry with A5 symmetry
 NO UNICODE - Works everywhere!
 """
 
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.optimize import minimize
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+# also runnable as a script (python src/main.py): the repository root must be importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from src.fitting.uncertainty import fit_uncertainties
+from src.models.datasets import load_dataset
+from src.models.parameters import FitResult
+from src.models.variants import get_variant
+from src.plotting.results import plot_results
+from src.storage.results import ResultsStore
+
 print("=" * 80)
 print("HYPERBOLIC FUNHOUSE MIRRORS")
 print("=" * 80)
@@ -24,15 +36,11 @@ print(f"* Fixed point: tau0 = e^(2pi i/5) = {np.exp(2j*np.pi/5):.3f}")
 # ====================== PART 2: MASS FORMULA ======================
 print("\n[2/9] MASS FORMULA")
 
+MASS_FORMULA = get_variant('phi-321')
+
 def predict_masses(k, L0, alpha=1.0):
     """m_i = phi^{-k_i} * exp(-phi^{n_i} * L0)"""
-    gen_scaling = [PHI**3, PHI**2, PHI**1]
-    masses = []
-    for i, (ki, phi_n) in enumerate(zip(k, gen_scaling)):
-        prefactor = PHI**(-ki * alpha)
-        exponential = np.exp(-phi_n * L0)
-        masses.append(prefactor * exponential)
-    return np.array(masses) / masses[-1]
+    return MASS_FORMULA.masses(k, L0, alpha)
 
 print("* Formula: m_i = phi^{-k_i} * exp(-phi^{n_i} * L0)")
 print("* Three generations: n_i = 3, 2, 1")
@@ -40,16 +48,6 @@ print("* Three generations: n_i = 3, 2, 1")
 # ====================== PART 3: CKM MATRIX ======================
 print("\n[3/9] CKM MATRIX")
 
-def build_ckm(theta12, theta23, theta13, delta):
-    c12, s12 = np.cos(theta12), np.sin(theta12)
-    c23, s23 = np.cos(theta23), np.sin(theta23)
-    c13, s13 = np.cos(theta13), np.sin(theta13)
-    return np.array([
-        [c12*c13, s12*c13, s13*np.exp(-1j*delta)],
-        [-s12*c23 - c12*s23*s13*np.exp(1j*delta), c12*c23 - s12*s23*s13*np.exp(1j*delta), s23*c13],
-        [s12*s23 - c12*c23*s13*np.exp(1j*delta), -c12*s23 - s12*c23*s13*np.exp(1j*delta), c23*c13]
-    ])
-
 print("* CKM = P exp(contour integral A)")
 print("* theta_ij = hyperbolic angles")
 print("* delta_CP proportional to triangle area")
@@ -57,13 +55,10 @@ print("* delta_CP proportional to triangle area")
 # ====================== PART 4: DATA ======================
 print("\n[4/9] EXPERIMENTAL DATA")
 
-DATA = {
-    'masses': {'u/m_t': 1.1e-5, 'c/m_t': 0.0035, 'd/m_b': 1.0e-3, 's/m_b': 0.020},
-    'ckm': {'V_us': 0.22650, 'V_cb': 0.04053, 'V_ub': 0.00361},
-    'angles': {'theta12': 0.227, 'theta23': 0.042, 'theta13': 0.0037},
-    'delta_cp': 1.20  # radians (~68.8 degrees)
-}
+DATASET = load_dataset()
+DATA = DATASET.as_exp_data()
 
+print(f"* Dataset: {DATASET.label}")
 print("* Quark mass ratios loaded")
 print("* CKM matrix elements loaded")
 print("* Mixing angles loaded")
@@ -72,46 +67,24 @@ print("* Mixing angles loaded")
 print("\n[5/9] OPTIMIZING PARAMETERS")
 
 def error_func(params):
-    k_u, k_d = params[:3], params[3:6]
-    L0, alpha = params[6], params[7]
-    theta12, theta23, theta13, delta = params[8:12]
-    
-    m_u = predict_masses(k_u, L0, alpha)
-    m_d = predict_masses(k_d, L0, alpha)
-    V = build_ckm(theta12, theta23, theta13, delta)
-    V_mag = np.abs(V)
-    
-    err = 0
-    err += ((np.log10(m_u[0]) - np.log10(DATA['masses']['u/m_t']))**2) / 0.7**2
-    err += ((np.log10(m_u[1]) - np.log10(DATA['masses']['c/m_t']))**2) / 0.3**2
-    err += ((np.log10(m_d[0]) - np.log10(DATA['masses']['d/m_b']))**2) / 0.7**2
-    err += ((np.log10(m_d[1]) - np.log10(DATA['masses']['s/m_b']))**2) / 0.4**2
-    err += ((V_mag[0,1] - DATA['ckm']['V_us'])**2) / 0.001**2
-    err += ((V_mag[1,2] - DATA['ckm']['V_cb'])**2) / 0.001**2
-    err += ((V_mag[0,2] - DATA['ckm']['V_ub'])**2) / 0.0005**2
-    err += ((theta12 - DATA['angles']['theta12'])**2) / 0.001**2
-    err += ((theta23 - DATA['angles']['theta23'])**2) / 0.001**2
-    err += ((theta13 - DATA['angles']['theta13'])**2) / 0.0001**2
-    err += ((delta - DATA['delta_cp'])**2) / 0.1**2
-    return err
+    return DATASET.chi2(np.asarray(params), MASS_FORMULA.name)
 
 initial = [8.0, 4.0, 0.0, 6.0, 3.0, 0.0, 5.0, 1.0, 0.228, 0.042, 0.0035, 1.20]
+fit_start = time.perf_counter()
 result = minimize(error_func, initial, method='Nelder-Mead', options={'maxiter': 500})
+fit_elapsed = time.perf_counter() - fit_start
 print(f"* Optimization complete! Error: {result.fun:.2f}")
 
-best = result.x
-k_u, k_d = best[:3], best[3:6]
-L0, alpha = best[6], best[7]
-theta12, theta23, theta13, delta = best[8:12]
+fit = FitResult.from_optimize(result, DATASET, MASS_FORMULA)
+best = fit.x
+k_u, k_d, L0, alpha = fit.k_u, fit.k_d, fit.L0, fit.alpha
+theta12, theta23, theta13, delta = fit.mixing
 
 # ====================== PART 6: PREDICTIONS ======================
 print("\n[6/9] PREDICTIONS")
 
-m_u = predict_masses(k_u, L0, alpha)
-m_d = predict_masses(k_d, L0, alpha)
-V = build_ckm(theta12, theta23, theta13, delta)
-V_mag = np.abs(V)
-J = np.imag(V[0,0] * V[0,1].conj() * V[1,0].conj() * V[1,1])
+m_u, m_d = fit.m_u, fit.m_d
+V, V_mag, J = fit.V, fit.V_abs, fit.J
 
 print("\nMASS RATIOS:")
 print(f"  m_u/m_t: {m_u[0]:.2e} (exp: {DATA['masses']['u/m_t']:.1e})")
@@ -128,97 +101,24 @@ print("\nCP VIOLATION:")
 print(f"  delta_CP: {np.degrees(delta):.1f} deg (exp: {np.degrees(DATA['delta_cp']):.1f} deg)")
 print(f"  Jarlskog J: {J:.2e}")
 
+# k_3 drops out of m_i/m_3 and alpha only rescales k: hold them fixed
+free = np.ones(len(best), dtype=bool)
+free[[2, 5, 7]] = False
+unc = fit_uncertainties(best, free=free, dataset=DATASET)
+derived = dict(zip(unc['derived_names'], zip(unc['derived'], unc['derived_errors'])))
+
+print("\nUNCERTAINTIES (Fisher matrix):")
+for name, value, err in zip(unc['names'], best, unc['errors']):
+    if err > 0:
+        print(f"  {name}: {value:.5f} +/- {err:.5f}")
+for name in ['V_us', 'V_cb', 'V_ub', 'J']:
+    print(f"  {name}: {derived[name][0]:.3e} +/- {derived[name][1]:.1e}")
+
 # ====================== PART 7: VISUALIZATION ======================
 print("\n[7/9] CREATING PLOTS")
 
-fig, axes = plt.subplots(2, 3, figsize=(15, 10))
-
-# Plot 1: Mass hierarchy
-ax1 = axes[0, 0]
-x = [0, 1, 2]
-ax1.bar(x, m_u, width=0.4, alpha=0.8, color='blue', label='Up-type')
-ax1.bar([i+0.4 for i in x], m_d, width=0.4, alpha=0.8, color='red', label='Down-type')
-ax1.set_yscale('log')
-ax1.set_xticks([0.2, 1.2, 2.2])
-ax1.set_xticklabels(['1st (light)', '2nd', '3rd (heavy)'])
-ax1.set_ylabel('Mass / heaviest')
-ax1.set_title('Quark Mass Hierarchy')
-ax1.legend()
-ax1.grid(True, alpha=0.3)
-
-# Plot 2: CKM matrix
-ax2 = axes[0, 1]
-im = ax2.imshow(V_mag, cmap='YlOrRd', vmin=0.9, vmax=1.0)
-for i in range(3):
-    for j in range(3):
-        ax2.text(j, i, f'{V_mag[i,j]:.4f}', ha='center', va='center',
-                color='black' if V_mag[i,j] > 0.95 else 'white', fontsize=9)
-ax2.set_xticks([0, 1, 2])
-ax2.set_yticks([0, 1, 2])
-ax2.set_xticklabels(['d', 's', 'b'])
-ax2.set_yticklabels(['u', 'c', 't'])
-ax2.set_title('CKM Matrix |V_ij|')
-plt.colorbar(im, ax=ax2)
-
-# Plot 3: Golden ratio scaling
-ax3 = axes[0, 2]
-n = [3, 2, 1, 0]
-scaling = PHI**(-np.array(n))
-ax3.plot(n, scaling, 'o-', linewidth=3, color='goldenrod', markersize=10)
-for ni, s in zip(n, scaling):
-    ax3.text(ni, s*1.3, f'phi^{-ni}', ha='center', fontweight='bold')
-ax3.set_xlabel('Generation Index n')
-ax3.set_ylabel('Mass Scaling phi^{-n}')
-ax3.set_yscale('log')
-ax3.set_title('Golden Ratio Scaling')
-ax3.grid(True, alpha=0.3)
-
-# Plot 4: Parameters
-ax4 = axes[1, 0]
-names = ['k_u1', 'k_u2', 'k_u3', 'k_d1', 'k_d2', 'k_d3', 'L0', 'alpha']
-values = list(k_u) + list(k_d) + [L0, alpha]
-colors = ['blue', 'blue', 'blue', 'red', 'red', 'red', 'green', 'purple']
-ax4.bar(names, values, color=colors, alpha=0.7)
-ax4.set_ylabel('Parameter Value')
-ax4.set_title('Best Fit Parameters')
-ax4.tick_params(axis='x', rotation=45)
-ax4.grid(True, alpha=0.3, axis='y')
-
-# Plot 5: Mixing angles
-ax5 = axes[1, 1]
-angles = ['theta12', 'theta23', 'theta13', 'delta_CP']
-pred = [theta12, theta23, theta13, delta]
-exp = [DATA['angles']['theta12'], DATA['angles']['theta23'], 
-       DATA['angles']['theta13'], DATA['delta_cp']]
-x_pos = [0, 1, 2, 3]
-ax5.bar([i-0.2 for i in x_pos], pred, 0.4, alpha=0.8, color='teal', label='Predicted')
-ax5.bar([i+0.2 for i in x_pos], exp, 0.4, alpha=0.5, color='orange', label='Experimental')
-ax5.set_xticks(x_pos)
-ax5.set_xticklabels(angles)
-ax5.set_ylabel('Angle (rad)')
-ax5.set_title('Mixing Angles & CP Phase')
-ax5.legend()
-ax5.grid(True, alpha=0.3)
-
-# Plot 6: Geometric triangle
-ax6 = axes[1, 2]
-vertices = [[0, 0], [1, 0], [0.5, np.sqrt(3)/2]]
-triangle = plt.Polygon(vertices, closed=True, alpha=0.3, color='purple')
-ax6.add_patch(triangle)
-for i, (x, y) in enumerate(vertices):
-    ax6.text(x, y, f'Gen {i+1}', ha='center', va='center', fontweight='bold', fontsize=10)
-ax6.set_xlim(-0.2, 1.2)
-ax6.set_ylim(-0.2, 1.2)
-ax6.set_aspect('equal')
-ax6.set_title('Hyperbolic Triangle (3 Generations)')
-ax6.grid(True, alpha=0.3)
-
-plt.suptitle('HYPERBOLIC FUNHOUSE MIRRORS: Complete Flavor Model', 
-             fontsize=16, fontweight='bold', y=1.02)
-plt.tight_layout()
-plt.savefig('results.png', dpi=300, bbox_inches='tight')
-print("* Saved plot to: results.png")
-plt.show()
+figure = plot_results(best, DATASET, 'results.png')
+print(f"* Saved plot to: results.png (redrew {len(figure['rendered'])} of 6 panels)")
 
 # ====================== PART 8: SAVE RESULTS ======================
 print("\n[8/9] SAVING RESULTS")
@@ -271,6 +171,11 @@ np.savez('model_results.npz',
 
 print("* Saved complete data to: model_results.npz")
 
+with ResultsStore() as store:
+    store.record_fit(best, result.fun, DATASET, variant=MASS_FORMULA.name,
+                     elapsed=fit_elapsed, extra={'script': 'src.main', 'nit': result.nit})
+print(f"* Appended fit to: {store.path}")
+
 # ====================== PART 9: SUMMARY ======================
 print("\n[9/9] SUMMARY")
 print("=" * 80)
@@ -0,0 +1,235 @@
+"""
+Experimental input datasets
+Versioned JSON files with central values and a full covariance matrix
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from scipy.linalg import cholesky, solve_triangular
+
+from src.models.flavor import predict_observables, LOG_10, OBSERVABLE_NAMES
+from src.models.variants import get_variant
+
+DATASET_DIR = Path(__file__).resolve().parents[2] / 'data' / 'datasets'
+DEFAULT_DATASET = 'gut-scale-v1'
+DATASET_ENV = 'FUNHOUSE_DATASET'  # overrides the default without code edits
+
+# Float32 screening error model (see Dataset.chi2_screen): unit roundoff and
+# per-observable operation counts, each about twice the kernel's own count
+F32_ROUNDOFF = float(np.finfo(np.float32).eps) / 2
+MASS_OPS = 32              # input rounding of k, alpha, L0, the formula and the normalization
+MIXING_OPS = 32            # input rounding of the angles, sin / cos and the c13 products
+
+_cache = {}
+
+
+def _predict(params, variant=None):
+    """Observables with the default kernel, or a registered mass-formula variant"""
+    if variant is None:
+        return predict_observables(params)
+    return get_variant(variant).predict_observables(params)
+
+
+class Dataset:
+    """
+    Central values and covariance for a subset of the model observables.
+
+    The Cholesky factor C = L L^T is computed once here, so the chi^2 of a
+    whole batch is one triangular solve: chi^2 = |L^{-1} (pred - central)|^2.
+    """
+
+    def __init__(self, name, observables, central, covariance,
+                 version='', description=''):
+        self.name = name
+        self.version = version
+        self.description = description
+        self.observables = list(observables)
+        self.index = np.array([OBSERVABLE_NAMES.index(o) for o in self.observables])
+        self.central = np.asarray(central, dtype=float)
+        self.covariance = np.asarray(covariance, dtype=float)
+        self.sigma = np.sqrt(np.diag(self.covariance))
+        self.cholesky = cholesky(self.covariance, lower=True)
+
+    @property
+    def label(self):
+        return f"{self.name}-{self.version}" if self.version else self.name
+
+    @property
+    def fingerprint(self):
+        """Content hash of the inputs, independent of the file name"""
+        h = hashlib.sha1(",".join(self.observables).encode())
+        h.update(self.central.tobytes())
+        h.update(self.covariance.tobytes())
+        return h.hexdigest()[:16]
+
+    def residuals(self, params, variant=None):
+        """Whitened residuals L^{-1} (pred - central), shape (..., n_obs)"""
+        params = np.asarray(params)
+        pred = _predict(params, variant)[..., self.index]
+        diff = (pred - self.central).reshape(-1, len(self.central))
+        white = solve_triangular(self.cholesky, diff.T, lower=True,
+                                 check_finite=False)
+        return white.T.reshape(pred.shape)
+
+    def chi2(self, params, variant=None):
+        """Batched chi^2 with the full covariance (variant: mass-formula name)"""
+        r = self.residuals(params, variant)
+        return np.einsum('...i,...i->...', r, r)
+
+    def chi2_screen(self, params, variant=None):
+        """
+        Float32 chi^2 for screening, with a bound on its error.
+
+        Everything (kernel, whitening, sum of squares) runs in float32 on
+        float32 params. Returns (chi2, bound) such that the exact float64
+        residual norm lies within `bound` of sqrt(chi2):
+
+        - predictions: |d log10 m| <= MASS_OPS u (Lambda + 1) / ln 10, with
+          Lambda the log-mass scale of the vector (MassFormula.log_mass_scale),
+          since the log masses lose absolute, not relative, accuracy; mixing
+          observables |d| <= MIXING_OPS u. Through the whitening these give
+          || |L^-1| e ||, split into its mass and mixing columns.
+        - the float32 central values add u || |L^-1| |c| ||.
+        - the subtraction, the triangular product and the sum of squares add
+          (n + 1) u (|| |L^-1| |L| || + 1) times the norm itself, as
+          |pred - c| <= |L| |r| (first order; the factor 2 covers the rest).
+
+        u is the float32 unit roundoff 2^-24 and the bound includes the
+        rounding of the float64 points to float32.
+        """
+        if not hasattr(self, '_screen'):
+            W = solve_triangular(self.cholesky, np.eye(len(self.index)), lower=True)
+            mass = np.array([o.startswith('log10(') for o in self.observables])
+            n, u = len(self.index), F32_ROUNDOFF
+            self._screen = {
+                'whitening': W.T.astype(np.float32),
+                'central': self.central.astype(np.float32),
+                'mass': np.linalg.norm(np.abs(W) @ mass) * MASS_OPS * u / LOG_10,
+                'mixing': np.linalg.norm(np.abs(W) @ ~mass) * MIXING_OPS * u,
+                'constant': np.linalg.norm(np.abs(W) @ np.abs(self.central)) * u,
+                'relative': 2 * (n + 1) * u * (np.linalg.norm(np.abs(W) @ np.abs(self.cholesky), 2)
+                                               + 1),
+            }
+        screen = self._screen
+        params = np.asarray(params, dtype=np.float32)
+        pred = _predict(params, variant)[..., self.index]
+        white = (pred - screen['central']) @ screen['whitening']
+        chi2 = np.einsum('...i,...i->...', white, white)
+        scale = get_variant(variant).log_mass_scale(params).astype(float)
+        bound = (screen['mass'] * (scale + 1) + screen['mixing'] + screen['constant']
+                 + screen['relative'] * np.sqrt(chi2, dtype=float))
+        return chi2, bound
+
+    def to_spec(self):
+        """JSON-able spec with the full covariance: dataset_from_spec(d.to_spec()) == d"""
+        return {'name': self.name, 'version': self.version, 'description': self.description,
+                'observables': self.observables, 'central': self.central.tolist(),
+                'covariance': self.covariance.tolist()}
+
+    def value(self, observable):
+        return self.central[self.observables.index(observable)]
+
+    def as_exp_data(self):
+        """Nested dict in the layout of the scripts' EXP_DATA"""
+        get = lambda o: self.value(o) if o in self.observables else np.nan
+        return {
+            'masses': {
+                'u/m_t': 10**get('log10(m_u/m_t)'),
+                'c/m_t': 10**get('log10(m_c/m_t)'),
+                'd/m_b': 10**get('log10(m_d/m_b)'),
+                's/m_b': 10**get('log10(m_s/m_b)'),
+            },
+            'ckm': {o: get(o) for o in ['V_us', 'V_cb', 'V_ub']},
+            'angles': {o: get(o) for o in ['theta12', 'theta23', 'theta13']},
+            'delta_cp': get('delta_cp'),
+        }
+
+
+def covariance_from_spec(spec):
+    """Covariance from either 'covariance' or 'sigma' + 'correlations'"""
+    if 'covariance' in spec:
+        return np.asarray(spec['covariance'], dtype=float)
+    sigma = np.asarray(spec['sigma'], dtype=float)
+    corr = np.eye(len(sigma))
+    names = spec['observables']
+    for a, b, rho in spec.get('correlations', []):
+        i, j = names.index(a), names.index(b)
+        corr[i, j] = corr[j, i] = rho
+    return corr * np.outer(sigma, sigma)
+
+
+def available_datasets():
+    """Names of the dataset files shipped in data/datasets"""
+    return sorted(p.stem for p in DATASET_DIR.glob('*.json'))
+
+
+def load_dataset(name=None):
+    """
+    Load a dataset by name (data/datasets/<name>.json) or by file path.
+    Without a name, $FUNHOUSE_DATASET or the default dataset is used.
+    """
+    if name is None:
+        name = os.environ.get(DATASET_ENV, DEFAULT_DATASET)
+    path = Path(name)
+    if path.suffix != '.json':
+        path = DATASET_DIR / f"{name}.json"
+    key = str(path.resolve())
+    if key not in _cache:
+        if not path.exists():
+            raise FileNotFoundError(
+                f"Unknown dataset '{name}'; available: {available_datasets()}")
+        with open(path) as f:
+            _cache[key] = dataset_from_spec(json.load(f))
+    return _cache[key]
+
+
+def dataset_from_spec(spec):
+    """Dataset from the contents of a dataset file (or Dataset.to_spec())"""
+    return Dataset(spec['name'], spec['observables'], spec['central'],
+                   covariance_from_spec(spec), version=spec.get('version', ''),
+                   description=spec.get('description', ''))
+
+
+class DatasetStack:
+    """
+    Several datasets stacked into padded arrays for lockstep fitting.
+
+    Observables missing from a dataset get zero rows/columns in its inverse
+    Cholesky factor, so every dataset shares one (D, 11) prediction array.
+    """
+
+    def __init__(self, datasets):
+        self.datasets = list(datasets)
+        self.labels = [d.label for d in self.datasets]
+        D, m = len(self.datasets), len(OBSERVABLE_NAMES)
+        self.central = np.zeros((D, m))
+        self.whitening = np.zeros((D, m, m))
+        for i, d in enumerate(self.datasets):
+            L_inv = solve_triangular(d.cholesky, np.eye(len(d.index)), lower=True)
+            self.central[i, d.index] = d.central
+            self.whitening[i][np.ix_(d.index, d.index)] = L_inv
+
+    def __len__(self):
+        return len(self.datasets)
+
+    def chi2(self, params, rows=None, variant=None):
+        """
+        chi^2 of params with shape (D, ..., n_params) against each dataset;
+        `rows` selects a subset of datasets aligned with the first axis.
+        """
+        rows = slice(None) if rows is None else rows
+        params = np.asarray(params)
+        diff = _predict(params, variant) - self.central[rows].reshape(
+            (-1,) + (1,) * (params.ndim - 2) + (len(OBSERVABLE_NAMES),))
+        white = np.einsum('dij,d...j->d...i', self.whitening[rows], diff)
+        return np.einsum('...i,...i->...', white, white)
+
+
+def stack_datasets(names):
+    """DatasetStack from dataset names, paths or Dataset objects"""
+    return DatasetStack(d if isinstance(d, Dataset) else load_dataset(d)
+                        for d in names)
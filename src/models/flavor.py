@@ -0,0 +1,142 @@
+"""
+Batched flavor kernels
+Vectorized mass formula, CKM matrix and observables over stacked parameter vectors
+"""
+
+import math
+
+import numpy as np
+
+from src.core.mathematics import PHI
+
+LOG_PHI = math.log(PHI)    # Python floats: float32 batches stay float32
+LOG_10 = math.log(10)
+GEN_POWERS = np.array([3.0, 2.0, 1.0])  # n_i for the three generations
+GEN_SCALING = PHI**GEN_POWERS
+
+# Flat parameter vector layout (same as the scripts)
+PARAM_NAMES = ['k_u1', 'k_u2', 'k_u3', 'k_d1', 'k_d2', 'k_d3',
+               'L0', 'alpha', 'theta12', 'theta23', 'theta13', 'delta_cp']
+N_PARAMS = len(PARAM_NAMES)
+K_U, K_D, L0_INDEX, ALPHA_INDEX = slice(0, 3), slice(3, 6), 6, 7
+ANGLES, DELTA_INDEX, MIXING = slice(8, 11), 11, slice(8, 12)
+
+# Starting point of the scripts' Nelder-Mead fit
+INITIAL_GUESS = np.array([8.0, 4.0, 0.0,   # k_u
+                          6.0, 3.0, 0.0,   # k_d
+                          5.0, 1.0,        # L0, alpha
+                          0.228, 0.042, 0.0035, 1.20])  # angles + delta
+
+# Search box for global optimizers and samplers
+PARAM_BOUNDS = np.array([[-5.0, 20.0]] * 6             # k_u, k_d
+                        + [[0.0, 10.0], [0.1, 3.0]]     # L0, alpha
+                        + [[0.0, np.pi / 2]] * 3        # theta12, theta23, theta13
+                        + [[0.0, 2 * np.pi]])           # delta_cp
+
+# Observables entering the chi^2, in the order of calculate_error
+OBSERVABLE_NAMES = ['log10(m_u/m_t)', 'log10(m_c/m_t)',
+                    'log10(m_d/m_b)', 'log10(m_s/m_b)',
+                    'V_us', 'V_cb', 'V_ub',
+                    'theta12', 'theta23', 'theta13', 'delta_cp']
+N_OBSERVABLES = len(OBSERVABLE_NAMES)
+
+# Derived quantities reported after a fit
+DERIVED_NAMES = ['m_u/m_t', 'm_c/m_t', 'm_d/m_b', 'm_s/m_b',
+                 'V_ud', 'V_us', 'V_ub', 'V_cd', 'V_cs', 'V_cb',
+                 'V_td', 'V_ts', 'V_tb', 'J']
+
+
+def log_masses(k, L0, alpha=1.0):
+    """
+    Natural log of m_i = phi^{-k_i alpha} exp(-phi^{n_i} L0), normalized
+    to the heaviest generation. k has shape (..., 3).
+    """
+    k = np.asarray(k)
+    L0 = np.asarray(L0)[..., None]
+    alpha = np.asarray(alpha)[..., None]
+    scaling = GEN_SCALING.astype(np.result_type(k, L0, alpha, np.float32), copy=False)
+    log_m = -k * alpha * LOG_PHI - scaling * L0
+    return log_m - log_m[..., -1:]
+
+
+def predict_masses(k, L0, alpha=1.0):
+    """Batched predict_masses: m_i / m_3 with shape (..., 3)"""
+    return np.exp(log_masses(k, L0, alpha))
+
+
+def build_ckm(theta12, theta23, theta13, delta_cp):
+    """Standard parameterization, stacked to shape (..., 3, 3)"""
+    theta12, theta23, theta13, delta_cp = np.broadcast_arrays(
+        theta12, theta23, theta13, delta_cp)
+    c12, s12 = np.cos(theta12), np.sin(theta12)
+    c23, s23 = np.cos(theta23), np.sin(theta23)
+    c13, s13 = np.cos(theta13), np.sin(theta13)
+    e = np.exp(1j * delta_cp)
+
+    V = np.empty(theta12.shape + (3, 3), dtype=np.result_type(e, complex))
+    V[..., 0, 0] = c12 * c13
+    V[..., 0, 1] = s12 * c13
+    V[..., 0, 2] = s13 / e
+    V[..., 1, 0] = -s12 * c23 - c12 * s23 * s13 * e
+    V[..., 1, 1] = c12 * c23 - s12 * s23 * s13 * e
+    V[..., 1, 2] = s23 * c13
+    V[..., 2, 0] = s12 * s23 - c12 * c23 * s13 * e
+    V[..., 2, 1] = -c12 * s23 - s12 * c23 * s13 * e
+    V[..., 2, 2] = c23 * c13
+    return V
+
+
+def jarlskog(V):
+    """J = Im(V_ud V_us* V_cd* V_cs) for stacked matrices"""
+    return np.imag(V[..., 0, 0] * V[..., 0, 1].conj()
+                   * V[..., 1, 0].conj() * V[..., 1, 1])
+
+
+def predict_observables(params):
+    """
+    Observables of calculate_error for parameter vectors of shape (..., 12).
+
+    |V_us|, |V_cb|, |V_ub| use their closed forms (s12 c13, s23 c13, s13),
+    which equal np.abs(build_ckm(...)) for angles in [0, pi/2] and keep the
+    kernel analytic, so complex-step derivatives pass straight through.
+    float32 vectors are evaluated in float32 throughout (scan screening).
+    """
+    params = np.asarray(params)
+    params = params.astype(np.result_type(params, np.float32), copy=False)
+    L0, alpha = params[..., L0_INDEX], params[..., ALPHA_INDEX]
+    return observables_from_log_masses(log_masses(params[..., K_U], L0, alpha),
+                                       log_masses(params[..., K_D], L0, alpha), params)
+
+
+def observables_from_log_masses(log_up, log_down, params):
+    """Observable vector from normalized log masses (..., 3) and the mixing parameters"""
+    theta12, theta23, theta13 = np.moveaxis(params[..., ANGLES], -1, 0)
+    out = np.empty(params.shape[:-1] + (N_OBSERVABLES,),
+                   dtype=np.result_type(log_up, log_down, params))
+    out[..., 0:2] = log_up[..., :2] / LOG_10
+    out[..., 2:4] = log_down[..., :2] / LOG_10
+    c13 = np.cos(theta13)
+    out[..., 4] = np.sin(theta12) * c13
+    out[..., 5] = np.sin(theta23) * c13
+    out[..., 6] = np.sin(theta13)
+    out[..., 7:11] = params[..., MIXING]
+    return out
+
+
+def derived_observables(params):
+    """Mass ratios, all |V_ij| and J for parameter vectors of shape (..., 12)"""
+    params = np.asarray(params, dtype=float)
+    L0, alpha = params[..., L0_INDEX], params[..., ALPHA_INDEX]
+    return derived_from_masses(predict_masses(params[..., K_U], L0, alpha),
+                               predict_masses(params[..., K_D], L0, alpha), params)
+
+
+def derived_from_masses(m_up, m_down, params):
+    """Derived quantities from normalized masses (..., 3) and the mixing parameters"""
+    V = build_ckm(*np.moveaxis(params[..., MIXING], -1, 0))
+    out = np.empty(params.shape[:-1] + (len(DERIVED_NAMES),))
+    out[..., 0:2] = m_up[..., :2]
+    out[..., 2:4] = m_down[..., :2]
+    out[..., 4:13] = np.abs(V).reshape(params.shape[:-1] + (9,))
+    out[..., 13] = jarlskog(V)
+    return out
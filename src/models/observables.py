@@ -0,0 +1,217 @@
+"""
+Derived flavor observables
+Wolfenstein parameters, unitarity triangles and rephasing invariants of stacked CKM matrices
+"""
+
+from functools import cached_property
+
+import numpy as np
+
+from src.models.flavor import MIXING, build_ckm
+
+UP, DOWN = 'uct', 'dsb'
+CHUNK = 100_000            # matrices per pass; bounds the intermediates
+
+# Unitarity triangles: orthogonality of two columns (sum_i V_ia V_ib* = 0)
+# or two rows (sum_a V_ia V_ja* = 0); each has three complex sides z_k
+TRIANGLES = {
+    'ds': ('columns', 0, 1), 'db': ('columns', 0, 2), 'sb': ('columns', 1, 2),
+    'uc': ('rows', 0, 1), 'ut': ('rows', 0, 2), 'ct': ('rows', 1, 2),
+}
+
+
+class _Batch:
+    """One chunk of matrices and the intermediates its observables share, computed once"""
+
+    def __init__(self, V):
+        self.V = V
+        self._sides = {}
+        self._quartets = {}
+
+    @cached_property
+    def abs2(self):
+        return self.V.real**2 + self.V.imag**2
+
+    @cached_property
+    def abs(self):
+        return np.sqrt(self.abs2)
+
+    def sides(self, triangle):
+        """(n, 3) complex sides of a triangle, indexed by the summed row or column"""
+        if triangle not in self._sides:
+            kind, a, b = TRIANGLES[triangle]
+            if kind == 'columns':
+                z = self.V[:, :, a] * self.V[:, :, b].conj()
+            else:
+                z = self.V[:, a, :] * self.V[:, b, :].conj()
+            self._sides[triangle] = z
+        return self._sides[triangle]
+
+    def quartet(self, i, a, j, b):
+        """Q_{i a j b} = V_ia V_jb V_ib* V_ja*"""
+        key = (i, a, j, b)
+        if key not in self._quartets:
+            V = self.V
+            self._quartets[key] = V[:, i, a] * V[:, j, b] * (V[:, i, b] * V[:, j, a]).conj()
+        return self._quartets[key]
+
+    @cached_property
+    def lam(self):
+        a = self.abs2
+        return np.sqrt(a[:, 0, 1] / (a[:, 0, 0] + a[:, 0, 1]))
+
+    @cached_property
+    def rho_eta(self):
+        """rhobar + i etabar = -V_ud V_ub* / (V_cd V_cb*), exact and rephasing invariant"""
+        z = self.sides('db')
+        return -z[:, 0] * z[:, 1].conj() / (z[:, 1].real**2 + z[:, 1].imag**2)
+
+
+def _angle(triangle, k):
+    """Angle at the vertex between the sides other than z_k: arg(-z_i z_j*), (i, j, k) cyclic"""
+    i, j = (k + 1) % 3, (k + 2) % 3
+
+    def angle(batch):
+        z = batch.sides(triangle)
+        return np.angle(-z[:, i] * z[:, j].conj())
+    return angle
+
+
+def _area(triangle):
+    def area(batch):
+        z = batch.sides(triangle)
+        return 0.5 * np.abs(np.imag(z[:, 0] * z[:, 1].conj()))
+    return area
+
+
+def _build_registry():
+    """name -> (group, function of a _Batch giving one real column)"""
+    registry = {}
+    for i, u in enumerate(UP):
+        for a, d in enumerate(DOWN):
+            registry[f'V_{u}{d}'] = ('moduli', lambda batch, i=i, a=a: batch.abs[:, i, a])
+
+    registry['lambda'] = ('wolfenstein', lambda batch: batch.lam)
+    registry['A'] = ('wolfenstein',
+                     lambda batch: batch.abs[:, 1, 2] / (batch.lam * batch.abs[:, 0, 1]))
+    registry['rhobar'] = ('wolfenstein', lambda batch: batch.rho_eta.real)
+    registry['etabar'] = ('wolfenstein', lambda batch: batch.rho_eta.imag)
+
+    registry['J'] = ('jarlskog', lambda batch: batch.quartet(0, 0, 1, 1).imag)
+
+    # the conventional angles of the (d, b) and (s, b) triangles; alpha_ut
+    # keeps clear of the model parameter alpha
+    registry['alpha_ut'] = ('standard_angles', _angle('db', 1))
+    registry['beta'] = ('standard_angles', _angle('db', 0))
+    registry['gamma'] = ('standard_angles', _angle('db', 2))
+    sb = _angle('sb', 0)
+    registry['beta_s'] = ('standard_angles', lambda batch: -sb(batch))
+
+    for triangle, (kind, _, _) in TRIANGLES.items():
+        labels = UP if kind == 'columns' else DOWN
+        for k, label in enumerate(labels):
+            registry[f'angle_{triangle}_{label}'] = ('triangle_angles', _angle(triangle, k))
+    for triangle in TRIANGLES:
+        registry[f'area_{triangle}'] = ('areas', _area(triangle))
+
+    for i in range(3):
+        for j in range(i + 1, 3):
+            for a in range(3):
+                for b in range(a + 1, 3):
+                    key = (i, a, j, b)
+                    name = f'{UP[i]}{DOWN[a]}{UP[j]}{DOWN[b]}'
+                    registry[f'ReQ_{name}'] = ('quartets',
+                                               lambda batch, key=key: batch.quartet(*key).real)
+                    registry[f'ImQ_{name}'] = ('quartets',
+                                               lambda batch, key=key: batch.quartet(*key).imag)
+    return registry
+
+
+OBSERVABLES = _build_registry()
+GROUPS = {}
+for _name, (_group, _) in OBSERVABLES.items():
+    GROUPS.setdefault(_group, []).append(_name)
+
+
+def select_observables(select=None):
+    """
+    Column names for a selection of observable and group names (everything
+    by default), in registry order and without duplicates:
+
+        moduli            |V_ij|
+        wolfenstein       lambda, A, rhobar, etabar (exact PDG definitions)
+        jarlskog          J
+        standard_angles   alpha_ut, beta, gamma of the (d, b) triangle, beta_s
+        triangle_angles   angle_<triangle>_<k> of all six triangles: the
+                          angle between the two sides other than the one
+                          summed over k (e.g. angle_db_u = beta)
+        areas             area_<triangle>, each |J|/2 if V is unitary
+        quartets          ReQ_/ImQ_<i a j b> = V_ia V_jb V_ib* V_ja*, the
+                          nine independent rephasing invariants
+    """
+    if select is None:
+        return list(OBSERVABLES)
+    if isinstance(select, str):
+        select = [select]
+    wanted = set()
+    for item in select:
+        if item in GROUPS:
+            wanted.update(GROUPS[item])
+        elif item in OBSERVABLES:
+            wanted.add(item)
+        else:
+            raise ValueError(f"Unknown observable or group '{item}'; groups: "
+                             f"{', '.join(GROUPS)}")
+    return [name for name in OBSERVABLES if name in wanted]
+
+
+def _output(lead, names, out):
+    if out is None:
+        return np.empty(lead + (len(names),))
+    if out.shape != lead + (len(names),):
+        raise ValueError(f"out has shape {out.shape}, expected {lead + (len(names),)}")
+    return out
+
+
+def _fill(matrices, n, names, out, chunk):
+    """Evaluate the named columns chunk by chunk; matrices(start, stop) -> (m, 3, 3)"""
+    functions = [OBSERVABLES[name][1] for name in names]
+    target = out.reshape(n, len(names))
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        batch = _Batch(matrices(start, stop))
+        for column, function in enumerate(functions):
+            target[start:stop, column] = function(batch)
+    if not np.shares_memory(target, out):
+        out[...] = target.reshape(out.shape)   # out was not reshapeable in place
+    return out
+
+
+def ckm_observables(V, select=None, out=None, chunk=CHUNK):
+    """
+    Derived observables of stacked CKM matrices V (..., 3, 3), one vectorized
+    pass per chunk of `chunk` matrices. Columns follow
+    select_observables(select); only the intermediates the selection needs
+    are computed. With `out` (shape (..., n_columns), any real dtype, e.g.
+    a column slice of a larger table) results are written in place.
+    """
+    V = np.asarray(V)
+    lead = V.shape[:-2]
+    names = select_observables(select)
+    flat = V.reshape(-1, 3, 3)
+    return _fill(lambda start, stop: flat[start:stop], len(flat), names,
+                 _output(lead, names, out), chunk)
+
+
+def mixing_observables(params, select=None, out=None, chunk=CHUNK):
+    """
+    ckm_observables for parameter vectors (..., 12) (e.g. a posterior
+    chain), building each chunk's CKM matrices on the fly so the full
+    (N, 3, 3) stack is never allocated.
+    """
+    params = np.asarray(params)
+    lead = params.shape[:-1]
+    names = select_observables(select)
+    mixing = params.reshape(-1, params.shape[-1])[:, MIXING]
+    return _fill(lambda start, stop: build_ckm(*np.asarray(mixing[start:stop], dtype=float).T),
+                 len(mixing), names, _output(lead, names, out), chunk)
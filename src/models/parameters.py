@@ -0,0 +1,205 @@
+"""
+Typed parameter layout
+Structured-dtype views of a variant's flat parameter vectors and fit results with cached predictions
+"""
+
+import numpy as np
+
+from src.models.flavor import build_ckm, jarlskog, N_PARAMS
+from src.models.variants import get_variant
+
+_dtypes = {}
+
+
+def param_dtype(variant=None):
+    """
+    Same bytes as a float64 (..., n_params) row of the variant: the 12
+    standard fields, 'mixing' overlaying the four CKM parameters, then the
+    variant's own parameters by name
+    """
+    formula = get_variant(variant)
+    if formula.name not in _dtypes:
+        extra = formula.param_names[N_PARAMS:]
+        _dtypes[formula.name] = np.dtype({
+            'names': ['k_u', 'k_d', 'L0', 'alpha', 'theta12', 'theta23', 'theta13',
+                      'delta_cp', 'mixing'] + extra,
+            'formats': [('<f8', 3), ('<f8', 3), '<f8', '<f8', '<f8', '<f8', '<f8', '<f8',
+                        ('<f8', 4)] + ['<f8'] * len(extra),
+            'offsets': [0, 24, 48, 56, 64, 72, 80, 88, 64]
+                       + [8 * (N_PARAMS + i) for i in range(len(extra))],
+            'itemsize': 8 * formula.n_params,
+        })
+    return _dtypes[formula.name]
+
+
+PARAM_DTYPE = param_dtype()     # the default variant's 12 parameters
+
+
+class ParameterSet:
+    """
+    A batch of parameter vectors of a mass-formula variant (the default
+    phi-321 without one), of any leading shape, stored as one contiguous
+    float64 (..., n_params) buffer. Fields (`k_u`, `L0`, `theta13`, the
+    variant's own parameters, ...) and slices are views into that buffer,
+    never copies.
+    """
+
+    __slots__ = ('flat', 'variant')
+
+    def __init__(self, flat, variant=None):
+        self.variant = get_variant(variant)
+        n = self.variant.n_params
+        flat = np.asarray(flat)
+        if flat.shape[-1:] != (n,):
+            raise ValueError(f"expected parameter vectors of length {n} for variant "
+                             f"{self.variant.name!r}, got shape {flat.shape}")
+        # zero-copy for float64 C-contiguous input, one copy otherwise
+        self.flat = np.ascontiguousarray(flat, dtype=np.float64)
+
+    @classmethod
+    def empty(cls, n, variant=None):
+        """n uninitialized vectors in a single allocation"""
+        return cls(np.empty((n, get_variant(variant).n_params)), variant)
+
+    @classmethod
+    def from_records(cls, records, variant=None):
+        """Wrap a param_dtype(variant) array (e.g. read from disk) without copying"""
+        records = np.ascontiguousarray(records)
+        n = get_variant(variant).n_params
+        return cls(records.view(np.float64).reshape(records.shape + (n,)), variant)
+
+    @property
+    def dtype(self):
+        return param_dtype(self.variant)
+
+    @property
+    def records(self):
+        """The buffer as a param_dtype(variant) array of shape flat.shape[:-1]"""
+        return self.flat.view(self.dtype).reshape(self.shape)
+
+    @property
+    def shape(self):
+        return self.flat.shape[:-1]
+
+    def __len__(self):
+        """Number of vectors in the batch; like a 0-d array, a single vector has none"""
+        if not self.shape:
+            raise TypeError("len() of an unbatched ParameterSet")
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        return ParameterSet(self.flat[index], self.variant)
+
+    def __array__(self, dtype=None, copy=None):
+        """The flat buffer itself unless a copy is asked for or the dtype differs"""
+        if dtype is None or np.dtype(dtype) == self.flat.dtype:
+            return self.flat.copy() if copy else self.flat
+        if copy is False:
+            raise ValueError(f"a float64 ParameterSet cannot become {np.dtype(dtype)} "
+                             "without a copy")
+        return self.flat.astype(dtype)
+
+    def __repr__(self):
+        return f"ParameterSet(shape={self.shape}, variant={self.variant.name!r})"
+
+    def __getattr__(self, name):
+        if name in param_dtype(self.variant).names:
+            return self.records[name]
+        raise AttributeError(name)
+
+    def named(self):
+        """{parameter name: value(s)} for reports and JSON"""
+        return dict(zip(self.variant.param_names, np.moveaxis(self.flat, -1, 0)))
+
+    def observables(self):
+        return self.variant.predict_observables(self.flat)
+
+    def derived(self):
+        return self.variant.derived_observables(self.flat)
+
+
+class FitResult:
+    """
+    Best-fit point with chi^2 and provenance. Masses (with the variant's
+    formula), the CKM matrix, |V| and J are computed on first access and
+    cached. Works equally for one fit (x of shape (n_params,)) and a batch
+    of fits (x of shape (N, n_params)).
+    """
+
+    __slots__ = ('params', 'chi2', 'dataset', 'nit', '_m_u', '_m_d', '_V', '_V_abs', '_J')
+
+    def __init__(self, x, chi2=None, dataset=None, nit=None, variant=None):
+        self.params = x if isinstance(x, ParameterSet) else ParameterSet(x, variant)
+        self.chi2 = chi2
+        self.dataset = getattr(dataset, 'label', dataset)
+        self.nit = nit
+        self._m_u = self._m_d = self._V = self._V_abs = self._J = None
+
+    @classmethod
+    def from_optimize(cls, result, dataset=None, variant=None):
+        """
+        From a scipy OptimizeResult or one of the fitters' result dicts (whose
+        'variant' is used when none is given)
+        """
+        get = result.get if isinstance(result, dict) else lambda k: getattr(result, k, None)
+        return cls(get('x'), get('fun'), dataset, get('nit'),
+                   get('variant') if variant is None else variant)
+
+    @property
+    def variant(self):
+        return self.params.variant
+
+    @property
+    def x(self):
+        return self.params.flat
+
+    def __getattr__(self, name):
+        if name in param_dtype(self.params.variant).names:
+            return self.params.records[name]
+        raise AttributeError(name)
+
+    def __repr__(self):
+        return (f"FitResult(chi2={self.chi2}, dataset={self.dataset!r}, "
+                f"variant={self.variant.name!r}, shape={self.params.shape})")
+
+    def _masses(self):
+        log_up, log_down = self.variant.log_masses(self.params.flat)
+        self._m_u, self._m_d = np.exp(log_up), np.exp(log_down)
+
+    @property
+    def m_u(self):
+        """Up-type masses m_i / m_t"""
+        if self._m_u is None:
+            self._masses()
+        return self._m_u
+
+    @property
+    def m_d(self):
+        """Down-type masses m_i / m_b"""
+        if self._m_d is None:
+            self._masses()
+        return self._m_d
+
+    @property
+    def V(self):
+        if self._V is None:
+            self._V = build_ckm(*np.moveaxis(self.params.records['mixing'], -1, 0))
+        return self._V
+
+    @property
+    def V_abs(self):
+        if self._V_abs is None:
+            self._V_abs = np.abs(self.V)
+        return self._V_abs
+
+    @property
+    def J(self):
+        if self._J is None:
+            self._J = jarlskog(self.V)
+        return self._J
+
+    def as_dict(self):
+        return {'dataset': self.dataset, 'variant': self.variant.name,
+                'chi2': self.chi2, 'nit': self.nit,
+                'params': self.params.named(), 'm_u': self.m_u, 'm_d': self.m_d,
+                'V_abs': self.V_abs, 'J': self.J}
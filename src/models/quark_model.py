@@ -4,12 +4,23 @@ HYPERBOLIC FUNHOUSE MIRRORS - Complete Model
 Flavor physics from hyperbolic geometry on ℍ/Γ(5)
 """
 
+import os
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.optimize import minimize
+import time
 import warnings
 warnings.filterwarnings('ignore')
 
+# also runnable as a script (python src/models/quark_model.py): the repo root must be importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))))
+
+from src.models.datasets import load_dataset
+from src.models.parameters import FitResult
+from src.models.variants import get_variant
+from src.plotting.results import plot_results
+from src.storage.results import ResultsStore
+
 print("=" * 80)
 print("🌀 HYPERBOLIC FUNHOUSE MIRRORS")
 print("Flavor from ℍ/Γ(5) geometry with A₅ symmetry")
@@ -34,22 +45,14 @@ print(f"• A₅ ≅ PSL(2,5) ≅ icosahedral group (order 60)")
 print("\n⚖️ PART 2: Mass Formula")
 print("-" * 40)
 
+MASS_FORMULA = get_variant('phi-321')  # see src/models/variants.py for alternatives
+
 def predict_masses(k_values, L0, alpha=1.0):
     """
     Core formula: m_i = φ^{-k_i} × exp(-φ^{n_i} × L₀)
     where n_i = [3, 2, 1] for generations
     """
-    # Generation scaling from geodesic lengths
-    gen_scaling = [PHI**3, PHI**2, PHI**1]
-    
-    masses = []
-    for i, (k, phi_power) in enumerate(zip(k_values, gen_scaling)):
-        prefactor = PHI**(-k * alpha)
-        exponential = np.exp(-phi_power * L0)
-        masses.append(prefactor * exponential)
-    
-    masses = np.array(masses)
-    return masses / masses[-1]  # Normalize
+    return MASS_FORMULA.masses(k_values, L0, alpha)
 
 print("• Formula: m_i = φ^{-k_i} × exp(-φ^{n_i} × L₀)")
 print("• Three generations: n_i = 3, 2, 1")
@@ -59,22 +62,6 @@ print("• k_i = modular weights from A₅ representations")
 print("\n🔄 PART 3: CKM Matrix from Geometry")
 print("-" * 40)
 
-def build_ckm(theta12, theta23, theta13, delta_cp):
-    """Standard parameterization"""
-    c12, s12 = np.cos(theta12), np.sin(theta12)
-    c23, s23 = np.cos(theta23), np.sin(theta23)
-    c13, s13 = np.cos(theta13), np.sin(theta13)
-    
-    V = np.array([
-        [c12*c13, s12*c13, s13*np.exp(-1j*delta_cp)],
-        [-s12*c23 - c12*s23*s13*np.exp(1j*delta_cp), 
-         c12*c23 - s12*s23*s13*np.exp(1j*delta_cp), s23*c13],
-        [s12*s23 - c12*c23*s13*np.exp(1j*delta_cp),
-         -c12*s23 - s12*c23*s13*np.exp(1j*delta_cp), c23*c13]
-    ])
-    
-    return V
-
 print("• CKM = P exp(∮_γ A) (holonomy on ℍ/Γ(5))")
 print("• θ_ij = hyperbolic angles between geodesics")
 print("• δ_CP ∝ Area(geodesic triangle)")
@@ -83,27 +70,11 @@ print("• δ_CP ∝ Area(geodesic triangle)")
 print("\n📈 PART 4: Experimental Data (GUT scale)")
 print("-" * 40)
 
-# All values at GUT scale (~10^16 GeV)
-EXP_DATA = {
-    'masses': {
-        'u/m_t': 1.1e-5,    # up to top
-        'c/m_t': 0.0035,    # charm to top
-        'd/m_b': 1.0e-3,    # down to bottom
-        's/m_b': 0.020,     # strange to bottom
-    },
-    'ckm': {
-        'V_us': 0.22650,
-        'V_cb': 0.04053,
-        'V_ub': 0.00361,
-    },
-    'angles': {
-        'theta12': 0.227,   # radians
-        'theta23': 0.042,
-        'theta13': 0.0037,
-    },
-    'delta_cp': 1.20,       # radians (~68.8°)
-}
+# Central values and covariance from data/datasets (default: GUT scale ~10^16 GeV)
+DATASET = load_dataset()
+EXP_DATA = DATASET.as_exp_data()
 
+print(f"• Dataset: {DATASET.label}")
 print("• Quark mass ratios loaded")
 print("• CKM matrix elements loaded")
 print("• Mixing angles loaded")
@@ -114,46 +85,8 @@ print("\n🎯 PART 5: Optimizing Parameters")
 print("-" * 40)
 
 def calculate_error(params):
-    """How well do our predictions match experiment?"""
-    # Unpack parameters
-    k_u = params[:3]    # up weights
-    k_d = params[3:6]   # down weights
-    L0 = params[6]      # length scale
-    alpha = params[7]   # scaling
-    theta12, theta23, theta13 = params[8:11]  # angles
-    delta_cp = params[11]  # CP phase
-    
-    # Predict masses
-    m_u_pred = predict_masses(k_u, L0, alpha)
-    m_d_pred = predict_masses(k_d, L0, alpha)
-    
-    # Predict CKM
-    V_pred = build_ckm(theta12, theta23, theta13, delta_cp)
-    V_mag = np.abs(V_pred)
-    
-    # Calculate total error
-    error = 0.0
-    
-    # Mass errors (log scale)
-    error += ((np.log10(m_u_pred[0]) - np.log10(EXP_DATA['masses']['u/m_t']))**2) / 0.7**2
-    error += ((np.log10(m_u_pred[1]) - np.log10(EXP_DATA['masses']['c/m_t']))**2) / 0.3**2
-    error += ((np.log10(m_d_pred[0]) - np.log10(EXP_DATA['masses']['d/m_b']))**2) / 0.7**2
-    error += ((np.log10(m_d_pred[1]) - np.log10(EXP_DATA['masses']['s/m_b']))**2) / 0.4**2
-    
-    # CKM errors
-    error += ((V_mag[0,1] - EXP_DATA['ckm']['V_us'])**2) / 0.001**2
-    error += ((V_mag[1,2] - EXP_DATA['ckm']['V_cb'])**2) / 0.001**2
-    error += ((V_mag[0,2] - EXP_DATA['ckm']['V_ub'])**2) / 0.0005**2
-    
-    # Angle errors
-    error += ((theta12 - EXP_DATA['angles']['theta12'])**2) / 0.001**2
-    error += ((theta23 - EXP_DATA['angles']['theta23'])**2) / 0.001**2
-    error += ((theta13 - EXP_DATA['angles']['theta13'])**2) / 0.0001**2
-    
-    # CP phase error
-    error += ((delta_cp - EXP_DATA['delta_cp'])**2) / 0.1**2
-    
-    return error
+    """How well do our predictions match experiment? (full-covariance chi²)"""
+    return DATASET.chi2(np.asarray(params), MASS_FORMULA.name)
 
 # Initial guess
 initial_guess = [
@@ -164,30 +97,27 @@ initial_guess = [
 ]
 
 print("• Starting optimization...")
+fit_start = time.perf_counter()
 result = minimize(calculate_error, initial_guess, method='Nelder-Mead',
                  options={'maxiter': 1000, 'disp': False})
 
+fit_elapsed = time.perf_counter() - fit_start
 print(f"• Optimization complete! Error: {result.fun:.2f}")
 
 # Extract best parameters
-best = result.x
-k_u_best = best[:3]
-k_d_best = best[3:6]
-L0_best = best[6]
-alpha_best = best[7]
-theta12_best, theta23_best, theta13_best = best[8:11]
-delta_cp_best = best[11]
+fit = FitResult.from_optimize(result, DATASET, MASS_FORMULA)
+best = fit.x
+k_u_best, k_d_best = fit.k_u, fit.k_d
+L0_best, alpha_best = fit.L0, fit.alpha
+theta12_best, theta23_best, theta13_best, delta_cp_best = fit.mixing
 
 # ====================== PART 6: PREDICTIONS ======================
 print("\n📊 PART 6: Predictions vs Experiment")
 print("-" * 40)
 
 # Compute predictions
-m_u_pred = predict_masses(k_u_best, L0_best, alpha_best)
-m_d_pred = predict_masses(k_d_best, L0_best, alpha_best)
-V_pred = build_ckm(theta12_best, theta23_best, theta13_best, delta_cp_best)
-V_mag = np.abs(V_pred)
-J = np.imag(V_pred[0,0] * V_pred[0,1].conj() * V_pred[1,0].conj() * V_pred[1,1])
+m_u_pred, m_d_pred = fit.m_u, fit.m_d
+V_pred, V_mag, J = fit.V, fit.V_abs, fit.J
 
 print("\nMASS RATIOS:")
 print(f"  m_u/m_t: {m_u_pred[0]:.2e} (exp: {EXP_DATA['masses']['u/m_t']:.1e})")
@@ -208,98 +138,8 @@ print(f"  Jarlskog J: {J:.2e} (exp: ~3.0e-5)")
 print("\n🎨 PART 7: Creating Visualizations")
 print("-" * 40)
 
-fig, axes = plt.subplots(2, 3, figsize=(15, 10))
-
-# 1. Mass hierarchy
-ax1 = axes[0, 0]
-gen = ['1st', '2nd', '3rd']
-x = np.arange(3)
-width = 0.35
-
-ax1.bar(x - width/2, m_u_pred, width, alpha=0.8, color='blue', label='Up')
-ax1.bar(x + width/2, m_d_pred, width, alpha=0.8, color='red', label='Down')
-ax1.set_yscale('log')
-ax1.set_xticks(x)
-ax1.set_xticklabels(gen)
-ax1.set_ylabel('Mass (normalized)')
-ax1.set_title('Quark Mass Hierarchy')
-ax1.legend()
-ax1.grid(True, alpha=0.3)
-
-# 2. CKM matrix
-ax2 = axes[0, 1]
-im = ax2.imshow(V_mag, cmap='YlOrRd', vmin=0.9, vmax=1.0)
-for i in range(3):
-    for j in range(3):
-        color = 'black' if V_mag[i,j] > 0.95 else 'white'
-        ax2.text(j, i, f'{V_mag[i,j]:.4f}', ha='center', va='center', color=color)
-ax2.set_xticks([0, 1, 2])
-ax2.set_yticks([0, 1, 2])
-ax2.set_xticklabels(['d', 's', 'b'])
-ax2.set_yticklabels(['u', 'c', 't'])
-ax2.set_title('CKM Matrix |V$_{ij}$|')
-plt.colorbar(im, ax=ax2)
-
-# 3. Golden ratio scaling
-ax3 = axes[0, 2]
-n_vals = [3, 2, 1, 0]
-scaling = PHI**(-np.array(n_vals))
-ax3.plot(n_vals, scaling, 'o-', linewidth=3, markersize=10, color='goldenrod')
-for n, s in zip(n_vals, scaling):
-    ax3.text(n, s*1.3, f'φ^{{-{n}}}', ha='center', fontweight='bold')
-ax3.set_xlabel('Generation Index')
-ax3.set_ylabel('Scaling φ^{-n}')
-ax3.set_yscale('log')
-ax3.set_title('Golden Ratio Scaling')
-ax3.grid(True, alpha=0.3)
-
-# 4. Parameters
-ax4 = axes[1, 0]
-param_names = ['k_u1', 'k_u2', 'k_u3', 'k_d1', 'k_d2', 'k_d3', 'L₀', 'α']
-param_values = list(k_u_best) + list(k_d_best) + [L0_best, alpha_best]
-colors = ['blue']*3 + ['red']*3 + ['green', 'purple']
-ax4.bar(param_names, param_values, color=colors, alpha=0.7)
-ax4.set_ylabel('Value')
-ax4.set_title('Best Fit Parameters')
-ax4.tick_params(axis='x', rotation=45)
-ax4.grid(True, alpha=0.3, axis='y')
-
-# 5. Mixing angles
-ax5 = axes[1, 1]
-angles = ['θ₁₂', 'θ₂₃', 'θ₁₃', 'δ_CP']
-pred = [theta12_best, theta23_best, theta13_best, delta_cp_best]
-exp = [EXP_DATA['angles']['theta12'], EXP_DATA['angles']['theta23'], 
-       EXP_DATA['angles']['theta13'], EXP_DATA['delta_cp']]
-x_pos = np.arange(4)
-ax5.bar(x_pos - 0.2, pred, 0.4, alpha=0.8, color='teal', label='Predicted')
-ax5.bar(x_pos + 0.2, exp, 0.4, alpha=0.5, color='orange', label='Experimental')
-ax5.set_xticks(x_pos)
-ax5.set_xticklabels(angles)
-ax5.set_ylabel('Angle (rad)')
-ax5.set_title('Mixing Angles & CP Phase')
-ax5.legend()
-ax5.grid(True, alpha=0.3)
-
-# 6. Geometric triangle
-ax6 = axes[1, 2]
-vertices = [[0, 0], [1, 0], [0.5, np.sqrt(3)/2]]
-triangle = plt.Polygon(vertices, closed=True, alpha=0.3, color='purple')
-ax6.add_patch(triangle)
-labels = ['Gen 1', 'Gen 2', 'Gen 3']
-for i, (x, y) in enumerate(vertices):
-    ax6.text(x, y, labels[i], ha='center', va='center', fontweight='bold')
-ax6.set_xlim(-0.2, 1.2)
-ax6.set_ylim(-0.2, 1.2)
-ax6.set_aspect('equal')
-ax6.set_title('Hyperbolic Triangle')
-ax6.grid(True, alpha=0.3)
-
-plt.suptitle('HYPERBOLIC FUNHOUSE MIRRORS: Complete Flavor Model', 
-             fontsize=16, fontweight='bold', y=1.02)
-plt.tight_layout()
-plt.savefig('figures/results.png', dpi=300, bbox_inches='tight')
-print("• Saved plot to: figures/results.png")
-plt.show()
+figure = plot_results(best, DATASET, 'figures/results.png')
+print(f"• Saved plot to: figures/results.png (redrew {len(figure['rendered'])} of 6 panels)")
 
 # ====================== PART 8: SAVE RESULTS ======================
 print("\n💾 PART 8: Saving Results")
@@ -334,6 +174,12 @@ np.savez('data/all_results.npz',
 
 print("• Saved all data to: data/all_results.npz")
 
+with ResultsStore() as store:
+    store.record_fit(best, result.fun, DATASET, variant=MASS_FORMULA.name,
+                     elapsed=fit_elapsed,
+                     extra={'script': 'src.models.quark_model', 'nit': result.nit})
+print(f"• Appended fit to: {store.path}")
+
 # ====================== PART 9: SUMMARY ======================
 print("\n" + "=" * 80)
 print("✅ SUMMARY: What We Built")
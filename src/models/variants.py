@@ -0,0 +1,201 @@
+"""
+Mass-formula variants
+Registry of alternative mass formulas, each a batched kernel checked against a scalar reference
+"""
+
+import math
+
+import numpy as np
+
+from src.core.mathematics import PHI
+from src.models.flavor import (observables_from_log_masses, derived_from_masses,
+                               INITIAL_GUESS, LOG_PHI, PARAM_BOUNDS, PARAM_NAMES,
+                               K_U, K_D, L0_INDEX, ALPHA_INDEX)
+
+DEFAULT_VARIANT = 'phi-321'
+
+VARIANTS = {}
+
+
+class MassFormula:
+    """
+    log m_i / m_3 = -(k_i - k_3) alpha ln(phi) - (s_i - s_3) L0 for both sectors,
+    with the generation scaling s_i a fixed vector (phi^n_i for the paper's
+    formula). Variants append their own parameters after the 12 standard ones.
+    """
+
+    extra_names = []
+    extra_bounds = np.empty((0, 2))
+    extra_initial = np.empty(0)
+
+    def __init__(self, name, scaling, description=''):
+        self.name = name
+        self.scaling = np.asarray(scaling, dtype=float)
+        self.description = description
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.name!r})"
+
+    # ------------------------------------------------------------- layout
+
+    @property
+    def param_names(self):
+        return PARAM_NAMES + list(self.extra_names)
+
+    @property
+    def n_params(self):
+        return len(self.param_names)
+
+    @property
+    def bounds(self):
+        return np.vstack([PARAM_BOUNDS, self.extra_bounds])
+
+    @property
+    def initial(self):
+        return np.concatenate([INITIAL_GUESS, self.extra_initial])
+
+    # ------------------------------------------------------------ kernels
+
+    def sector_log_masses(self, k, L0, alpha, extra, sector):
+        """Batched normalized log masses (..., 3); sector 0 is up, 1 is down"""
+        scaling = self.scaling.astype(np.result_type(k, L0, alpha, np.float32), copy=False)
+        log_m = -k * alpha[..., None] * LOG_PHI - scaling * L0[..., None]
+        return log_m - log_m[..., -1:]
+
+    def reference(self, params):
+        """Scalar loop version: masses m_i / m_3 of one vector as [up, down]"""
+        out = []
+        L0, alpha = params[L0_INDEX], params[ALPHA_INDEX]
+        for k in (params[0:3], params[3:6]):
+            m = [PHI**(-k_i * alpha) * math.exp(-s_i * L0)
+                 for k_i, s_i in zip(k, self.scaling)]
+            out.append([m_i / m[-1] for m_i in m])
+        return out
+
+    def masses(self, k, L0, alpha=1.0, extra=None, sector=0):
+        """Normalized masses of one sector, like flavor.predict_masses (extras at their initial values)"""
+        L0, alpha = np.asarray(L0, dtype=float), np.asarray(alpha, dtype=float)
+        if extra is None:
+            extra = np.broadcast_to(self.extra_initial, L0.shape + self.extra_initial.shape)
+        return np.exp(self.sector_log_masses(np.asarray(k, dtype=float), L0, alpha,
+                                             np.asarray(extra, dtype=float), sector))
+
+    def log_masses(self, params):
+        """(log up, log down) normalized masses for params of shape (..., n_params)"""
+        L0, alpha = params[..., L0_INDEX], params[..., ALPHA_INDEX]
+        extra = params[..., len(PARAM_NAMES):]
+        return (self.sector_log_masses(params[..., K_U], L0, alpha, extra, 0),
+                self.sector_log_masses(params[..., K_D], L0, alpha, extra, 1))
+
+    def predict_observables(self, params):
+        """As flavor.predict_observables, with this variant's masses"""
+        params = np.asarray(params)
+        params = params.astype(np.result_type(params, np.float32), copy=False)
+        return observables_from_log_masses(*self.log_masses(params), params)
+
+    def log_mass_scale(self, params):
+        """
+        Bound on |log m_i| before normalization, max|k| |alpha| ln(phi) +
+        max(s) |L0|, per vector: the magnitude that sets the absolute
+        rounding error of the log masses (and so the float32 screening error)
+        """
+        params = np.asarray(params)
+        k = np.abs(params[..., 0])
+        for i in range(1, 6):          # column by column: reductions over a length-6 axis are slow
+            np.maximum(k, np.abs(params[..., i]), out=k)
+        return (k * np.abs(params[..., ALPHA_INDEX]) * LOG_PHI
+                + np.abs(self.scaling).max() * np.abs(params[..., L0_INDEX]))
+
+    def derived_observables(self, params):
+        params = np.asarray(params, dtype=float)
+        log_up, log_down = self.log_masses(params)
+        return derived_from_masses(np.exp(log_up), np.exp(log_down), params)
+
+    # --------------------------------------------------------- validation
+
+    def validate(self, n=64, rtol=1e-10, seed=0):
+        """Compare the batched kernel with the scalar reference at random points"""
+        rng = np.random.default_rng(seed)
+        lo, hi = self.bounds.T
+        # keep the masses within double range: small weights and L0
+        hi = np.where(np.arange(self.n_params) < 6, np.minimum(hi, 8.0), hi)
+        hi[L0_INDEX] = min(hi[L0_INDEX], 3.0)
+        points = lo + (hi - lo) * rng.random((n, self.n_params))
+        batched = np.exp(np.stack(self.log_masses(points), axis=1))
+        scalar = np.array([self.reference(list(p)) for p in points])
+        if not np.allclose(batched, scalar, rtol=rtol, atol=0):
+            worst = np.max(np.abs(batched - scalar) / np.abs(scalar))
+            raise ValueError(f"variant {self.name!r}: batched kernel disagrees with "
+                             f"its scalar reference (max rel. error {worst:.2e})")
+
+
+class AdditiveCorrection(MassFormula):
+    """
+    A base formula plus a constant per sector: m_i / m_3 -> (r_i + eps) / (1 + eps).
+    The two extra parameters are log10 eps_u and log10 eps_d, which keeps eps
+    positive without hard walls for the local optimizers and samplers.
+    """
+
+    extra_names = ['log10_eps_u', 'log10_eps_d']
+    extra_bounds = np.array([[-12.0, -2.0], [-12.0, -2.0]])
+    extra_initial = np.array([-10.0, -10.0])
+
+    def __init__(self, base, name=None):
+        super().__init__(name or f"{base.name}+eps", base.scaling,
+                         f"{base.description} with additive corrections")
+        self.base = base
+
+    def sector_log_masses(self, k, L0, alpha, extra, sector):
+        log_r = self.base.sector_log_masses(k, L0, alpha, extra, sector)
+        eps = 10.0**extra[..., sector, None]
+        return np.log(np.exp(log_r) + eps) - np.log1p(eps)
+
+    def reference(self, params):
+        eps = [10.0**p for p in params[len(PARAM_NAMES):]]
+        return [[(r + e) / (1 + e) for r in sector]
+                for sector, e in zip(self.base.reference(params[:len(PARAM_NAMES)]), eps)]
+
+
+def fibonacci(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+
+def register(variant, validate=True):
+    """Add a variant to the registry (checked against its scalar reference first)"""
+    if validate:
+        variant.validate()
+    VARIANTS[variant.name] = variant
+    return variant
+
+
+def get_variant(variant=None):
+    """Registry lookup by name; variant objects and None (the default) pass through"""
+    if variant is None:
+        variant = DEFAULT_VARIANT
+    if isinstance(variant, MassFormula):
+        return variant
+    try:
+        return VARIANTS[variant]
+    except KeyError:
+        raise ValueError(f"Unknown variant '{variant}'; available: {sorted(VARIANTS)}") from None
+
+
+def phi_powers(n):
+    """s_i = phi^n_i, named e.g. 'phi-321'"""
+    return MassFormula(f"phi-{''.join(map(str, n))}", PHI**np.asarray(n, dtype=float),
+                       f"phi^n scaling with n = {list(n)}")
+
+
+def fibonacci_numbers(n):
+    """s_i = F(n_i + 2), the integer counterpart of phi^n_i, named e.g. 'fib-321'"""
+    return MassFormula(f"fib-{''.join(map(str, n))}", [fibonacci(i + 2) for i in n],
+                       f"Fibonacci scaling F(n + 2) with n = {list(n)}")
+
+
+for _n in [(3, 2, 1), (4, 3, 2), (5, 3, 1), (4, 2, 1)]:
+    register(phi_powers(_n))
+register(fibonacci_numbers((3, 2, 1)))
+register(AdditiveCorrection(VARIANTS['phi-321']))
@@ -0,0 +1,210 @@
+"""
+chi^2 landscape slices over any two parameters
+Tiled evaluation with on-disk min / mean pyramids and level-of-detail rendering
+"""
+
+import hashlib
+import json
+from functools import partial
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from src.models.datasets import load_dataset
+from src.models.variants import get_variant
+
+MIN, MEAN = 0, 1
+
+
+class LandscapeSlice:
+    """
+    chi^2 over parameters (i, j) of a variant around a base point, on a base
+    grid of `resolution`^2 pixels split into `tile`^2 tiles.
+
+    Level 0 is the base grid (one evaluation per pixel); level L halves the
+    resolution L times. Each level is a sparse on-disk memmap of (min, mean)
+    per pixel plus a tile-done mask. A coarse tile is reduced exactly from its
+    four children when they exist, otherwise evaluated directly with
+    `supersample`^2 points per pixel, so rendering a zoomed-out view never
+    touches the full-resolution grid. Once the last of four children is
+    computed their parent is (re)reduced from them, and so on upwards, so a
+    directly evaluated tile does not outlive its children and the pyramid
+    does not depend on the order in which views were requested.
+    """
+
+    def __init__(self, root, base, i, j, x_range, y_range, resolution=4096,
+                 tile=256, supersample=2, dataset=None, objective=None, variant=None):
+        if resolution % tile or (resolution // tile) & (resolution // tile - 1):
+            raise ValueError("resolution must be tile * 2^k")
+        dataset = load_dataset() if dataset is None else dataset
+        formula = get_variant(variant)
+        self.objective = (partial(dataset.chi2, variant=formula.name) if objective is None
+                          else objective)
+        self.names = formula.param_names
+        self.base = np.asarray(base, dtype=float)
+        self.i, self.j = i, j
+        self.x_range, self.y_range = tuple(map(float, x_range)), tuple(map(float, y_range))
+        self.resolution, self.tile, self.supersample = resolution, tile, supersample
+        self.n_levels = int(np.log2(resolution // tile)) + 1
+
+        meta = {'base': self.base.tolist(), 'i': i, 'j': j, 'x_range': self.x_range,
+                'y_range': self.y_range, 'resolution': resolution, 'tile': tile,
+                'supersample': supersample, 'variant': formula.name,
+                'inputs': getattr(dataset, 'fingerprint', None) if objective is None
+                else getattr(objective, '__qualname__', repr(objective))}
+        key = hashlib.sha1(json.dumps(meta, sort_keys=True).encode()).hexdigest()[:12]
+        self.root = Path(root) / f"{self.names[i]}-{self.names[j]}-{key}"
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / 'meta.json').write_text(json.dumps(meta, indent=1))
+        self.stats = {'evaluated': 0, 'reduced': 0, 'reused': 0}
+
+    # ---------------------------------------------------------------- storage
+
+    def size(self, level):
+        return self.resolution >> level
+
+    def _level(self, level):
+        """(values memmap (2, n, n), done mask path, done mask)"""
+        n = self.size(level)
+        path = self.root / f"level{level}.npy"
+        mode = 'r+' if path.exists() else 'w+'
+        values = open_memmap(path, mode=mode, dtype=np.float32, shape=(2, n, n))
+        done_path = self.root / f"level{level}_done.npy"
+        done = (np.load(done_path) if done_path.exists()
+                else np.zeros((n // self.tile,) * 2, dtype=bool))
+        return values, done_path, done
+
+    # ------------------------------------------------------------ computation
+
+    def _points(self, level, ty, tx, sub):
+        """Parameter vectors for a tile: `sub`^2 points per pixel, (T, T, sub^2, n_params)"""
+        n, T = self.size(level), self.tile
+        dx = (self.x_range[1] - self.x_range[0]) / n
+        dy = (self.y_range[1] - self.y_range[0]) / n
+        offs = (np.arange(sub) + 0.5) / sub
+        xs = self.x_range[0] + ((tx * T + np.arange(T))[:, None] + offs).ravel() * dx
+        ys = self.y_range[0] + ((ty * T + np.arange(T))[:, None] + offs).ravel() * dy
+        p = np.broadcast_to(self.base, (T * sub, T * sub, len(self.base))).copy()
+        p[..., self.i] = xs[None, :]
+        p[..., self.j] = ys[:, None]
+        return p.reshape(T, sub, T, sub, -1).transpose(0, 2, 1, 3, 4).reshape(T, T, sub * sub, -1)
+
+    def _children_done(self, level, ty, tx):
+        """Whether the four level - 1 children of tile (ty, tx) of `level` are done"""
+        _, _, child_done = self._level(level - 1)
+        return child_done[2 * ty:2 * ty + 2, 2 * tx:2 * tx + 2].all()
+
+    def _reduce(self, level, ty, tx):
+        """Tile (ty, tx) of `level` as the exact min / mean of its four children"""
+        T = self.tile
+        block = (slice(ty * T, (ty + 1) * T), slice(tx * T, (tx + 1) * T))
+        values, done_path, done = self._level(level)
+        child_values, _, _ = self._level(level - 1)
+        c = child_values[:, 2 * ty * T:2 * (ty + 1) * T, 2 * tx * T:2 * (tx + 1) * T]
+        c = c.reshape(2, T, 2, T, 2)
+        values[MIN][block] = c[MIN].min(axis=(1, 3))
+        values[MEAN][block] = c[MEAN].mean(axis=(1, 3))
+        self.stats['reduced'] += 1
+        done[ty, tx] = True
+        values.flush()
+        np.save(done_path, done)
+
+    def _refresh_ancestors(self, level, ty, tx):
+        """Reduce the ancestors of a new tile for as long as its siblings are all done"""
+        while level + 1 < self.n_levels:
+            ty, tx = ty // 2, tx // 2
+            if not self._children_done(level + 1, ty, tx):
+                return
+            self._reduce(level + 1, ty, tx)
+            level += 1
+
+    def _compute_tile(self, level, ty, tx):
+        if level > 0 and self._children_done(level, ty, tx):
+            self._reduce(level, ty, tx)
+        else:
+            self._evaluate(level, ty, tx)
+        self._refresh_ancestors(level, ty, tx)
+
+    def _evaluate(self, level, ty, tx):
+        T = self.tile
+        block = (slice(ty * T, (ty + 1) * T), slice(tx * T, (tx + 1) * T))
+        values, done_path, done = self._level(level)
+        sub = 1 if level == 0 else self.supersample
+        f = self.objective(self._points(level, ty, tx, sub).reshape(-1, len(self.base)))
+        f = f.reshape(T, T, sub * sub)
+        values[MIN][block] = f.min(axis=-1)
+        values[MEAN][block] = f.mean(axis=-1)
+        self.stats['evaluated'] += f.size
+        done[ty, tx] = True
+        values.flush()
+        np.save(done_path, done)
+
+    def clip_view(self, view):
+        """The part of view = (x0, x1, y0, y1) inside the slice; ValueError if none is"""
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        clipped = (max(view[0], x0), min(view[1], x1), max(view[2], y0), min(view[3], y1))
+        if not (clipped[0] < clipped[1] and clipped[2] < clipped[3]):
+            raise ValueError(f"view {tuple(view)} does not overlap the slice "
+                             f"x {self.x_range}, y {self.y_range}")
+        return clipped
+
+    def region(self, level, view, stat=MIN):
+        """Pixels of `level` covering view = (x0, x1, y0, y1), computing missing tiles"""
+        view = self.clip_view(view)
+        n, T = self.size(level), self.tile
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        col = lambda x: int(np.clip((x - x0) / (x1 - x0) * n, 0, n - 1))
+        row = lambda y: int(np.clip((y - y0) / (y1 - y0) * n, 0, n - 1))
+        c0, c1 = col(view[0]), max(int(np.ceil((view[1] - x0) / (x1 - x0) * n)), col(view[0]) + 1)
+        r0, r1 = row(view[2]), max(int(np.ceil((view[3] - y0) / (y1 - y0) * n)), row(view[2]) + 1)
+
+        _, _, done = self._level(level)
+        for ty in range(r0 // T, (r1 - 1) // T + 1):
+            for tx in range(c0 // T, (c1 - 1) // T + 1):
+                if done[ty, tx]:
+                    self.stats['reused'] += 1
+                else:
+                    self._compute_tile(level, ty, tx)
+        values, _, _ = self._level(level)
+        extent = (x0 + c0 * (x1 - x0) / n, x0 + c1 * (x1 - x0) / n,
+                  y0 + r0 * (y1 - y0) / n, y0 + r1 * (y1 - y0) / n)
+        return np.array(values[stat, r0:r1, c0:c1]), extent
+
+    def level_for(self, view, width):
+        """Coarsest level that still has >= `width` pixels across the view"""
+        frac = (view[1] - view[0]) / (self.x_range[1] - self.x_range[0])
+        for level in reversed(range(self.n_levels)):
+            if self.size(level) * frac >= width:
+                return level
+        return 0
+
+    # -------------------------------------------------------------- rendering
+
+    def render(self, path, view=None, size=(800, 800), stat='min', contours=True):
+        """
+        Heatmap (+ contours) of log10 chi^2 at the resolution the output
+        needs; a view reaching outside the slice is cut to it
+        """
+        view = self.clip_view(self.x_range + self.y_range if view is None else view)
+        level = self.level_for(view, size[0])
+        data, extent = self.region(level, view, MIN if stat == 'min' else MEAN)
+        z = np.log10(np.maximum(data, 1e-12))
+
+        dpi = 100
+        fig, ax = plt.subplots(figsize=(size[0] / dpi, size[1] / dpi), dpi=dpi)
+        im = ax.imshow(z, origin='lower', extent=extent, aspect='auto', cmap='viridis_r')
+        if contours:
+            ax.contour(z, levels=10, colors='white', linewidths=0.5, alpha=0.6,
+                       origin='lower', extent=extent)
+        fig.colorbar(im, ax=ax, label=f'log10 chi² ({stat})')
+        ax.set_xlabel(self.names[self.i])
+        ax.set_ylabel(self.names[self.j])
+        ax.set_title(f'chi² landscape (level {level}, {data.shape[1]}x{data.shape[0]} px)')
+        fig.tight_layout()
+        fig.savefig(path)
+        plt.close(fig)
+        return {'output': str(path), 'level': level, 'shape': data.shape, **self.stats}
@@ -0,0 +1,205 @@
+"""
+Six-panel summary figure of a fit
+Each panel renders headless (Agg) as its own job, skipped when its inputs are unchanged
+"""
+
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from src.core.mathematics import PHI
+from src.core.tiling import tiling
+from src.models.datasets import load_dataset
+from src.models.parameters import FitResult
+from src.plotting.tiling import draw_tiling
+
+PANEL_SIZE = (5, 5)        # inches; 2 x 3 panels give the old 15 x 10 figure
+TITLE_HEIGHT = 0.6
+TITLE = 'HYPERBOLIC FUNHOUSE MIRRORS: Complete Flavor Model'
+LAYOUT = [['mass', 'ckm', 'scaling'], ['params', 'angles', 'tiling']]
+RENDER_VERSION = 2         # bump to invalidate every cached panel
+
+
+def draw_mass(ax, d):
+    x = np.arange(3)
+    width = 0.35
+    ax.bar(x - width/2, d['m_u'], width, alpha=0.8, color='blue', label='Up')
+    ax.bar(x + width/2, d['m_d'], width, alpha=0.8, color='red', label='Down')
+    ax.set_yscale('log')
+    ax.set_xticks(x)
+    ax.set_xticklabels(['1st', '2nd', '3rd'])
+    ax.set_ylabel('Mass (normalized)')
+    ax.set_title('Quark Mass Hierarchy')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+
+def draw_ckm(ax, d):
+    V_mag = d['V_mag']
+    im = ax.imshow(V_mag, cmap='YlOrRd', vmin=0.9, vmax=1.0)
+    for i in range(3):
+        for j in range(3):
+            color = 'black' if V_mag[i, j] > 0.95 else 'white'
+            ax.text(j, i, f'{V_mag[i, j]:.4f}', ha='center', va='center', color=color)
+    ax.set_xticks([0, 1, 2])
+    ax.set_yticks([0, 1, 2])
+    ax.set_xticklabels(['d', 's', 'b'])
+    ax.set_yticklabels(['u', 'c', 't'])
+    ax.set_title('CKM Matrix |V$_{ij}$|')
+    ax.figure.colorbar(im, ax=ax)
+
+
+def draw_scaling(ax, d):
+    n_vals = d['n']
+    scaling = PHI**(-n_vals)
+    ax.plot(n_vals, scaling, 'o-', linewidth=3, markersize=10, color='goldenrod')
+    for n, s in zip(n_vals, scaling):
+        ax.text(n, s*1.3, f'φ^{{-{n}}}', ha='center', fontweight='bold')
+    ax.set_xlabel('Generation Index')
+    ax.set_ylabel('Scaling φ^{-n}')
+    ax.set_yscale('log')
+    ax.set_title('Golden Ratio Scaling')
+    ax.grid(True, alpha=0.3)
+
+
+def draw_params(ax, d):
+    names = ['k_u1', 'k_u2', 'k_u3', 'k_d1', 'k_d2', 'k_d3', 'L₀', 'α']
+    colors = ['blue']*3 + ['red']*3 + ['green', 'purple']
+    ax.bar(names, d['values'], color=colors, alpha=0.7)
+    ax.set_ylabel('Value')
+    ax.set_title('Best Fit Parameters')
+    ax.tick_params(axis='x', rotation=45)
+    ax.grid(True, alpha=0.3, axis='y')
+
+
+def draw_angles(ax, d):
+    x_pos = np.arange(4)
+    ax.bar(x_pos - 0.2, d['pred'], 0.4, alpha=0.8, color='teal', label='Predicted')
+    ax.bar(x_pos + 0.2, d['exp'], 0.4, alpha=0.5, color='orange', label='Experimental')
+    ax.set_xticks(x_pos)
+    ax.set_xticklabels(['θ₁₂', 'θ₂₃', 'θ₁₃', 'δ_CP'])
+    ax.set_ylabel('Angle (rad)')
+    ax.set_title('Mixing Angles & CP Phase')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+
+def draw_tiling_panel(ax, d):
+    draw_tiling(ax, tiling(int(d['depth'][0]), float(d['min_size'][0])), 'disk')
+    ax.set_title('Γ(5) Tiling of the Disk')
+
+
+PANELS = {
+    'mass': draw_mass,
+    'ckm': draw_ckm,
+    'scaling': draw_scaling,
+    'params': draw_params,
+    'angles': draw_angles,
+    'tiling': draw_tiling_panel,
+}
+
+
+def panel_data(params, dataset=None, variant=None):
+    """The inputs of every panel, as plain arrays (these are what gets hashed)"""
+    dataset = load_dataset() if dataset is None else dataset
+    exp_data = dataset.as_exp_data()
+    fit = FitResult(params, variant=variant)
+    return {
+        'mass': {'m_u': fit.m_u, 'm_d': fit.m_d},
+        'ckm': {'V_mag': fit.V_abs},
+        'scaling': {'n': np.array([3, 2, 1, 0])},
+        'params': {'values': np.concatenate([fit.k_u, fit.k_d, [fit.L0, fit.alpha]])},
+        'angles': {'pred': fit.mixing,
+                   'exp': np.array([exp_data['angles']['theta12'],
+                                    exp_data['angles']['theta23'],
+                                    exp_data['angles']['theta13'],
+                                    exp_data['delta_cp']])},
+        'tiling': {'depth': np.array([6]), 'min_size': np.array([5e-3])},
+    }
+
+
+def data_hash(name, data, dpi):
+    h = hashlib.sha1(f"{name}:{dpi}:{RENDER_VERSION}".encode())
+    for key in sorted(data):
+        value = np.ascontiguousarray(data[key])
+        h.update(key.encode())
+        h.update(str(value.dtype).encode() + str(value.shape).encode())
+        h.update(value.tobytes())
+    return h.hexdigest()
+
+
+def render_panel(name, data, path, dpi):
+    """One panel on its own Agg figure of fixed size"""
+    fig, ax = plt.subplots(figsize=PANEL_SIZE)
+    PANELS[name](ax, data)
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+    return name
+
+
+def render_title(path, dpi):
+    fig = plt.figure(figsize=(PANEL_SIZE[0] * 3, TITLE_HEIGHT))
+    fig.text(0.5, 0.5, TITLE, ha='center', va='center', fontsize=16, fontweight='bold')
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+    return 'title'
+
+
+def assemble(panel_dir, path):
+    """Stack the title strip and the 2 x 3 panel images into one PNG"""
+    panel_dir = Path(panel_dir)
+    rows = [np.concatenate([plt.imread(panel_dir / f"{name}.png") for name in row], axis=1)
+            for row in LAYOUT]
+    plt.imsave(path, np.concatenate([plt.imread(panel_dir / "title.png")] + rows, axis=0))
+
+
+def plot_results(params, dataset=None, path='figures/results.png', dpi=300,
+                 workers=None, panel_dir=None, force=False, variant=None):
+    """
+    Render the summary figure incrementally.
+
+    Panels whose input hash matches the manifest from the previous render are
+    reused; the rest are drawn, on a process pool of that size with
+    workers > 1 (a calling script then needs a __main__ guard under the
+    spawn start method) and serially otherwise, then all six are composed
+    into `path`. Returns the lists of rendered / skipped panels.
+    """
+    path = Path(path)
+    panel_dir = Path(panel_dir) if panel_dir else path.parent / f".{path.stem}_panels"
+    panel_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = panel_dir / 'manifest.json'
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    data = panel_data(params, dataset, variant)
+    jobs, skipped, hashes = [], [], {}
+    for name in PANELS:
+        hashes[name] = data_hash(name, data[name], dpi)
+        target = panel_dir / f"{name}.png"
+        if not force and manifest.get(name) == hashes[name] and target.exists():
+            skipped.append(name)
+        else:
+            jobs.append((name, data[name], target, dpi))
+    hashes['title'] = data_hash('title', {'text': np.frombuffer(TITLE.encode(), np.uint8)}, dpi)
+    render_title_job = force or manifest.get('title') != hashes['title'] or \
+        not (panel_dir / 'title.png').exists()
+
+    rendered = []
+    if len(jobs) > 1 and workers is not None and workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            rendered = list(pool.map(render_panel, *zip(*jobs)))
+    else:
+        rendered = [render_panel(*job) for job in jobs]
+    if render_title_job:
+        render_title(panel_dir / 'title.png', dpi)
+
+    if rendered or render_title_job or not path.exists():
+        assemble(panel_dir, path)
+    manifest_path.write_text(json.dumps(hashes, indent=1))
+    return {'output': str(path), 'rendered': rendered, 'skipped': skipped}
@@ -0,0 +1,69 @@
+"""
+Gamma(5) tiling figures
+All geodesic arcs sampled in one batch and drawn as LineCollections, in the half-plane or the disk
+"""
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection
+
+from src.core.tiling import tiling, geodesic_arcs, to_disk
+
+MODELS = ('disk', 'half-plane')
+HALF_PLANE_VIEW = (-2.5, 2.5, 0.0, 2.5)
+STYLES = {                 # edge class: (colour, line width)
+    'triangle': ('0.6', 0.15),
+    'boundary': ('black', 0.5),
+    'outline': ('purple', 1.5),
+}
+
+
+def arc_segments(t, model='disk', n=24):
+    """(n_edges, n, 2) polylines of every edge of a tiling in the chosen model"""
+    if model not in MODELS:
+        raise ValueError(f"model must be one of {MODELS}")
+    if model == 'disk':
+        # cut the edges into the cusp at infinity within 1e-3 of the circle
+        return to_disk(geodesic_arcs(t['z1'], t['z2'], n, y_max=1e3))
+    return geodesic_arcs(t['z1'], t['z2'], n, y_max=HALF_PLANE_VIEW[3] * 2)
+
+
+def draw_tiling(ax, t, model='disk', n=24):
+    """Three LineCollections: modular triangles, domain boundaries, the outline of D"""
+    segments = arc_segments(t, model, n)
+    classes = {
+        'triangle': ~t['boundary'],
+        'boundary': t['boundary'] & ~t['outline'],
+        'outline': t['outline'],
+    }
+    for name, mask in classes.items():
+        color, width = STYLES[name]
+        ax.add_collection(LineCollection(segments[mask], colors=color, linewidths=width))
+    if model == 'disk':
+        ax.add_patch(plt.Circle((0, 0), 1, fill=False, color='black', linewidth=0.8))
+        ax.set_xlim(-1.02, 1.02)
+        ax.set_ylim(-1.02, 1.02)
+        ax.axis('off')
+    else:
+        ax.set_xlim(*HALF_PLANE_VIEW[:2])
+        ax.set_ylim(*HALF_PLANE_VIEW[2:])
+        ax.axhline(0, color='black', linewidth=0.8)
+    ax.set_aspect('equal')
+    return len(segments)
+
+
+def plot_tiling(path='figures/tiling.png', depth=8, model='disk', min_size=2e-3,
+                size=8, dpi=200, n=24):
+    """Render the Gamma(5) tiling to `path`; returns the tiling's size"""
+    t = tiling(depth, min_size)
+    fig, ax = plt.subplots(figsize=(size, size))
+    n_edges = draw_tiling(ax, t, model, n)
+    ax.set_title(f'Γ(5) tiling, depth {depth} ({len(t["elements"])} domains)')
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+    return {'output': str(path), 'depth': depth, 'model': model,
+            'domains': len(t['elements']), 'triangles': len(t['matrices']),
+            'edges': n_edges}
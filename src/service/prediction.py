@@ -0,0 +1,232 @@
+"""
+Local prediction service
+asyncio HTTP server (TCP or Unix socket) that micro-batches concurrent requests
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from http.client import HTTPConnection
+
+import numpy as np
+
+from src.models.flavor import (predict_observables, derived_observables,
+                               OBSERVABLE_NAMES, DERIVED_NAMES, N_PARAMS)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class MicroBatcher:
+    """
+    Collects requests for up to `window` seconds (or `max_batch` vectors),
+    evaluates them with one call to the vectorized kernels and hands each
+    caller its own rows back.
+    """
+
+    def __init__(self, window=0.002, max_batch=4096, history=10000):
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.latencies = deque(maxlen=history)
+        self.batch_sizes = deque(maxlen=history)
+        self.n_requests = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def predict(self, params):
+        """Observables and derived quantities for an (N, 12) array"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((params, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        while True:
+            items = [await self.queue.get()]
+            size = len(items[0][0])
+            deadline = time.perf_counter() + self.window
+            while size < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                size += len(item[0])
+            try:
+                self._evaluate(items)
+            except Exception as exc:
+                for _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _evaluate(self, items):
+        batch = np.concatenate([params for params, _, _ in items])
+        obs, der = predict_observables(batch), derived_observables(batch)
+        now = time.perf_counter()
+        start = 0
+        for params, future, queued in items:
+            stop = start + len(params)
+            if not future.done():
+                future.set_result((obs[start:stop], der[start:stop]))
+            self.latencies.append(now - queued)
+            start = stop
+        self.batch_sizes.append(len(batch))
+        self.n_requests += len(items)
+
+    def stats(self):
+        """Queue depth, latency percentiles (ms) and batch sizes"""
+        lat = np.array(self.latencies) * 1e3
+        pct = np.percentile(lat, [50, 90, 99]) if len(lat) else [np.nan] * 3
+        return {
+            'queue_depth': self.queue.qsize(),
+            'requests': self.n_requests,
+            'batches': len(self.batch_sizes),
+            'mean_batch_size': float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+            'latency_ms': {'p50': float(pct[0]), 'p90': float(pct[1]), 'p99': float(pct[2])},
+        }
+
+
+def _response(status, payload):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n")
+    return head.encode() + body
+
+
+async def _read_request(reader):
+    """(method, path, headers, body) or None at end of stream; ValueError if malformed"""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+class PredictionServer:
+    """
+    POST /predict  {"params": [12 numbers] or [[...], ...]}
+    GET  /stats    queue depth, latency percentiles, batch sizes
+    GET  /health
+    """
+
+    def __init__(self, window=0.002, max_batch=4096):
+        self.batcher = MicroBatcher(window, max_batch)
+        self.server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        self.batcher.start()
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(self._handle, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except ValueError as exc:
+                    writer.write(_response(400, {'error': f"malformed request: {exc}"}))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                writer.write(_response(status, payload))
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            return 200, self.batcher.stats()
+        if path != '/predict':
+            return 404, {'error': f"unknown path {path}"}
+        if method != 'POST':
+            return 405, {'error': "use POST"}
+        try:
+            params = np.atleast_2d(np.asarray(json.loads(body)['params'], dtype=float))
+        except (ValueError, KeyError, TypeError) as exc:
+            return 400, {'error': f"bad request body: {exc}"}
+        if params.ndim != 2 or params.shape[1] != N_PARAMS:
+            return 400, {'error': f"expected vectors of length {N_PARAMS}"}
+
+        try:
+            obs, der = await self.batcher.predict(params)
+        except Exception as exc:
+            return 500, {'error': f"prediction failed: {type(exc).__name__}: {exc}"}
+        return 200, {'predictions': [
+            {'observables': dict(zip(OBSERVABLE_NAMES, o.tolist())),
+             'derived': dict(zip(DERIVED_NAMES, d.tolist()))}
+            for o, d in zip(obs, der)]}
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, window=0.002):
+    """Run the service until interrupted"""
+    async def main():
+        server = PredictionServer(window)
+        await server.start(host, port, unix_path)
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+
+
+def request(path='/predict', params=None, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Small synchronous client for scripts and tests"""
+    conn = HTTPConnection(host, port, timeout=30)
+    try:
+        if params is None:
+            conn.request('GET', path)
+        else:
+            body = json.dumps({'params': np.asarray(params, dtype=float).tolist()})
+            conn.request('POST', path, body, {'Content-Type': 'application/json'})
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
@@ -0,0 +1,344 @@
+"""
+Progress events
+Run start/end, iterations, chunks and best-so-far as rate-limited JSON lines, merged across workers
+"""
+
+import glob
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+EVENTS = ('start', 'iteration', 'chunk', 'best', 'end')
+COALESCED = ('iteration', 'chunk', 'best')   # at most one line per interval, latest wins
+DEFAULT_INTERVAL = 1.0
+
+
+class NullProgress:
+    """The default: every call is a no-op, so library use stays silent"""
+
+    def __bool__(self):
+        return False
+
+    def emit(self, event, **fields):
+        pass
+
+    def start(self, **fields):
+        pass
+
+    def iteration(self, **fields):
+        pass
+
+    def chunk(self, **fields):
+        pass
+
+    def best(self, value, **fields):
+        pass
+
+    def end(self, **fields):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL = NullProgress()
+
+
+def _jsonable(obj):
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise TypeError(f"Not JSON serializable: {type(obj).__name__}")
+
+
+def open_sink(spec, worker=None):
+    """
+    (write, close) for a sink spec; write takes one whole line:
+
+        path                 appended with one write per line (a '{worker}'
+                             placeholder gives each worker its own file,
+                             which shared file systems need)
+        tcp://host:port      a stream socket, e.g. to `progress --listen`
+        unix:///path         a Unix stream socket
+        -                    stderr
+    """
+    if spec == '-':
+        spec = sys.stderr
+    if hasattr(spec, 'write'):
+        return (lambda line: (spec.write(line), spec.flush())), (lambda: None)
+    if spec.startswith(('tcp://', 'unix://')):
+        if spec.startswith('tcp://'):
+            host, port = spec[len('tcp://'):].rsplit(':', 1)
+            sock = socket.create_connection((host, int(port)))
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(spec[len('unix://'):])
+        return (lambda line: sock.sendall(line.encode())), sock.close
+    path = spec.format(worker=worker or f"{socket.gethostname()}-{os.getpid()}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    return (lambda line: os.write(fd, line.encode())), (lambda: os.close(fd))
+
+
+class Progress:
+    """
+    Event stream of one run (and one worker of it). Every line is a JSON
+    object with the event, the run and worker names, a wall-clock time and
+    the caller's fields:
+
+        start       total work and its unit, settings
+        iteration   done (cumulative units), optimizer state
+        chunk       done (cumulative units), chunk counts
+        best        value of a new best-so-far, where it is
+        end         done, final result
+
+    Iteration, chunk and best events are coalesced to at most one line per
+    `interval` seconds per event; their fields are cumulative, so keeping
+    only the latest loses nothing. The pending ones are flushed before
+    `end`. A sink that cannot be opened (a refused connection) or that
+    fails later (a closed socket, a full disk) silences the stream instead
+    of interrupting the run; the former warns once on stderr.
+    """
+
+    def __init__(self, sink, run=None, worker=None, interval=DEFAULT_INTERVAL):
+        self.run = run or f"run-{os.getpid()}"
+        self.worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+        self.interval = interval
+        try:
+            self.write, self._close = open_sink(sink, self.worker)
+        except OSError as exc:            # e.g. nothing listening: run on, unobserved
+            print(f"progress: cannot open {sink}: {exc}; events are dropped", file=sys.stderr)
+            self.write, self._close = None, (lambda: None)
+        self.last = {}
+        self.pending = {}
+        self.best_value = None
+
+    def __bool__(self):
+        return self.write is not None
+
+    def _send(self, event, fields):
+        line = json.dumps({'event': event, 'run': self.run, 'worker': self.worker,
+                           't': time.time(), **fields}, default=_jsonable)
+        try:
+            self.write(line + "\n")
+        except (OSError, ValueError):
+            self.write = None
+
+    def emit(self, event, **fields):
+        if self.write is None:
+            return
+        now = time.monotonic()
+        if event in COALESCED and now - self.last.get(event, -self.interval) < self.interval:
+            self.pending[event] = fields
+            return
+        self.pending.pop(event, None)
+        self.last[event] = now
+        self._send(event, fields)
+
+    def flush(self):
+        for event, fields in list(self.pending.items()):
+            if self.write is not None:
+                self._send(event, fields)
+        self.pending.clear()
+
+    def start(self, **fields):
+        self.emit('start', **fields)
+
+    def iteration(self, **fields):
+        self.emit('iteration', **fields)
+
+    def chunk(self, **fields):
+        self.emit('chunk', **fields)
+
+    def best(self, value, **fields):
+        """A best-so-far update; values that do not improve are dropped"""
+        value = float(value)
+        if self.best_value is None or value < self.best_value:
+            self.best_value = value
+            self.emit('best', value=value, **fields)
+
+    def end(self, **fields):
+        self.flush()
+        self.emit('end', **fields)
+
+    def close(self):
+        self.flush()
+        if self.write is not None:
+            self.write = None
+            self._close()
+
+
+def progress_stream(sink=None, run=None, worker=None, interval=DEFAULT_INTERVAL):
+    """A Progress for the sink, or NULL without one"""
+    return NULL if sink is None else Progress(sink, run, worker, interval)
+
+
+# ------------------------------------------------------------ aggregation
+
+class ProgressAggregator:
+    """
+    Merges the events of many workers and runs into one view. Per run the
+    total is the largest announced (workers of one queue job all announce
+    the job's total), done is the sum of every worker's cumulative done,
+    and throughput is the sum of the workers' own rates (only running
+    workers count until all have ended).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.runs = {}
+
+    def update(self, event):
+        with self.lock:
+            run = self.runs.setdefault(event.get('run'), {'total': None, 'unit': None,
+                                                          'best': None, 'workers': {}})
+            worker = run['workers'].setdefault(event.get('worker'), {
+                'started': event['t'], 't': event['t'], 'done': 0, 'resumed': 0,
+                'ended': False})
+            worker['t'] = max(worker['t'], event['t'])
+            kind = event.get('event')
+            if kind == 'start':
+                worker['started'] = min(worker['started'], event['t'])
+                worker['resumed'] = event.get('done', 0)   # work done before a resume
+                if event.get('total') is not None:
+                    run['total'] = max(run['total'] or 0, event['total'])
+                run['unit'] = event.get('unit', run['unit'])
+            if 'done' in event:
+                worker['done'] = max(worker['done'], event['done'])
+            if kind == 'end':
+                worker['ended'] = True
+            value = event.get('value') if kind == 'best' else event.get('best')
+            if value is not None and (run['best'] is None or value < run['best']):
+                run['best'] = value
+
+    def summary(self):
+        out = {}
+        with self.lock:
+            for name, run in self.runs.items():
+                workers = run['workers'].values()
+                done = sum(w['done'] for w in workers)
+                running = [w for w in workers if not w['ended']]
+                if running:
+                    rate = sum((w['done'] - w['resumed']) / (w['t'] - w['started'])
+                               for w in running if w['t'] > w['started'])
+                else:
+                    span = max(w['t'] for w in workers) - min(w['started'] for w in workers)
+                    fresh = done - sum(w['resumed'] for w in workers)
+                    rate = fresh / span if span > 0 else 0.0
+                total = run['total']
+                remaining = None if total is None else max(total - done, 0)
+                out[name] = {
+                    'done': done, 'total': total, 'unit': run['unit'],
+                    'fraction': None if not total else min(done / total, 1.0),
+                    'rate': rate,
+                    'eta': None if remaining is None or rate <= 0 else remaining / rate,
+                    'best': run['best'],
+                    'workers': len(run['workers']), 'running': len(running),
+                    'finished': not running,
+                }
+        return out
+
+    def finished(self):
+        summary = self.summary()
+        return bool(summary) and all(run['finished'] for run in summary.values())
+
+
+def format_status(summary):
+    """One display line per run: progress, throughput, ETA and best value"""
+    lines = []
+    for name, run in summary.items():
+        unit = run['unit'] or 'units'
+        total = f"/{run['total']:.4g}" if run['total'] else ''
+        percent = f"{100 * run['fraction']:5.1f}% " if run['fraction'] is not None else ''
+        eta = ('done' if run['finished'] else
+               '--:--:--' if run['eta'] is None else time.strftime('%H:%M:%S',
+                                                                    time.gmtime(run['eta'])))
+        best = '' if run['best'] is None else f"  best {run['best']:.6g}"
+        lines.append(f"{name}  {percent}{run['done']:.4g}{total} {unit}  "
+                     f"{run['rate']:.3g} {unit}/s  ETA {eta}  "
+                     f"workers {run['running']}/{run['workers']}{best}")
+    return "\n".join(lines)
+
+
+class FileTail:
+    """New complete lines of every file matching the patterns, across calls"""
+
+    def __init__(self, patterns):
+        self.patterns = [patterns] if isinstance(patterns, str) else list(patterns)
+        self.offsets = {}
+
+    def read(self):
+        events = []
+        for pattern in self.patterns:
+            for path in sorted(glob.glob(pattern)):
+                with open(path, 'rb') as f:
+                    f.seek(self.offsets.get(path, 0))
+                    data = f.read()
+                complete = data[:data.rfind(b"\n") + 1]
+                self.offsets[path] = self.offsets.get(path, 0) + len(complete)
+                events.extend(_parse(complete.splitlines()))
+        return events
+
+
+def _parse(lines):
+    events = []
+    for line in lines:
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            pass                      # a torn or foreign line
+    return events
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            for event in _parse([line]):
+                self.server.aggregator.update(event)
+
+
+def listen(address, aggregator):
+    """
+    Serve `address` (tcp://host:port or unix:///path) in a background
+    thread, feeding every received line to the aggregator. Returns the
+    server; call shutdown() to stop it.
+    """
+    if address.startswith('unix://'):
+        path = address[len('unix://'):]
+        if os.path.exists(path):
+            os.unlink(path)
+        server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    else:
+        host, port = address[len('tcp://'):].rsplit(':', 1)
+        server = socketserver.ThreadingTCPServer((host, int(port)), _Handler)
+    server.daemon_threads = True
+    server.aggregator = aggregator
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def follow(patterns=(), address=None, interval=DEFAULT_INTERVAL, until_finished=True):
+    """
+    Aggregate worker streams from files (glob patterns, re-expanded so new
+    workers are picked up) and/or a listening socket, yielding the merged
+    summary every `interval` seconds; stops once every run seen has ended.
+    """
+    aggregator = ProgressAggregator()
+    tail = FileTail(patterns)
+    server = None if address is None else listen(address, aggregator)
+    try:
+        while True:
+            for event in tail.read():
+                aggregator.update(event)
+            summary = aggregator.summary()
+            yield summary
+            if until_finished and aggregator.finished():
+                return
+            time.sleep(interval)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
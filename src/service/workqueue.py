@@ -0,0 +1,323 @@
+"""
+Shared-directory work queue
+Scan and toy chunks claimed by atomic rename, kept alive by heartbeats, merged at the end
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from multiprocessing import Process
+from pathlib import Path
+
+import numpy as np
+
+from src.fitting.scan import chunk_seeds, merge_top, scan_chunk
+from src.models.datasets import Dataset, load_dataset
+from src.models.variants import get_variant
+from src.service.progress import progress_stream
+
+STATES = ('pending', 'claimed', 'done', 'results')
+DATASET_FILE = 'dataset.json'
+
+
+class WorkQueue:
+    """
+    A queue in a directory every node can see:
+
+        job.json            what to compute (kind, dataset, variant, ...)
+        dataset.json        the dataset itself, so workers never resolve its name
+        pending/<id>.json   chunk descriptors (size and seed) waiting for a worker
+        claimed/<id>.json   being worked on; mtime is the lease heartbeat
+        claimed/.<id>.owner which worker holds the claim (for status only)
+        done/<id>.json      finished
+        results/<id>.npz    per-chunk output
+
+    A worker claims a chunk with os.rename(pending -> claimed), which only
+    one worker can win, and touches the claimed file every `heartbeat`
+    seconds; the claimed file is never rewritten, as a rewrite racing a
+    requeue would recreate it next to the pending copy. Any worker moves claimed files whose mtime is older than
+    `lease` back to pending. Chunks are deterministic in their seed, so a
+    chunk that runs twice after a requeue writes identical results.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, state, task_id, suffix='.json'):
+        return self.root / state / f"{task_id}{suffix}"
+
+    def owner_path(self, task_id):
+        return self.root / 'claimed' / f".{task_id}.owner"
+
+    def ids(self, state):
+        return sorted(p.stem for p in (self.root / state).glob('*.json'))
+
+    @property
+    def job(self):
+        return json.loads((self.root / 'job.json').read_text())
+
+    # ------------------------------------------------------------- submit
+
+    def submit(self, job, n, chunk, seed=None, dataset=None):
+        """Write the job, a copy of its dataset and one pending descriptor per chunk"""
+        if (self.root / 'job.json').exists():
+            raise FileExistsError(f"{self.root} already holds a job")
+        for state in STATES:
+            (self.root / state).mkdir(parents=True, exist_ok=True)
+        if dataset is not None:
+            _write_json(self.root / DATASET_FILE, dataset.to_spec())
+            job = {**job, 'dataset_file': DATASET_FILE}
+        _write_json(self.root / 'job.json', {**job, 'n': n, 'chunk': chunk, 'seed': seed})
+        for i, (size, s) in enumerate(chunk_seeds(n, chunk, seed)):
+            _write_json(self.path('pending', f"{i:06d}"),
+                        {'size': size, 'entropy': str(s.entropy),
+                         'spawn_key': list(s.spawn_key)})
+        return self
+
+    # ------------------------------------------------------------- leases
+
+    def now(self):
+        """The file server's clock, read back from a touched file (no clock skew)"""
+        probe = self.root / '.clock' / socket.gethostname()
+        probe.parent.mkdir(exist_ok=True)
+        probe.touch()
+        return probe.stat().st_mtime
+
+    def requeue_expired(self, lease):
+        """Move claims whose heartbeat is older than `lease` seconds back to pending"""
+        now, moved = self.now(), []
+        for task_id in self.ids('claimed'):
+            path = self.path('claimed', task_id)
+            try:
+                if now - path.stat().st_mtime > lease:
+                    os.rename(path, self.path('pending', task_id))
+                    moved.append(task_id)
+            except FileNotFoundError:
+                pass                      # finished or requeued meanwhile
+        return moved
+
+    def claim(self, worker):
+        """Atomically take the next pending chunk: (id, descriptor) or None"""
+        for task_id in self.ids('pending'):
+            if self.path('results', task_id, '.npz').exists():
+                # a requeued chunk that its first worker finished after all
+                try:
+                    os.rename(self.path('pending', task_id), self.path('done', task_id))
+                except FileNotFoundError:
+                    pass
+                continue
+            claimed = self.path('claimed', task_id)
+            try:
+                os.rename(self.path('pending', task_id), claimed)
+                # rename keeps the pending file's mtime: start the lease now,
+                # or requeue_expired would take back a claim of an old queue
+                os.utime(claimed)
+                task = json.loads(claimed.read_text())
+            except FileNotFoundError:
+                continue                  # another worker won, or the claim was lost
+            _write_json(self.owner_path(task_id), {'worker': worker, 'claimed': time.time()})
+            return task_id, task
+        return None
+
+    def complete(self, task_id, arrays):
+        """Store a chunk's results atomically, then retire its claim"""
+        target = self.path('results', task_id, '.npz')
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, target)
+        try:
+            os.rename(self.path('claimed', task_id), self.path('done', task_id))
+        except FileNotFoundError:
+            pass                          # requeued meanwhile; claim() retires it
+        self.owner_path(task_id).unlink(missing_ok=True)
+
+    # ------------------------------------------------------------- status
+
+    def status(self):
+        counts = {state: len(self.ids(state)) for state in ('pending', 'claimed', 'done')}
+        now = self.now()
+        claims = []
+        for task_id in self.ids('claimed'):
+            try:
+                age = now - self.path('claimed', task_id).stat().st_mtime
+            except FileNotFoundError:
+                continue
+            try:
+                info = json.loads(self.owner_path(task_id).read_text())
+            except (FileNotFoundError, ValueError):
+                info = {}                 # claimed a moment ago
+            claims.append({'id': task_id, 'worker': info.get('worker'), 'heartbeat_age': age})
+        return {**counts, 'total': sum(counts.values()), 'claims': claims}
+
+    def finished(self):
+        return not self.ids('pending') and not self.ids('claimed')
+
+
+def _write_json(path, payload):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(payload))
+    os.replace(tmp, path)
+
+
+class _Heartbeat(threading.Thread):
+    """Touch a claim file every `interval` seconds until stopped"""
+
+    def __init__(self, path, interval):
+        super().__init__(daemon=True)
+        self.path, self.interval = path, interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                os.utime(self.path)
+            except FileNotFoundError:
+                return                    # lease lost; the chunk will be redone
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+# ------------------------------------------------------------------- tasks
+
+def _seed(task):
+    return np.random.SeedSequence(int(task['entropy']), spawn_key=tuple(task['spawn_key']))
+
+
+def _task_runner(job, root):
+    """Function descriptor -> dict of arrays for the job's kind"""
+    if 'dataset_file' in job:
+        dataset = load_dataset(Path(root) / job['dataset_file'])
+    else:
+        dataset = load_dataset(job.get('dataset'))
+    variant = get_variant(job.get('variant'))
+
+    if job['kind'] == 'scan':
+        bounds = np.asarray(job.get('bounds') or variant.bounds, dtype=float)
+        chi2 = lambda x: dataset.chi2(x, variant.name)
+        screen = (lambda x: dataset.chi2_screen(x, variant.name)) if job.get('screen') else None
+
+        def run(task):
+            x, fun = scan_chunk(chi2, bounds, task['size'], _seed(task), job['top'], screen)
+            return {'x': x, 'fun': fun}
+    elif job['kind'] == 'toys':
+        from src.fitting.toys import toy_chunk
+
+        def run(task):
+            x, fun = toy_chunk(dataset, job['x_true'], task['size'], _seed(task),
+                               variant.name, job.get('maxiter', 2000))
+            return {'x': x, 'fun': fun}
+    else:
+        raise ValueError(f"Unknown job kind: {job['kind']}")
+    return run
+
+
+def submit_scan(root, n, chunk=100_000, top=100, dataset=None, variant=None,
+                bounds=None, seed=None, screen=False):
+    dataset = dataset if isinstance(dataset, Dataset) else load_dataset(dataset)
+    return WorkQueue(root).submit(
+        {'kind': 'scan', 'dataset': dataset.label, 'variant': get_variant(variant).name,
+         'top': top, 'bounds': None if bounds is None else np.asarray(bounds).tolist(),
+         'screen': screen},
+        n, chunk, seed, dataset)
+
+
+def submit_toys(root, x_true, n, chunk=100, dataset=None, variant=None, seed=None,
+                maxiter=2000):
+    dataset = dataset if isinstance(dataset, Dataset) else load_dataset(dataset)
+    return WorkQueue(root).submit(
+        {'kind': 'toys', 'dataset': dataset.label, 'variant': get_variant(variant).name,
+         'x_true': np.asarray(x_true, dtype=float).tolist(), 'maxiter': maxiter},
+        n, chunk, seed, dataset)
+
+
+def run_worker(root, worker=None, lease=120.0, heartbeat=None, poll=1.0, max_tasks=None,
+               progress=None):
+    """
+    Claim and run chunks until the queue is drained. While other workers
+    still hold claims this one waits, so it can pick up their chunks if
+    their leases expire. Returns the ids this worker completed.
+
+    `progress` is a sink spec (see src.service.progress.open_sink; use a
+    '{worker}' path on shared file systems): the worker then reports its
+    chunks under the queue's directory name as run, which lets `progress`
+    merge every worker of the job into one ETA.
+    """
+    queue = WorkQueue(root)
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    heartbeat = lease / 4 if heartbeat is None else heartbeat
+    job = queue.job
+    run = _task_runner(job, queue.root)
+    stream = progress_stream(progress, run=queue.root.name, worker=worker)
+    unit = 'points' if job['kind'] == 'scan' else job['kind']
+    stream.start(method=f"queue-{job['kind']}", unit=unit, total=job['n'])
+    completed, done = [], 0
+    while max_tasks is None or len(completed) < max_tasks:
+        queue.requeue_expired(lease)
+        claimed = queue.claim(worker)
+        if claimed is None:
+            if queue.finished():
+                break
+            time.sleep(poll)
+            continue
+        task_id, task = claimed
+        beat = _Heartbeat(queue.path('claimed', task_id), heartbeat)
+        beat.start()
+        try:
+            arrays = run(task)
+        finally:
+            beat.stop()
+        queue.complete(task_id, arrays)
+        completed.append(task_id)
+        done += task['size']
+        stream.chunk(done=done, chunks=len(completed))
+        if job['kind'] == 'scan' and len(arrays['fun']):
+            stream.best(arrays['fun'][0], chunk=task_id, x=arrays['x'][0])
+    stream.end(done=done, chunks=len(completed))
+    stream.close()
+    return completed
+
+
+def launch_local(root, workers=4, **kwargs):
+    """Run `workers` worker processes on this machine and wait for them"""
+    procs = [Process(target=run_worker, args=(root, f"local-{i}"), kwargs=kwargs)
+             for i in range(workers)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    return [p.exitcode for p in procs]
+
+
+def merge_results(root):
+    """
+    Combine the per-chunk result files: the overall top-K for scans, all
+    toys (ordered by chunk) otherwise. Raises if chunks are missing.
+    """
+    queue = WorkQueue(root)
+    job = queue.job
+    n_chunks = len(chunk_seeds(job['n'], job['chunk'], job['seed']))
+    files = sorted((queue.root / 'results').glob('*.npz'))
+    missing = n_chunks - len(files)
+    if missing:
+        raise RuntimeError(f"{missing} of {n_chunks} chunks have no results yet")
+
+    if job['kind'] == 'scan':
+        x, fun = None, None
+        for path in files:
+            with np.load(path) as r:
+                x, fun = (r['x'], r['fun']) if x is None else \
+                    merge_top(x, fun, r['x'], r['fun'], job['top'])
+        return {'kind': 'scan', 'x': x, 'fun': fun, 'n_evaluated': job['n'],
+                'n_chunks': n_chunks}
+    xs, funs = [], []
+    for path in files:
+        with np.load(path) as r:
+            xs.append(r['x'])
+            funs.append(r['fun'])
+    return {'kind': job['kind'], 'x': np.concatenate(xs), 'fun': np.concatenate(funs),
+            'n_chunks': n_chunks}
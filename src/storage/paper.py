@@ -0,0 +1,234 @@
+"""
+Paper artifacts
+LaTeX macros and tables generated from the best stored fit, rewritten only when their inputs change
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+from scipy.linalg import cholesky, solve_triangular
+
+from src.models.datasets import load_dataset
+from src.models.flavor import DERIVED_NAMES, MIXING, OBSERVABLE_NAMES
+from src.models.variants import get_variant
+from src.storage.results import DEFAULT_DB, ResultsStore
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parents[2] / 'paper' / 'generated'
+MACRO_PREFIX = 'fit'
+ARTIFACT_VERSION = 2       # bump to regenerate every artifact
+DIGITS = 4                 # significant digits of generated numbers
+
+_DIGIT_WORDS = ('Zero', 'One', 'Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine')
+_ANGLES = ('theta12', 'theta23', 'theta13', 'delta_cp')
+_QUARKS = (('u', 'c', 't'), ('d', 's', 'b'))
+
+
+def macro_name(name, prefix=MACRO_PREFIX):
+    """
+    LaTeX-safe command name: letters only, digits spelled out and parts
+    capitalized, e.g. 'k_u1' -> \\fitKUOne, 'm_c/m_t' -> \\fitMCMT.
+    """
+    parts, word = [], ''
+    for char in name:
+        if char.isalpha():
+            word += char
+        else:
+            parts.append(word)
+            word = ''
+            if char.isdigit():
+                parts.append(_DIGIT_WORDS[int(char)])
+    parts.append(word)
+    return '\\' + prefix + ''.join(p[:1].upper() + p[1:] for p in parts if p)
+
+
+def latex_number(value, digits=DIGITS):
+    """siunitx \\num{} of a float rounded to `digits` significant digits"""
+    if not np.isfinite(value):
+        return '--'
+    return f"\\num{{{float(value):.{digits}g}}}"
+
+
+def latex_angle(radians, digits=DIGITS):
+    return f"\\ang{{{np.degrees(float(radians)):.{digits}g}}}"
+
+
+def _escape(text):
+    return str(text).replace('\\', '').replace('_', '\\_').replace('%', '\\%').replace('&', '\\&')
+
+
+def inputs_hash(name, inputs):
+    """Hash of an artifact's inputs: arrays by dtype, shape and bytes, the rest as JSON"""
+    h = hashlib.sha1(f"{name}:{ARTIFACT_VERSION}".encode())
+    for key in sorted(inputs):
+        value = inputs[key]
+        h.update(key.encode())
+        if isinstance(value, np.ndarray):
+            value = np.ascontiguousarray(value)
+            h.update(str(value.dtype).encode() + str(value.shape).encode())
+            h.update(value.tobytes())
+        else:
+            h.update(json.dumps(value, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def _write(path, text):
+    """Atomic rewrite, so a LaTeX run never sees a half-written file"""
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+# ------------------------------------------------------------- artifacts
+
+def render_macros(fit):
+    """
+    results.tex: one \\newcommand per fit number, plus its provenance.
+    \\fitDof is the "for N degrees of freedom" clause, empty unless the fit
+    has more observables than parameters.
+    """
+    variant = get_variant(fit['variant'])
+    ndof = len(fit['observables']) - variant.n_params
+    derived = dict(zip(DERIVED_NAMES, variant.derived_observables(fit['params'])))
+    lines = [
+        f"% Generated from results row {fit['id']} by src/storage/paper.py; do not edit.",
+        f"\\newcommand{{{macro_name('dataset')}}}{{\\texttt{{{_escape(fit['dataset'])}}}}}",
+        f"\\newcommand{{{macro_name('variant')}}}{{\\texttt{{{_escape(fit['variant'])}}}}}",
+        f"\\newcommand{{{macro_name('code_version')}}}"
+        f"{{\\texttt{{{_escape(fit['code_version'])}}}}}",
+        f"\\newcommand{{{macro_name('chisq')}}}{{{latex_number(fit['chi2'])}}}",
+    ]
+    if ndof > 0:
+        lines += [f"\\newcommand{{{macro_name('ndof')}}}{{{ndof}}}",
+                  f"\\newcommand{{{macro_name('dof')}}}{{ for {macro_name('ndof')}{{}} "
+                  f"degrees of freedom}}"]
+    else:
+        lines.append(f"\\newcommand{{{macro_name('dof')}}}{{}}")
+    for name, value in zip(variant.param_names, fit['params']):
+        text = latex_angle(value) if name in _ANGLES else latex_number(value)
+        lines.append(f"\\newcommand{{{macro_name(name)}}}{{{text}}}")
+    for name, value in derived.items():
+        lines.append(f"\\newcommand{{{macro_name(name)}}}{{{latex_number(value)}}}")
+    return "\n".join(lines) + "\n"
+
+
+def render_parameters(fit):
+    """parameters.tex: the best-fit vector as a booktabs table"""
+    variant = get_variant(fit['variant'])
+    rows = [f"\\texttt{{{_escape(name)}}} & "
+            f"{latex_angle(value) if name in _ANGLES else latex_number(value)} \\\\"
+            for name, value in zip(variant.param_names, fit['params'])]
+    return "\n".join(["\\begin{tabular}{lr}", "\\toprule",
+                      "Parameter & Best fit \\\\", "\\midrule", *rows,
+                      "\\bottomrule", "\\end{tabular}"]) + "\n"
+
+
+def render_ckm(fit):
+    """ckm.tex: |V_ij| of the fitted mixing parameters"""
+    variant = get_variant(fit['variant'])
+    derived = dict(zip(DERIVED_NAMES, variant.derived_observables(fit['params'])))
+    up, down = _QUARKS
+    rows = [f"${u}$ & " + " & ".join(latex_number(derived[f'V_{u}{d}']) for d in down) + " \\\\"
+            for u in up]
+    return "\n".join(["\\begin{tabular}{lccc}", "\\toprule",
+                      " & " + " & ".join(f"${d}$" for d in down) + " \\\\", "\\midrule",
+                      *rows, "\\bottomrule", "\\end{tabular}"]) + "\n"
+
+
+def render_observables(fit):
+    """
+    observables.tex: prediction, measurement and pull of every fitted
+    observable. Pulls are the whitened residuals L^-1 (pred - central) of
+    the full covariance C = L L^T (the pull of each observable given the
+    ones above it), so their squares add up to the chi^2 in the last row.
+    """
+    index = [OBSERVABLE_NAMES.index(o) for o in fit['observables']]
+    predicted = get_variant(fit['variant']).predict_observables(fit['params'])[index]
+    covariance = np.asarray(fit['covariance'], dtype=float)
+    pulls = solve_triangular(cholesky(covariance, lower=True), predicted - fit['central'],
+                             lower=True)
+    rows = []
+    for name, pred, central, sigma, pull in zip(fit['observables'], predicted, fit['central'],
+                                                np.sqrt(np.diag(covariance)), pulls):
+        rows.append(f"\\texttt{{{_escape(name)}}} & {latex_number(pred)} & "
+                    f"{latex_number(central)} & {latex_number(sigma)} & "
+                    f"{latex_number(pull, 2)} \\\\")
+    return "\n".join(["\\begin{tabular}{lrrrr}", "\\toprule",
+                      "Observable & Fit & Measured & $\\sigma$ & Pull \\\\", "\\midrule",
+                      *rows, "\\midrule",
+                      f"$\\chi^2$ & & & & {latex_number(np.sum(pulls**2))} \\\\",
+                      "\\bottomrule", "\\end{tabular}"]) + "\n"
+
+
+# artifact: (file name, renderer, the fit fields it depends on)
+ARTIFACTS = {
+    'macros': ('results.tex', render_macros,
+               ('id', 'params', 'chi2', 'variant', 'dataset', 'code_version', 'observables')),
+    'parameters': ('parameters.tex', render_parameters, ('params', 'variant')),
+    'ckm': ('ckm.tex', render_ckm, ('mixing',)),
+    'observables': ('observables.tex', render_observables,
+                    ('params', 'variant', 'observables', 'central', 'covariance')),
+}
+
+
+def best_fit(dataset=None, variant=None, db=DEFAULT_DB):
+    """The lowest-chi^2 stored fit for a dataset and variant, with its provenance"""
+    dataset = load_dataset(dataset)
+    variant = get_variant(variant)
+    with ResultsStore(db) as store:
+        rows = store.query(kind='fit', dataset=dataset.label, variant=variant.name,
+                           limit=1, order_by_chi2=True)
+    if not len(rows['id']):
+        raise LookupError(f"no stored fit for dataset '{dataset.label}' and variant "
+                          f"'{variant.name}'; run 'fit' first")
+    params = rows['params'][0].copy()
+    return {
+        'id': int(rows['id'][0]),
+        'params': params,
+        'mixing': params[MIXING],
+        'chi2': float(rows['chi2'][0]),
+        'dataset': dataset.label,
+        'variant': variant.name,
+        'code_version': rows['code_version'][0] or 'unknown',
+        'observables': dataset.observables,
+        'central': dataset.central,
+        'covariance': dataset.covariance,
+    }
+
+
+def build_paper(dataset=None, variant=None, output=DEFAULT_OUTPUT, db=DEFAULT_DB, force=False):
+    """
+    Regenerate the paper's LaTeX artifacts from the best stored fit.
+
+    Each artifact's inputs are hashed and compared with the manifest of
+    the previous build; only artifacts whose inputs changed (or whose file
+    is missing) are rewritten, so an unchanged fit touches nothing and
+    LaTeX's own dependency tracking stays quiet. Returns the lists of
+    written / skipped artifacts.
+    """
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    manifest_path = output / 'manifest.json'
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    fit = best_fit(dataset, variant, db)
+
+    written, skipped, entries = [], [], {}
+    for name, (filename, render, fields) in ARTIFACTS.items():
+        key = inputs_hash(name, {field: fit[field] for field in fields})
+        target = output / filename
+        entries[name] = {'file': filename, 'hash': key}
+        if not force and manifest.get('artifacts', {}).get(name, {}).get('hash') == key \
+                and target.exists():
+            skipped.append(name)
+            continue
+        _write(target, render(fit))
+        written.append(name)
+
+    if written or manifest.get('fit') != fit['id']:
+        _write(manifest_path, json.dumps({'fit': fit['id'], 'dataset': fit['dataset'],
+                                          'variant': fit['variant'], 'artifacts': entries},
+                                         indent=1) + "\n")
+    return {'output': str(output), 'fit': fit['id'], 'chi2': fit['chi2'],
+            'written': written, 'skipped': skipped}
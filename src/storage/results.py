@@ -0,0 +1,190 @@
+"""
+Append-only results database
+Every fit, scan chunk and sampler run as one SQLite row with a packed parameter blob
+"""
+
+import hashlib
+import json
+import sqlite3
+import subprocess
+import time
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_DB = Path(__file__).resolve().parents[2] / 'data' / 'results.sqlite'
+PARAM_DTYPE = np.dtype('<f8')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id           INTEGER PRIMARY KEY,
+    kind         TEXT NOT NULL,
+    run_id       TEXT,
+    dataset      TEXT,
+    inputs_hash  TEXT,
+    variant      TEXT,
+    params_hash  TEXT NOT NULL,
+    code_version TEXT,
+    created      REAL NOT NULL,
+    elapsed      REAL,
+    chi2         REAL,
+    n_params     INTEGER NOT NULL,
+    params       BLOB NOT NULL,
+    extra        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_dataset ON results (dataset);
+CREATE INDEX IF NOT EXISTS idx_results_variant ON results (variant);
+CREATE INDEX IF NOT EXISTS idx_results_chi2 ON results (chi2);
+CREATE INDEX IF NOT EXISTS idx_results_params_hash ON results (params_hash);
+CREATE INDEX IF NOT EXISTS idx_results_run ON results (run_id);
+"""
+
+_code_version = None
+
+
+def code_version():
+    """Short git commit of the working tree, or 'unknown' outside a checkout"""
+    global _code_version
+    if _code_version is None:
+        try:
+            out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                                 cwd=Path(__file__).parent, capture_output=True,
+                                 text=True, timeout=5)
+            _code_version = out.stdout.strip() or 'unknown'
+        except (OSError, subprocess.SubprocessError):
+            _code_version = 'unknown'
+    return _code_version
+
+
+def params_hash(params):
+    """Hash of one parameter vector's float64 bytes"""
+    return hashlib.sha1(np.ascontiguousarray(params, dtype=PARAM_DTYPE).tobytes()).hexdigest()[:16]
+
+
+def _where(kind=None, dataset=None, variant=None, run_id=None, max_chi2=None):
+    """SQL WHERE clause and arguments for the common row filters"""
+    where, args = [], []
+    for column, value in [('kind', kind), ('dataset', dataset),
+                          ('variant', variant), ('run_id', run_id)]:
+        if value is not None:
+            where.append(f"{column} = ?")
+            args.append(value)
+    if max_chi2 is not None:
+        where.append("chi2 <= ?")
+        args.append(max_chi2)
+    return (" WHERE " + " AND ".join(where) if where else ""), args
+
+
+class ResultsStore:
+    """
+    Append-only store of results; rows are never updated or deleted.
+
+    Parameter vectors are packed little-endian float64 blobs, so query()
+    can hand back a (N, n_params) array with a single np.frombuffer.
+    """
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def insert_many(self, kind, params, chi2=None, dataset=None, variant=None,
+                    run_id=None, inputs_hash=None, elapsed=None, extra=None):
+        """Append a batch of results in one transaction; returns the row count"""
+        params = np.ascontiguousarray(np.atleast_2d(params), dtype=PARAM_DTYPE)
+        n = len(params)
+        chi2 = np.full(n, np.nan) if chi2 is None else np.broadcast_to(chi2, (n,))
+        created = time.time()
+        extra = None if extra is None else json.dumps(extra, default=float)
+        version = code_version()
+
+        rows = [(kind, run_id, dataset, inputs_hash, variant,
+                 params_hash(p), version, created,
+                 elapsed, None if np.isnan(c) else float(c), params.shape[1],
+                 p.tobytes(), extra)
+                for p, c in zip(params, chi2)]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO results (kind, run_id, dataset, inputs_hash, variant, "
+                "params_hash, code_version, created, elapsed, chi2, n_params, params, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return n
+
+    def record_fit(self, x, chi2, dataset=None, variant=None, run_id=None,
+                   elapsed=None, extra=None):
+        """Append a single best-fit result, tagged with the dataset's hash"""
+        label = getattr(dataset, 'label', dataset)
+        inputs = getattr(dataset, 'fingerprint', None)
+        return self.insert_many('fit', x, chi2, label, variant, run_id, inputs,
+                                elapsed, extra)
+
+    def query(self, kind=None, dataset=None, variant=None, run_id=None,
+              max_chi2=None, limit=None, order_by_chi2=False):
+        """
+        Matching rows as NumPy arrays: 'id', 'chi2', 'created', 'params'
+        (N, n_params) and the text columns as lists.
+        """
+        where, args = _where(kind, dataset, variant, run_id, max_chi2)
+        sql = ("SELECT id, chi2, created, n_params, params, kind, dataset, variant, "
+               "run_id, code_version, inputs_hash FROM results" + where)
+        sql += " ORDER BY chi2 IS NULL, chi2" if order_by_chi2 else " ORDER BY id"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        rows = self.conn.execute(sql, args).fetchall()
+        n_params = {r[3] for r in rows}
+        if len(n_params) > 1:
+            raise ValueError(f"Rows mix parameter lengths {sorted(n_params)}; filter further")
+        width = n_params.pop() if rows else 0
+
+        columns = list(zip(*rows)) if rows else [()] * 11
+        return {
+            'id': np.array(columns[0], dtype=np.int64),
+            'chi2': np.array(columns[1], dtype=float),
+            'created': np.array(columns[2], dtype=float),
+            'params': np.frombuffer(b''.join(columns[4]),
+                                    dtype=PARAM_DTYPE).reshape(len(rows), width),
+            'kind': list(columns[5]),
+            'dataset': list(columns[6]),
+            'variant': list(columns[7]),
+            'run_id': list(columns[8]),
+            'code_version': list(columns[9]),
+            'inputs_hash': list(columns[10]),
+        }
+
+    def iter_chunks(self, chunk_rows=100_000, kind=None, dataset=None, variant=None,
+                    run_id=None, max_chi2=None):
+        """
+        Yield (params (n, n_params), chi2 (n,)) blocks of matching rows in id
+        order, fetching `chunk_rows` at a time so memory stays bounded.
+        """
+        where, args = _where(kind, dataset, variant, run_id, max_chi2)
+        cursor = self.conn.execute("SELECT chi2, n_params, params FROM results"
+                                   + where + " ORDER BY id", args)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                return
+            if len({r[1] for r in rows}) > 1:
+                raise ValueError("Rows mix parameter lengths; filter further")
+            yield (np.frombuffer(b''.join(r[2] for r in rows),
+                                 dtype=PARAM_DTYPE).reshape(len(rows), -1),
+                   np.array([r[0] for r in rows], dtype=float))
+
+    def best(self, dataset=None, variant=None, kind='fit'):
+        """Lowest-chi^2 row as (params, chi2), or None if nothing matches"""
+        rows = self.query(kind=kind, dataset=dataset, variant=variant,
+                          limit=1, order_by_chi2=True)
+        if len(rows['id']) == 0:
+            return None
+        return rows['params'][0], rows['chi2'][0]
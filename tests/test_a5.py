@@ -0,0 +1,61 @@
+"""A5 tables: representations, characters and Clebsch-Gordan coefficients satisfy their definitions"""
+
+import numpy as np
+import pytest
+
+from src.core import a5
+
+TABLES = a5.load_tables()
+
+
+@pytest.mark.parametrize('name', a5.IRREPS)
+def test_representations_are_unitary_homomorphisms_of_the_cayley_table(name):
+    rho, table = TABLES[f"rep_{name}"], TABLES['cayley'].astype(int)
+    assert rho.shape == (a5.ORDER, a5.DIMS[name], a5.DIMS[name])
+    products = np.einsum('iab,jbc->ijac', rho, rho)
+    np.testing.assert_allclose(rho[table], products, atol=1e-12)
+    np.testing.assert_allclose(np.einsum('gba,gbc->gac', rho.conj(), rho),
+                               np.broadcast_to(np.eye(len(rho[0])), rho.shape), atol=1e-12)
+
+
+def test_characters_are_orthonormal():
+    sizes = np.bincount(TABLES['classes'])
+    chi = TABLES['characters']
+    np.testing.assert_allclose(np.einsum('c,ac,bc->ab', sizes, chi, chi.conj()) / a5.ORDER,
+                               np.eye(len(a5.IRREPS)), atol=1e-12)
+    assert sorted(sizes.tolist()) == [1, 12, 12, 15, 20]
+
+
+def test_clebsch_gordan_tables_intertwine():
+    rho = {name: TABLES[f"rep_{name}"] for name in a5.IRREPS}
+    for key in (k for k in TABLES if k.startswith('cg_')):
+        _, a, b, c = key.split('_')
+        C = TABLES[key]
+        da, db, dc = a5.DIMS[a], a5.DIMS[b], a5.DIMS[c]
+        ab = a5._kron(rho[a], rho[b])
+        flat = C.reshape(len(C), da * db, dc)
+        np.testing.assert_allclose(np.einsum('gij,mjk->gmik', ab, flat),
+                                   np.einsum('mij,gjk->gmik', flat, rho[c]), atol=1e-10,
+                                   err_msg=key)
+        # isometric, mutually orthogonal copies
+        gram = np.einsum('mik,nil->mnkl', flat.conj(), flat)
+        np.testing.assert_allclose(gram, np.einsum('mn,kl->mnkl', np.eye(len(C)), np.eye(dc)),
+                                   atol=1e-10, err_msg=key)
+    # every product decomposes completely
+    for a in a5.IRREPS:
+        for b in a5.IRREPS:
+            parts = a5.decompose(a, b)
+            assert sum(m * a5.DIMS[c] for c, m in parts.items()) == a5.DIMS[a] * a5.DIMS[b]
+
+
+def test_unwritable_bundle_falls_back_to_the_built_tables(tmp_path, monkeypatch):
+    def read_only(path, tables=None):
+        raise PermissionError(13, 'Permission denied', str(path))
+
+    monkeypatch.setattr(a5, 'save_tables', read_only)
+    path = tmp_path / 'site-packages' / 'a5_tables.bin'
+    tables = a5.load_tables(path)
+    assert not path.exists()
+    assert set(tables) == set(TABLES)
+    np.testing.assert_array_equal(tables['cayley'], TABLES['cayley'])
+    assert not tables['rep_5'].flags.writeable
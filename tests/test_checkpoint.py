@@ -0,0 +1,79 @@
+"""Checkpoints: resumed runs are bit-identical, and other objectives are refused"""
+
+import json
+
+import numpy as np
+import pytest
+
+from src.fitting.multi import fit_datasets
+from src.fitting.nested import nested_sampling
+from src.fitting.population import fit_global
+from src.models.datasets import load_dataset
+from src.models.variants import get_variant
+
+DE = dict(popsize=5, seed=7, checkpoint_every=0.0, polish=False)
+
+
+def test_global_fit_resumes_bit_identically(tmp_path):
+    path = tmp_path / 'de.npz'
+    straight = fit_global(maxgen=12, **DE)
+    fit_global(maxgen=5, checkpoint=path, **DE)
+    resumed = fit_global(maxgen=12, checkpoint=path, **DE)
+    assert resumed['nit'] == straight['nit'] and resumed['nfev'] == straight['nfev']
+    np.testing.assert_array_equal(resumed['population'], straight['population'])
+    np.testing.assert_array_equal(resumed['history']['best'], straight['history']['best'])
+
+
+def test_batch_fit_resumes_bit_identically(tmp_path):
+    path = tmp_path / 'nm.npz'
+    straight = fit_datasets([None], maxiter=80)
+    fit_datasets([None], maxiter=30, checkpoint=path, checkpoint_every=0.0)
+    resumed = fit_datasets([None], maxiter=80, checkpoint=path, checkpoint_every=0.0)
+    np.testing.assert_array_equal(resumed['simplex'], straight['simplex'])
+    np.testing.assert_array_equal(resumed['nit'], straight['nit'])
+
+
+def test_nested_sampling_resumes_bit_identically(tmp_path):
+    path = tmp_path / 'ns.npz'
+    bounds = [[-5.0, 5.0]] * 2
+    log_l = lambda x: -0.5 * np.sum((x - 1.0)**2, axis=-1)
+    run = dict(n_live=50, batch=10, n_steps=5, seed=3, checkpoint_every=0.0)
+    straight = nested_sampling(log_l, bounds, maxiter=30, **{**run, 'checkpoint_every': 60.0})
+    nested_sampling(log_l, bounds, maxiter=10, checkpoint=path, **run)
+    resumed = nested_sampling(log_l, bounds, maxiter=30, checkpoint=path, **run)
+    assert resumed['log_z'] == straight['log_z'] and resumed['ncall'] == straight['ncall']
+    np.testing.assert_array_equal(resumed['samples'], straight['samples'])
+
+
+def test_finished_nested_run_is_not_replayed(tmp_path):
+    path = tmp_path / 'ns.npz'
+    bounds = [[-5.0, 5.0]] * 2
+    calls = []
+    log_l = lambda x: calls.append(len(x)) or -0.5 * np.sum((x - 1.0)**2, axis=-1)
+    run = dict(n_live=50, batch=10, n_steps=5, seed=3, checkpoint=path)
+    first = nested_sampling(log_l, bounds, **run)          # ends well within one interval
+    calls.clear()
+    again = nested_sampling(log_l, bounds, **run)
+    assert calls == [] and again['nit'] == first['nit']
+    assert again['log_z'] == first['log_z']
+    np.testing.assert_array_equal(again['samples'], first['samples'])
+
+
+def test_checkpoint_of_another_variant_is_refused(tmp_path):
+    path = tmp_path / 'de.npz'
+    fit_global(maxgen=2, checkpoint=path, **DE)
+    other = get_variant('phi-432')
+    assert other.name != get_variant(None).name
+    with pytest.raises(ValueError, match='other settings'):
+        fit_global(maxgen=4, checkpoint=path, variant=other.name, **DE)
+
+
+def test_checkpoint_of_another_dataset_is_refused(tmp_path):
+    path = tmp_path / 'nm.npz'
+    fit_datasets([None], maxiter=5, checkpoint=path)
+    spec = load_dataset().to_spec()
+    spec['central'][4] += 0.002
+    (tmp_path / 'shifted.json').write_text(json.dumps(spec))   # same name and version
+    other = load_dataset(tmp_path / 'shifted.json')
+    with pytest.raises(ValueError, match='other settings'):
+        fit_datasets([other], maxiter=10, checkpoint=path)
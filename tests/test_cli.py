@@ -0,0 +1,31 @@
+"""Command-line parsing"""
+
+import pytest
+
+from src.cli import build_parser, main
+
+LANDSCAPE = ['landscape', '--xrange', '0', '1', '--yrange', '0', '1']
+
+
+def test_landscape_axes_must_be_parameters_of_the_variant():
+    parser = build_parser()
+    args = parser.parse_args(LANDSCAPE + ['--x', 'theta12', '--y', 'log10_eps_u',
+                                          '--variant', 'phi-321+eps'])
+    assert (args.x, args.y, args.variant) == ('theta12', 'log10_eps_u', 'phi-321+eps')
+    with pytest.raises(SystemExit, match="'theta_12' is not a parameter of phi-321"):
+        main(['--quiet'] + LANDSCAPE + ['--x', 'theta_12', '--y', 'theta23'])
+    with pytest.raises(SystemExit, match="'log10_eps_u' is not a parameter of phi-321"):
+        main(['--quiet'] + LANDSCAPE + ['--x', 'theta12', '--y', 'log10_eps_u'])
+
+
+@pytest.mark.parametrize('command', ['fit', 'scan', 'sample', 'emulate', 'predict', 'plot',
+                                     'paper', 'summarize', 'sensitivity'])
+def test_model_commands_take_a_variant(command):
+    args = build_parser().parse_args([command, '--variant', 'fib-321'])
+    assert args.variant == 'fib-321'
+    assert build_parser().parse_args([command]).variant == 'phi-321'
+
+
+def test_sample_rejects_burn_in_past_the_chain():
+    with pytest.raises(SystemExit, match='--burn'):
+        main(['--quiet', 'sample', '--steps', '100', '--burn', '100'])
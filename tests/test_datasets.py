@@ -0,0 +1,29 @@
+"""Experimental datasets: covariance from the JSON and the chi^2 it gives"""
+
+import numpy as np
+
+from src.models.datasets import dataset_from_spec, load_dataset
+from src.models.variants import get_variant
+
+
+def diagonal_chi2(dataset, params):
+    pred = get_variant(None).predict_observables(params)[..., dataset.index]
+    return np.sum(((pred - dataset.central) / dataset.sigma)**2, axis=-1)
+
+
+def test_correlated_dataset_differs_from_the_diagonal_form():
+    correlated, diagonal = load_dataset('gut-scale-v2'), load_dataset('gut-scale-v1')
+    i, j = correlated.observables.index('V_us'), correlated.observables.index('theta12')
+    np.testing.assert_allclose(correlated.covariance[i, j], 0.9 * 1e-3 * 1e-3)
+    np.testing.assert_array_equal(correlated.sigma, diagonal.sigma)
+
+    x = get_variant(None).initial + 0.01 * np.random.default_rng(0).standard_normal((50, 12))
+    np.testing.assert_allclose(diagonal.chi2(x), diagonal_chi2(diagonal, x), rtol=1e-10)
+    assert not np.allclose(correlated.chi2(x), diagonal_chi2(correlated, x), rtol=1e-3)
+    assert correlated.fingerprint != diagonal.fingerprint
+
+
+def test_spec_round_trip_keeps_the_correlation():
+    dataset = load_dataset('gut-scale-v2')
+    copy = dataset_from_spec(dataset.to_spec())
+    assert copy.fingerprint == dataset.fingerprint
@@ -0,0 +1,28 @@
+"""Emulator: the quadratic trend reproduces a quadratic objective, validation stays held out"""
+
+import numpy as np
+
+from src.fitting.emulator import Emulator
+
+HESSIAN = np.array([[1.0, 0.3, 0.0], [0.3, 4.0, 0.0], [0.0, 0.0, 0.5]])
+CENTRE = np.array([0.2, -0.1, 0.3])
+
+
+def bowl(x):
+    d = x - CENTRE
+    return np.einsum('ni,ij,nj->n', d, HESSIAN, d) + 3.0
+
+
+def test_quadratic_objective_is_reproduced_exactly():
+    emulator = Emulator(bowl, [[-1.0, 1.0]] * 3, seed=0).design(64)
+    check = emulator.validate(n=200)
+    assert check['n'] == 200
+    assert check['rmse'] < 1e-8 and check['max_abs'] < 1e-7      # f spans ~0-10 over the box
+    assert len(emulator.y) == 64                                   # held-out points not trained on
+    assert emulator.counts()['true'] == 64 and emulator.counts()['validation'] == 200
+
+
+def test_pinned_dimensions_are_held_fixed():
+    emulator = Emulator(bowl, [[-1.0, 1.0], [-1.0, 1.0], [0.5, 0.5]], seed=1).design(32)
+    assert np.all(emulator.x[:, 2] == 0.5)
+    assert emulator.validate(n=100)['rmse'] < 1e-8
@@ -0,0 +1,19 @@
+"""Closed geodesics on X(5): orbits are hyperbolic elements of Gamma(5)"""
+
+import numpy as np
+
+from src.core.geodesics import simulate, word_matrix
+from src.core.tiling import a5_index
+
+
+def test_shortest_orbit_has_the_minimal_gamma5_trace():
+    orbits = simulate(5000, crossings=128, max_period=16, seed=1)['orbits']
+    traces = orbits['trace']
+    assert len(traces) > 0 and np.all(np.diff(orbits['length']) >= 0)
+    # g = +-I mod 5 with det g = 1 forces tr g = +-2 mod 25: 23 is the smallest hyperbolic one
+    assert np.all(np.isin(traces % 25, [2, 23]))
+    assert traces.min() == 23 and traces[0] == 23
+    np.testing.assert_allclose(orbits['length'], 2 * np.arccosh(traces / 2), rtol=1e-12)
+    for word, trace in zip(orbits['words'], traces):
+        g = word_matrix(word)
+        assert a5_index(g) == 0 and abs(g[0, 0] + g[1, 1]) == trace
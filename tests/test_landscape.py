@@ -0,0 +1,70 @@
+"""Landscape pyramid: tiles are reused, coarse levels are exact min / mean reductions"""
+
+import numpy as np
+import pytest
+
+from src.plotting.landscape import MEAN, MIN, LandscapeSlice
+
+FULL = (0.0, 1.0, 0.0, 1.0)
+
+
+def bowl(p):
+    return 1.0 + (p[:, 0] - 0.3)**2 + 2.0 * (p[:, 1] - 0.6)**2
+
+
+def make(tmp_path, supersample=2):
+    return LandscapeSlice(tmp_path, np.zeros(12), 0, 1, (0.0, 1.0), (0.0, 1.0), resolution=16,
+                          tile=4, supersample=supersample, objective=bowl)
+
+
+def test_level_zero_is_one_evaluation_per_pixel_and_tiles_are_reused(tmp_path):
+    landscape = make(tmp_path)
+    data, extent = landscape.region(0, FULL, MIN)
+    centres = (np.arange(16) + 0.5) / 16
+    x, y = np.meshgrid(centres, centres)
+    expected = bowl(np.stack([x.ravel(), y.ravel()], axis=-1)).reshape(16, 16)
+    np.testing.assert_allclose(data, expected, rtol=1e-6)
+    assert extent == FULL
+    assert landscape.stats['evaluated'] == 16 * 16 and landscape.stats['reused'] == 0
+
+    again, _ = landscape.region(0, (0.1, 0.4, 0.1, 0.4), MEAN)
+    assert landscape.stats['evaluated'] == 16 * 16 and landscape.stats['reused'] == 4
+    reopened = make(tmp_path)                             # the pyramid lives on disk
+    reopened.region(0, FULL, MIN)
+    assert reopened.stats == {'evaluated': 0, 'reduced': 0, 'reused': 16}
+
+
+def test_coarse_levels_reduce_their_children(tmp_path):
+    landscape = make(tmp_path)
+    fine, _ = landscape.region(0, FULL, MIN)
+    for level in (1, 2):
+        lo, _ = landscape.region(level, FULL, MIN)
+        mean, _ = landscape.region(level, FULL, MEAN)
+        k = 2**level
+        blocks = fine.reshape(16 // k, k, 16 // k, k)
+        np.testing.assert_allclose(lo, blocks.min(axis=(1, 3)), rtol=1e-6)
+        np.testing.assert_allclose(mean, blocks.mean(axis=(1, 3)), rtol=1e-6)
+    assert landscape.stats['evaluated'] == 16 * 16
+
+
+def test_directly_evaluated_parents_are_replaced_once_their_children_exist(tmp_path):
+    landscape = make(tmp_path, supersample=1)
+    coarse, _ = landscape.region(2, FULL, MIN)            # evaluated at pixel centres
+    fine, _ = landscape.region(0, FULL, MIN)
+    refreshed, _ = landscape.region(2, FULL, MIN)
+    expected = fine.reshape(4, 4, 4, 4).min(axis=(1, 3))
+    assert not np.allclose(coarse, expected)
+    np.testing.assert_allclose(refreshed, expected, rtol=1e-6)
+    np.testing.assert_allclose(landscape.region(1, FULL, MIN)[0],
+                               fine.reshape(8, 2, 8, 2).min(axis=(1, 3)), rtol=1e-6)
+
+
+def test_views_are_cut_to_the_slice(tmp_path):
+    landscape = make(tmp_path)
+    data, extent = landscape.region(0, (0.5, 3.0, -1.0, 0.25), MIN)
+    assert data.shape == (4, 8) and extent == (0.5, 1.0, 0.0, 0.25)
+    with pytest.raises(ValueError, match='does not overlap'):
+        landscape.region(0, (8.0, 9.0, 0.0, 1.0), MIN)
+    rendered = landscape.render(tmp_path / 'edge.png', view=(0.75, 2.0, 0.75, 2.0),
+                                size=(200, 200))
+    assert rendered['shape'] == (4, 4)
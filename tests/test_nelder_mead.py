@@ -0,0 +1,48 @@
+"""Lockstep Nelder-Mead: every problem of the batch takes scipy's steps"""
+
+import numpy as np
+from scipy.optimize import minimize
+
+from src.fitting.multi import nelder_mead_batch
+
+
+def rosenbrock(x):
+    return np.sum(100 * (x[..., 1:] - x[..., :-1]**2)**2 + (1 - x[..., :-1])**2, axis=-1)
+
+
+def cusps(x):
+    return np.sum(np.sqrt(np.abs(x - 0.2)), axis=-1)
+
+
+def assert_matches_scipy(f, x0, maxiter):
+    shrinks = []
+
+    def batched(points, rows):
+        if points.shape[1] == x0.shape[1]:           # n points: a shrink, not the 4 trials
+            shrinks.extend(rows)
+        return f(points)
+
+    result = nelder_mead_batch(batched, x0, maxiter=maxiter)
+    for i, start in enumerate(x0):
+        reference = minimize(f, start, method='Nelder-Mead', options={'maxiter': maxiter})
+        np.testing.assert_array_equal(result['x'][i], reference.x)
+        assert result['fun'][i] == reference.fun
+        assert result['nit'][i] == reference.nit
+        assert result['converged'][i] == reference.success
+    return shrinks
+
+
+def test_matches_scipy_on_rosenbrock():
+    x0 = np.random.default_rng(0).normal(size=(6, 3))
+    assert_matches_scipy(rosenbrock, x0, maxiter=300)
+
+
+def test_matches_scipy_through_shrinks():
+    x0 = np.random.default_rng(0).normal(size=(10, 2))
+    shrinks = assert_matches_scipy(cusps, x0, maxiter=200)
+    assert shrinks                                   # the case this test exists for
+
+
+def test_iteration_limit_matches_scipy():
+    x0 = np.random.default_rng(1).normal(size=(3, 4))
+    assert_matches_scipy(rosenbrock, x0, maxiter=25)
@@ -0,0 +1,52 @@
+"""Derived CKM observables: unitarity identities, agreement with the fit outputs, in-place writes"""
+
+import numpy as np
+
+from src.models.flavor import DERIVED_NAMES, derived_observables
+from src.models.observables import (OBSERVABLES, TRIANGLES, mixing_observables,
+                                    select_observables)
+from src.models.variants import VARIANTS, get_variant
+
+
+def random_params(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    params = np.tile(get_variant(None).initial, (n, 1))
+    params[:, 8:11] = rng.uniform(0.01, np.pi / 2 - 0.01, (n, 3))
+    params[:, 11] = rng.uniform(0.0, 2 * np.pi, n)
+    return params
+
+
+def test_every_triangle_has_area_half_of_J():
+    names = select_observables(['jarlskog', 'areas'])
+    assert names == ['J'] + [f'area_{t}' for t in TRIANGLES]      # registry order
+    values = mixing_observables(random_params(), names, chunk=128)
+    np.testing.assert_allclose(values[:, 1:], np.abs(values[:, :1]) / 2 * np.ones((1, 6)),
+                               rtol=1e-9, atol=1e-15)
+
+
+def test_standard_angles_close_the_triangle():
+    total = mixing_observables(random_params(), ['alpha_ut', 'beta', 'gamma']).sum(axis=1)
+    np.testing.assert_allclose(np.cos(total), -1.0, atol=1e-12)
+    np.testing.assert_allclose(np.sin(total), 0.0, atol=1e-12)
+
+
+def test_moduli_and_J_agree_with_derived_observables():
+    params = random_params()
+    names = DERIVED_NAMES[4:]
+    np.testing.assert_allclose(mixing_observables(params, names),
+                               derived_observables(params)[:, 4:], rtol=1e-12, atol=1e-18)
+
+
+def test_column_slice_is_written_in_place():
+    params = random_params(n=50).reshape(5, 10, -1)
+    table = np.full((5, 10, 8), -7.0)
+    names = ['J', 'beta', 'area_ut']
+    result = mixing_observables(params, names, out=table[..., 2:5], chunk=7)
+    assert np.shares_memory(result, table)
+    np.testing.assert_allclose(table[..., 2:5], mixing_observables(params, names), rtol=1e-14)
+    assert np.all(table[..., :2] == -7.0) and np.all(table[..., 5:] == -7.0)
+
+
+def test_observable_names_do_not_shadow_parameters():
+    for name in VARIANTS:
+        assert not set(OBSERVABLES) & set(get_variant(name).param_names)
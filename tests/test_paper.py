@@ -0,0 +1,41 @@
+"""Paper artifacts from a stored fit"""
+
+import numpy as np
+
+from src.models.datasets import load_dataset
+from src.models.variants import get_variant
+from src.storage.paper import best_fit, build_paper, render_macros, render_observables
+from src.storage.results import ResultsStore
+
+
+def stored_fit(tmp_path, dataset):
+    x = get_variant(None).initial
+    db = tmp_path / 'results.db'
+    with ResultsStore(db) as store:
+        store.record_fit(x, dataset.chi2(x), dataset, 'phi-321')
+    return best_fit(dataset.label, 'phi-321', db), db
+
+
+def test_no_negative_degrees_of_freedom(tmp_path):
+    fit, _ = stored_fit(tmp_path, load_dataset())
+    macros = render_macros(fit)
+    assert len(fit['observables']) < 12
+    assert '\\fitNdof' not in macros and '\\newcommand{\\fitDof}{}' in macros
+
+
+def test_pulls_add_up_to_the_correlated_chi2(tmp_path):
+    dataset = load_dataset('gut-scale-v2')
+    fit, _ = stored_fit(tmp_path, dataset)
+    table = render_observables(fit)
+    pulls = [float(line.split('\\num{')[-1].split('}')[0])
+             for line in table.splitlines() if line.startswith('\\texttt')]
+    np.testing.assert_allclose(np.sum(np.square(pulls)), fit['chi2'], rtol=0.05)
+    total = float(table.split('$\\chi^2$')[1].split('\\num{')[1].split('}')[0])
+    np.testing.assert_allclose(total, fit['chi2'], rtol=1e-3)
+
+
+def test_unchanged_fit_rewrites_nothing(tmp_path):
+    _, db = stored_fit(tmp_path, load_dataset())
+    first = build_paper(variant='phi-321', output=tmp_path / 'generated', db=db)
+    again = build_paper(variant='phi-321', output=tmp_path / 'generated', db=db)
+    assert first['written'] and again['written'] == []
@@ -0,0 +1,51 @@
+"""Typed parameter views and fit results, for every variant"""
+
+import numpy as np
+import pytest
+
+from src.models.flavor import predict_masses, predict_observables
+from src.models.parameters import FitResult, ParameterSet
+from src.models.variants import VARIANTS, get_variant
+
+
+def test_default_fields_are_views_of_the_flat_buffer():
+    x = np.tile(get_variant(None).initial, (4, 1))
+    params = ParameterSet(x)
+    assert np.shares_memory(params.theta13, params.flat)
+    params.L0[:] = 2.5
+    assert np.all(params.flat[:, 6] == 2.5)
+    np.testing.assert_array_equal(params.observables(), predict_observables(params.flat))
+    fit = FitResult(x)
+    np.testing.assert_allclose(fit.m_u, predict_masses(x[:, :3], x[:, 6], x[:, 7]), rtol=1e-14)
+
+
+@pytest.mark.parametrize('name', sorted(VARIANTS))
+def test_fit_result_uses_the_variant(name):
+    variant = get_variant(name)
+    x = variant.initial
+    fit = FitResult.from_optimize({'x': x, 'fun': 1.0, 'variant': name})
+    assert fit.variant is variant
+    assert list(fit.params.named()) == variant.param_names
+    up, down = variant.reference(list(x))
+    np.testing.assert_allclose(fit.m_u, up, rtol=1e-10)
+    np.testing.assert_allclose(fit.m_d, down, rtol=1e-10)
+    for extra in variant.param_names[12:]:
+        assert getattr(fit, extra) == x[variant.param_names.index(extra)]
+
+
+def test_vectors_of_the_wrong_length_are_refused():
+    with pytest.raises(ValueError, match='phi-321\\+eps'):
+        ParameterSet(get_variant(None).initial, 'phi-321+eps')
+
+
+def test_len_counts_vectors_and_array_honours_copy():
+    x = get_variant(None).initial
+    batch = ParameterSet(np.tile(x, (5, 1)))
+    assert len(batch) == 5 and len(batch[1:3]) == 2
+    with pytest.raises(TypeError, match='unbatched'):
+        len(ParameterSet(x))
+    assert np.shares_memory(np.asarray(batch), batch.flat)
+    assert not np.shares_memory(np.array(batch, copy=True), batch.flat)
+    assert np.asarray(batch, dtype=np.float32).dtype == np.float32
+    with pytest.raises(ValueError):
+        np.array(batch, dtype=np.float32, copy=False)
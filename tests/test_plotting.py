@@ -0,0 +1,26 @@
+"""Incremental summary figure: panels are reused while their inputs are unchanged"""
+
+import json
+
+from src.models.variants import get_variant
+from src.plotting.results import PANELS, plot_results
+
+
+def test_unchanged_panels_are_reused(tmp_path):
+    path = tmp_path / 'results.png'
+    x = get_variant(None).initial
+    first = plot_results(x, path=path, dpi=20)
+    assert sorted(first['rendered']) == sorted(PANELS) and first['skipped'] == []
+    assert path.exists()
+    manifest = json.loads((tmp_path / '.results_panels' / 'manifest.json').read_text())
+    assert set(manifest) == set(PANELS) | {'title'}
+
+    again = plot_results(x, path=path, dpi=20)
+    assert again['rendered'] == [] and sorted(again['skipped']) == sorted(PANELS)
+
+    moved = x.copy()
+    moved[6] += 0.5                                   # L0: the masses change, the angles do not
+    third = plot_results(moved, path=path, dpi=20)
+    assert 'mass' in third['rendered']
+    assert {'angles', 'tiling', 'scaling'} <= set(third['skipped'])
+    assert len(plot_results(moved, path=path, dpi=20, force=True)['rendered']) == len(PANELS)
@@ -0,0 +1,78 @@
+"""Prediction service on localhost: batched answers and error statuses"""
+
+import asyncio
+import json
+import socket
+import threading
+from http.client import HTTPConnection
+
+import numpy as np
+import pytest
+
+from src.cli import _read_params
+from src.models.flavor import OBSERVABLE_NAMES, predict_observables
+from src.models.variants import get_variant
+from src.service import prediction
+
+
+@pytest.fixture
+def port():
+    loop = asyncio.new_event_loop()
+    server = prediction.PredictionServer(window=0.001)
+    loop.run_until_complete(server.start(port=0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield server.address[1]
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(5)
+    loop.close()
+
+
+def post(port, body):
+    conn = HTTPConnection(prediction.DEFAULT_HOST, port, timeout=10)
+    try:
+        conn.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def test_predictions_match_the_kernel(port):
+    x = get_variant(None).initial
+    status, payload = post(port, json.dumps({'params': [x.tolist()] * 3}))
+    assert status == 200 and len(payload['predictions']) == 3
+    got = [payload['predictions'][0]['observables'][name] for name in OBSERVABLE_NAMES]
+    np.testing.assert_allclose(got, predict_observables(x), rtol=1e-15)
+
+
+@pytest.mark.parametrize('body', ['{"params": [1, 2', '{"vectors": []}', '[1, 2]',
+                                  '{"params": [[1, 2], [3]]}', '{"params": [1, 2, 3]}'])
+def test_bad_input_is_a_400(port, body):
+    status, payload = post(port, body)
+    assert status == 400 and payload['error']
+
+
+def test_malformed_request_line_is_a_400(port):
+    with socket.create_connection((prediction.DEFAULT_HOST, port), timeout=10) as sock:
+        sock.sendall(b"GARBAGE\r\n\r\n")
+        reply = sock.recv(4096)
+    assert reply.startswith(b"HTTP/1.1 400 ")
+
+
+def test_kernel_error_is_a_500_and_the_service_survives(port, monkeypatch):
+    def broken(params):
+        raise FloatingPointError("kernel blew up")
+
+    monkeypatch.setattr(prediction, 'predict_observables', broken)
+    x = get_variant(None).initial.tolist()
+    status, payload = post(port, json.dumps({'params': x}))
+    assert status == 500 and 'kernel blew up' in payload['error']
+    monkeypatch.undo()
+    assert post(port, json.dumps({'params': x}))[0] == 200
+
+
+def test_cli_rejects_malformed_json():
+    with pytest.raises(SystemExit, match='JSON list'):
+        _read_params('[1, 2', 12)
@@ -0,0 +1,35 @@
+"""Progress streams: sinks, failure handling and aggregation"""
+
+import json
+import socket
+
+from src.service.progress import Progress, ProgressAggregator
+
+
+def test_refused_sink_warns_once_and_stays_silent(capsys):
+    with socket.socket() as probe:                        # a port nobody listens on
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    progress = Progress(f"tcp://127.0.0.1:{port}", run='r')
+    assert not progress
+    progress.start(total=10)
+    progress.best(1.0)
+    progress.end(done=10)
+    progress.close()
+    assert capsys.readouterr().err.count('cannot open') == 1
+
+
+def test_file_sink_feeds_the_aggregator(tmp_path):
+    path = tmp_path / 'events-{worker}.jsonl'
+    for worker in ('a', 'b'):
+        progress = Progress(str(path), run='r', worker=worker, interval=0.0)
+        progress.start(total=10, unit='rows')
+        progress.chunk(done=5)
+        progress.end(done=5)
+        progress.close()
+    aggregator = ProgressAggregator()
+    for worker in ('a', 'b'):
+        for line in (tmp_path / f'events-{worker}.jsonl').read_text().splitlines():
+            aggregator.update(json.loads(line))
+    run = aggregator.summary()['r']
+    assert (run['done'], run['total'], run['workers'], run['finished']) == (10, 10, 2, True)
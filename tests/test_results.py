@@ -0,0 +1,72 @@
+"""Results store: parameter blobs round-trip exactly, filters and chunked reads agree"""
+
+import numpy as np
+import pytest
+
+from src.storage.results import ResultsStore, params_hash
+
+
+def vectors(n, width=12, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, width)) * 10.0**np.arange(-6, width - 6)
+
+
+def test_blobs_round_trip_bit_for_bit(tmp_path):
+    x = vectors(20)
+    chi2 = np.arange(20, 0, -1, dtype=float)
+    chi2[3] = np.nan
+    with ResultsStore(tmp_path / 'r.db') as store:
+        assert store.insert_many('scan', x, chi2, 'gut-scale-v1', 'phi-321', run_id='a',
+                                 extra={'seed': 1}) == 20
+    with ResultsStore(tmp_path / 'r.db') as store:             # reopened from disk
+        rows = store.query(kind='scan')
+        assert rows['params'].dtype == np.float64
+        np.testing.assert_array_equal(rows['params'], x)
+        np.testing.assert_array_equal(rows['chi2'], chi2)       # NaN stored as NULL and back
+        assert rows['dataset'] == ['gut-scale-v1'] * 20 and rows['run_id'] == ['a'] * 20
+        ordered = store.query(order_by_chi2=True, limit=5)
+        np.testing.assert_array_equal(ordered['chi2'], [1.0, 2.0, 3.0, 4.0, 5.0])
+        np.testing.assert_array_equal(ordered['params'], x[[19, 18, 17, 16, 15]])
+        assert len(store.query(max_chi2=10.0)['id']) == 10      # the NaN row never matches
+        empty = store.query(kind='fit')
+        assert empty['params'].shape == (0, 0) and len(empty['chi2']) == 0
+    assert params_hash(x[0]) == params_hash(list(x[0]))
+
+
+def test_best_keeps_to_dataset_variant_and_kind(tmp_path):
+    with ResultsStore(tmp_path / 'r.db') as store:
+        assert store.best('gut-scale-v1', 'phi-321') is None
+        store.insert_many('fit', vectors(3, seed=1), [5.0, 1.0, 3.0], 'gut-scale-v1', 'phi-321')
+        store.insert_many('fit', vectors(1, seed=2), 0.5, 'gut-scale-v2', 'phi-321')
+        store.insert_many('fit', vectors(1, 14, seed=3), 0.1, 'gut-scale-v1', 'phi-321+eps')
+        store.insert_many('scan', vectors(1, seed=4), 0.01, 'gut-scale-v1', 'phi-321')
+
+        x, chi2 = store.best('gut-scale-v1', 'phi-321')
+        assert chi2 == 1.0
+        np.testing.assert_array_equal(x, vectors(3, seed=1)[1])
+        assert store.best('gut-scale-v2', 'phi-321')[1] == 0.5
+        x, chi2 = store.best('gut-scale-v1', 'phi-321+eps')
+        assert chi2 == 0.1 and x.shape == (14,)
+        assert store.best('gut-scale-v1', 'phi-321', kind='scan')[1] == 0.01
+        with pytest.raises(ValueError, match='mix parameter lengths'):
+            store.query(kind='fit', dataset='gut-scale-v1')
+
+
+def test_chunks_cover_the_query(tmp_path):
+    with ResultsStore(tmp_path / 'r.db') as store:
+        for seed in range(3):
+            store.insert_many('scan', vectors(9, seed=seed), np.arange(9.0) + seed,
+                              'gut-scale-v1', 'phi-321')
+        store.insert_many('scan', vectors(4, 14), 0.0, 'gut-scale-v1', 'phi-321+eps')
+
+        rows = store.query(variant='phi-321')
+        chunks = list(store.iter_chunks(chunk_rows=7, variant='phi-321'))
+        assert [len(c[0]) for c in chunks] == [7, 7, 7, 6]
+        np.testing.assert_array_equal(np.concatenate([c[0] for c in chunks]), rows['params'])
+        np.testing.assert_array_equal(np.concatenate([c[1] for c in chunks]), rows['chi2'])
+
+        kept = np.concatenate([c[1] for c in store.iter_chunks(5, max_chi2=2.0,
+                                                                variant='phi-321')])
+        np.testing.assert_array_equal(kept, rows['chi2'][rows['chi2'] <= 2.0])
+        assert list(store.iter_chunks(5, dataset='gut-scale-v2')) == []
+        with pytest.raises(ValueError, match='mix parameter lengths'):
+            list(store.iter_chunks(chunk_rows=100))
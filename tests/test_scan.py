@@ -0,0 +1,43 @@
+"""Float32 screening: a valid error bound and the same top-K as the float64 scan"""
+
+from functools import partial
+
+import numpy as np
+import pytest
+
+from src.fitting.scan import random_scan
+from src.models.datasets import load_dataset
+from src.models.variants import get_variant
+
+
+@pytest.mark.parametrize('variant', ['phi-321', 'fib-321', 'phi-321+eps'])
+@pytest.mark.parametrize('name', ['gut-scale-v1', 'gut-scale-v2'])
+def test_screen_bound_covers_the_float32_error(name, variant):
+    dataset, formula = load_dataset(name), get_variant(variant)
+    lo, hi = formula.bounds.T
+    x = lo + (hi - lo) * np.random.default_rng(4).random((20_000, formula.n_params))
+    x32 = x.astype(np.float32)
+    exact = np.sqrt(dataset.chi2(x, variant))       # at the float64 points themselves
+    approx, bound = dataset.chi2_screen(x32, variant)
+    finite = np.isfinite(exact)
+    assert finite.mean() > 0.5
+    assert np.all(np.abs(np.sqrt(approx, dtype=float) - exact)[finite] <= bound[finite])
+
+
+@pytest.mark.parametrize('variant', ['phi-321', 'phi-432'])
+def test_screened_scan_equals_the_full_scan(variant):
+    dataset, formula = load_dataset('gut-scale-v2'), get_variant(variant)
+    evaluated = []
+
+    def chi2(x):
+        evaluated.append(len(x))
+        return dataset.chi2(x, variant)
+
+    run = partial(random_scan, bounds=formula.bounds, n=40_000, chunk=8_000, top=20, seed=9)
+    full = run(chi2)
+    n_full = sum(evaluated)
+    evaluated.clear()
+    screened = run(chi2, screen=partial(dataset.chi2_screen, variant=variant))
+    np.testing.assert_array_equal(screened['x'], full['x'])
+    np.testing.assert_array_equal(screened['fun'], full['fun'])
+    assert sum(evaluated) < n_full / 10               # the screen did drop points
@@ -0,0 +1,26 @@
+"""Laplace spectrum of X(5): constants are the ground state, levels are A5 multiplets"""
+
+import numpy as np
+
+from src.core.spectrum import hyperbolic_spectrum, multiplets
+
+A5_DIMENSIONS = {1, 3, 4, 5}
+
+
+def test_ground_state_and_multiplets_on_a_coarse_mesh():
+    result = hyperbolic_spectrum(24, 8, 8, refinements=1)
+    values, levels = result['eigenvalues'], result['multiplets']
+    assert len(values) == 24 and np.all(np.diff(values) >= 0)
+    assert abs(values[0]) < 1e-8 and values[1] > 0.1            # only the constants at 0
+    assert levels[0][1] == 1
+    # the last level may be cut off by n_eigs
+    assert {count for _, count in levels[:-1]} <= A5_DIMENSIONS
+    assert {3, 4, 5} <= {count for _, count in levels[:-1]}
+    assert len(result['rounds']) == 2
+    assert result['rounds'][1]['dof'] > result['rounds'][0]['dof']
+
+
+def test_multiplets_group_within_tolerance():
+    groups = multiplets([2.0, 1.0, 1.0 + 1e-9, 2.0 + 1e-3])
+    assert [count for _, count in groups] == [2, 1, 1]
+    np.testing.assert_allclose(groups[0][0], 1.0 + 0.5e-9, rtol=1e-15)
@@ -0,0 +1,64 @@
+"""Streaming summaries of chains: bins follow the data, burn-in is dropped"""
+
+import numpy as np
+
+from src.analysis.streaming import (array_chunks, column_ranges, summarize_chain,
+                                    summarize_store)
+from src.models.datasets import load_dataset
+from src.models.variants import get_variant
+from src.storage.results import ResultsStore
+
+STEPS, WALKERS, BURN = 300, 20, 100
+
+
+def write_chain(path):
+    rng = np.random.default_rng(5)
+    x0 = get_variant(None).initial
+    std = np.where(x0 != 0, 1e-3 * np.abs(x0), 1e-3)
+    std[10] = 1.2e-4                                      # theta13, as narrow as a posterior
+    chain = x0 + std * rng.standard_normal((STEPS, WALKERS, len(x0)))
+    chain[:BURN] += 0.1                                   # a burn-in far from the posterior
+    log_prob = -0.5 * np.sum(((chain - x0) / std)**2, axis=-1)
+    np.savez(path, chain=chain, log_prob=log_prob)
+    return chain[BURN:].reshape(-1, len(x0)), -2.0 * log_prob[BURN:].reshape(-1)
+
+
+def test_chain_quantiles_resolve_a_narrow_posterior(tmp_path):
+    samples, chi2 = write_chain(tmp_path / 'chain.npz')
+    summary = summarize_chain(tmp_path / 'chain.npz', top=5, chunk_rows=1000, burn=BURN)
+    q = summary['quantiles']
+    expected = np.quantile(samples, q['q'], axis=0).T
+    spread = samples.std(axis=0)[:, None]
+    assert np.all(np.abs(q['quantiles'] - expected) < 0.05 * spread)
+    np.testing.assert_allclose(summary['top']['value'], np.sort(chi2)[:5])
+
+    density = summary['density_theta12_theta23']['counts']
+    assert density.sum() == len(samples)
+    assert np.count_nonzero(density) > 100               # spread over the map, not 1-2 bins
+
+
+def test_column_ranges_cover_the_weighted_rows():
+    rows = np.array([[0.0, 5.0], [1.0, 5.0], [9.0, 5.0]])
+    ranges = column_ranges(array_chunks(rows, weights=np.array([1.0, 1.0, 0.0]), chunk_rows=2))
+    assert ranges[0].tolist() == [0.0, 1.0]
+    assert ranges[1, 0] < 5.0 < ranges[1, 1]              # a pinned column still gets edges
+
+
+def test_store_summary_keeps_to_its_dataset_and_variant(tmp_path):
+    v1, v2 = load_dataset('gut-scale-v1'), load_dataset('gut-scale-v2')
+    base, eps = get_variant('phi-321'), get_variant('phi-321+eps')
+    rng = np.random.default_rng(6)
+    with ResultsStore(tmp_path / 'results.db') as store:
+        for dataset, variant in [(v1, base), (v2, base), (v1, eps)]:
+            x = variant.initial + 0.01 * rng.standard_normal((500, variant.n_params))
+            store.insert_many('scan', x, dataset.chi2(x, variant.name), dataset.label,
+                              variant.name)
+        summary = summarize_store(store, v2, top=5, variant=base.name, kind='scan')
+        rows = store.query(kind='scan', dataset=v2.label, variant=base.name)
+        extended = summarize_store(store, v1, top=5, variant=eps.name, kind='scan')
+
+    np.testing.assert_array_equal(summary['top']['value'], np.sort(rows['chi2'])[:5])
+    pred = base.predict_observables(rows['params'])[:, v2.index]
+    np.testing.assert_allclose(summary['pulls']['mean'],
+                               ((pred - v2.central) / v2.sigma).mean(axis=0), rtol=1e-9)
+    assert extended['quantiles']['quantiles'].shape[0] == eps.n_params
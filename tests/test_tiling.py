@@ -0,0 +1,24 @@
+"""Gamma(5) tiling: the side pairings of the fundamental domain lie in Gamma(5)"""
+
+import numpy as np
+
+from src.core.tiling import a5_index, inverse, matrix_hash, normalize, side_pairings
+
+I = np.eye(2, dtype=np.int64)
+
+
+def test_side_pairings_are_nontrivial_elements_of_gamma5():
+    g = side_pairings()
+    assert len(g) > 0
+    np.testing.assert_array_equal(g[:, 0, 0] * g[:, 1, 1] - g[:, 0, 1] * g[:, 1, 0], 1)
+    assert np.all(a5_index(g) == 0)                        # the identity of A5 comes first
+    mod = g % 5
+    assert np.all(np.all(mod == I, axis=(1, 2)) | np.all(mod == 4 * I, axis=(1, 2)))
+    assert not np.any(np.all(normalize(g) == I, axis=(1, 2)))
+
+
+def test_side_pairings_come_in_inverse_pairs():
+    g = side_pairings()
+    keys = set(matrix_hash(normalize(g)).tolist())
+    assert len(keys) == len(g)
+    assert set(matrix_hash(normalize(inverse(g))).tolist()) == keys
@@ -0,0 +1,28 @@
+"""Finite-difference derivatives and fit uncertainties"""
+
+import numpy as np
+
+from src.fitting.uncertainty import hessian, jacobian
+
+
+def test_central_jacobian_steps_follow_the_function():
+    scale = np.array([1e-4, 1.0, 1e3])                    # stiff and soft directions
+    g = lambda x: np.stack([np.sin(x[..., 0] / scale[0]), np.exp(x[..., 1]),
+                            (x[..., 2] / scale[2])**3], axis=-1)
+    x0 = np.array([0.3e-4, 0.2, 2e3])
+    expected = np.diag([np.cos(x0[0] / scale[0]) / scale[0], np.exp(x0[1]),
+                        3 * (x0[2] / scale[2])**2 / scale[2]])
+    np.testing.assert_allclose(jacobian(g, x0), expected, rtol=5e-3, atol=1e-9)
+
+
+def test_complex_step_jacobian_is_exact():
+    g = lambda x: np.stack([x[..., 0] * x[..., 1], np.exp(x[..., 1])], axis=-1)
+    x0 = np.array([1.5, -0.5])
+    np.testing.assert_allclose(jacobian(g, x0, scheme='complex'),
+                               [[x0[1], x0[0]], [0.0, np.exp(x0[1])]], rtol=1e-14)
+
+
+def test_hessian_of_a_quadratic():
+    A = np.array([[4.0, 1.0], [1.0, 3e4]])
+    f = lambda x: 0.5 * np.einsum('...i,ij,...j->...', x, A, x)
+    np.testing.assert_allclose(hessian(f, np.array([0.1, -0.01])), A, rtol=1e-6)
@@ -0,0 +1,38 @@
+"""Mass-formula variants: batched kernels against their scalar references"""
+
+import numpy as np
+import pytest
+
+from src.models.flavor import predict_observables
+from src.models.variants import VARIANTS, MassFormula, get_variant, phi_powers
+
+
+@pytest.mark.parametrize('name', sorted(VARIANTS))
+def test_batched_kernel_matches_the_scalar_reference(name):
+    variant = get_variant(name)
+    variant.validate(n=256, seed=11)
+    x = variant.initial + 0.1 * np.random.default_rng(1).standard_normal((8, variant.n_params))
+    batched = np.exp(np.stack(variant.log_masses(x), axis=1))
+    scalar = np.array([variant.reference(list(p)) for p in x])
+    np.testing.assert_allclose(batched, scalar, rtol=1e-12)
+    assert variant.predict_observables(x).shape == predict_observables(x[:, :12]).shape
+
+
+def test_default_variant_is_the_paper_formula():
+    x = get_variant(None).initial + 0.05 * np.random.default_rng(2).standard_normal((16, 12))
+    np.testing.assert_allclose(get_variant('phi-321').predict_observables(x),
+                               predict_observables(x), rtol=1e-13)
+
+
+def test_a_kernel_that_disagrees_with_its_reference_is_refused():
+    class Broken(MassFormula):
+        def sector_log_masses(self, k, L0, alpha, extra, sector):
+            return super().sector_log_masses(k, L0, alpha, extra, sector) * (1 + 1e-6)
+
+    with pytest.raises(ValueError, match='scalar reference'):
+        Broken('broken', phi_powers((3, 2, 1)).scaling).validate()
+
+
+def test_unknown_variant():
+    with pytest.raises(ValueError, match='Unknown variant'):
+        get_variant('phi-999')
@@ -0,0 +1,99 @@
+"""Shared-directory work queue: leases, claims and single-box distributed scans"""
+
+import json
+import os
+from functools import partial
+
+import numpy as np
+
+from src.fitting.scan import random_scan
+from src.models.datasets import load_dataset
+from src.models.variants import get_variant
+from src.service import workqueue
+
+
+def test_claim_of_old_queue_is_not_requeued(tmp_path, monkeypatch):
+    queue = workqueue.submit_scan(tmp_path / 'q', 1000, chunk=500, top=5, seed=1)
+    old = queue.now() - 3600
+    for task_id in queue.ids('pending'):
+        os.utime(queue.path('pending', task_id), (old, old))
+    write = workqueue._write_json
+    moved = []
+
+    def other_worker_checks_leases(path, payload):
+        moved.extend(queue.requeue_expired(lease=60))
+        write(path, payload)
+
+    monkeypatch.setattr(workqueue, '_write_json', other_worker_checks_leases)
+    task_id, _ = queue.claim('a')
+    assert moved == []
+    assert task_id in queue.ids('claimed') and task_id not in queue.ids('pending')
+
+
+def test_claim_lost_before_read_is_skipped(tmp_path, monkeypatch):
+    queue = workqueue.submit_scan(tmp_path / 'q', 1000, chunk=500, top=5, seed=1)
+    first = queue.ids('pending')[0]
+    real_utime = os.utime
+
+    def requeue_first(path, *args, **kwargs):
+        if path == queue.path('claimed', first):
+            os.rename(path, queue.path('pending', first))     # another worker's requeue
+            monkeypatch.setattr(os, 'utime', real_utime)
+        return real_utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, 'utime', requeue_first)
+    task_id, _ = queue.claim('a')
+    assert task_id != first
+    assert first in queue.ids('pending')
+
+
+def test_claim_requeued_while_recording_its_owner_leaves_no_ghost(tmp_path, monkeypatch):
+    queue = workqueue.submit_scan(tmp_path / 'q', 1000, chunk=500, top=5, seed=1)
+    first = queue.ids('pending')[0]
+    descriptor = queue.path('pending', first).read_text()
+    write = workqueue._write_json
+
+    def requeued_meanwhile(path, payload):
+        os.rename(queue.path('claimed', first), queue.path('pending', first))
+        write(path, payload)
+
+    monkeypatch.setattr(workqueue, '_write_json', requeued_meanwhile)
+    assert queue.claim('a')[0] == first
+    assert queue.ids('claimed') == [] and first in queue.ids('pending')
+    assert queue.path('pending', first).read_text() == descriptor
+
+    monkeypatch.setattr(workqueue, '_write_json', write)
+    assert queue.claim('b')[0] == first
+    assert [c['worker'] for c in queue.status()['claims']] == ['b']
+    queue.complete(first, {'x': np.zeros(1)})
+    assert not queue.owner_path(first).exists()
+
+
+def test_local_workers_match_random_scan(tmp_path):
+    root = tmp_path / 'scan'
+    n, chunk, top, seed = 60_000, 7_000, 10, 42
+    workqueue.submit_scan(root, n, chunk=chunk, top=top, seed=seed)
+    assert workqueue.launch_local(root, workers=3, poll=0.05) == [0, 0, 0]
+    merged = workqueue.merge_results(root)
+
+    dataset, variant = load_dataset(), get_variant(None)
+    serial = random_scan(partial(dataset.chi2, variant=variant.name), variant.bounds, n,
+                         chunk=chunk, top=top, seed=seed)
+    np.testing.assert_array_equal(merged['fun'], serial['fun'])
+    np.testing.assert_array_equal(merged['x'], serial['x'])
+
+
+def test_workers_use_the_submitted_dataset(tmp_path):
+    source = load_dataset()
+    spec = {**source.to_spec(), 'name': 'shifted', 'version': 'tmp'}
+    spec['central'][4] += 0.002
+    path = tmp_path / 'not-the-label.json'
+    path.write_text(json.dumps(spec))
+    dataset = load_dataset(path)
+
+    root = tmp_path / 'scan'
+    workqueue.submit_scan(root, 5_000, chunk=2_500, top=3, dataset=str(path), seed=3)
+    path.unlink()                         # workers must not need the original file
+    workqueue.run_worker(root, poll=0.01)
+    merged = workqueue.merge_results(root)
+    np.testing.assert_allclose(merged['fun'], dataset.chi2(merged['x']))